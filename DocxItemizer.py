@@ -1,505 +1,4798 @@
 import zipfile              # Extracts from zip files
 import os                   # Interacts with the file system
 import shutil               # Makes copies of files
+import hashlib              # Hashes files for the blob store
+import json                 # Writes the manifest of the blob store
+import zlib                 # Compresses the members of documents in the search index when their contents are kept
+import posixpath            # Gets the names of members of documents in the search index
 import time                 # Gets a time stamps
-import imghdr               # Checks if a file is actually an image
 import re                   # Regex search file name and file contents
-import lxml.etree as et     # Processes the XML files and transform them using XSLT. This package will need to be installed in order to run the script
-import argparse             # Parses the arguments passed by the user. Also provides a help menu using the [-h] flag
+import io                   # Reads the contents of the document's files from memory
+import contextlib           # Creates the temporary files of the blob store
+import collections          # Holds the documents that are being itemized in a batch in order
+import signal               # Stops the watch mode gracefully when it is interrupted or terminated
+import threading            # Guards the counts of the writes made by the threads of a WriteScheduler
+# These modules are slow to import so they are imported by the functions that use them. This keeps the start up of
+# the script, its worker processes, and programs that import it as a library fast:
+#   lxml.etree (streams the text out of the XML files. This package will need to be installed in order to run the
+#   script), argparse, sqlite3, tempfile, tarfile, traceback, concurrent.futures, cProfile, pstats, marshal, and fcntl
 
 __author__ = 'James Stinson-Cerra'
 __date__ = '20190417'
 __version__ = '1'
 
-# Sets up the parser for the Docx Itemizer script
-parser = argparse.ArgumentParser(description="Docx Itemizer")
-# Non Optional Argument: Path to a .docx file or directory containing .docx file(s)
-parser.add_argument("path", type=str,
-                    help="Required Argument: Path to .docx file or directory containing .docx file(s)")
-# Optional Argument: Term to search for in file names and file contents while itemizing the .docx file(s)
-parser.add_argument("search_term", type=str, nargs="?",
-                    help="Optional Argu``ment: Regex to use to match file names and file contents")
+# Tags of the WordprocessingML elements used to extract the text from the XML files in the "word" directory
+W_NAMESPACE = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+W_TEXT_TAG = W_NAMESPACE + "t"
+W_DELETED_TEXT_TAG = W_NAMESPACE + "delText"
+W_TAB_TAG = W_NAMESPACE + "tab"
+W_BREAK_TAG = W_NAMESPACE + "br"
+W_CARRIAGE_RETURN_TAG = W_NAMESPACE + "cr"
+W_RUN_TAG = W_NAMESPACE + "r"
+W_PARAGRAPH_TAG = W_NAMESPACE + "p"
+W_TABLE_CELL_TAG = W_NAMESPACE + "tc"
+W_TABLE_ROW_TAG = W_NAMESPACE + "tr"
+
+# Number of bytes from the start of a file that are used to get the file's actual type
+SNIFF_SIZE = 256
+# Signatures of known types of files (file type, is an image, offset of the signature, signature)
+FILE_SIGNATURES = [
+    ("png", True, 0, b"\x89PNG\r\n\x1a\n"),
+    ("jpeg", True, 0, b"\xff\xd8\xff"),
+    ("gif", True, 0, b"GIF87a"),
+    ("gif", True, 0, b"GIF89a"),
+    ("tiff", True, 0, b"II*\x00"),
+    ("tiff", True, 0, b"MM\x00*"),
+    ("ico", True, 0, b"\x00\x00\x01\x00"),
+    ("wmf", True, 0, b"\xd7\xcd\xc6\x9a"),
+    ("wmf", True, 0, b"\x01\x00\x09\x00\x00\x03"),
+    ("wmf", True, 0, b"\x02\x00\x09\x00\x00\x03"),
+    ("pdf", False, 0, b"%PDF-"),
+    ("zip", False, 0, b"PK\x03\x04"),
+    ("zip", False, 0, b"PK\x05\x06"),
+    ("ole", False, 0, b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"),
+    ("elf", False, 0, b"\x7fELF"),
+    ("rtf", False, 0, b"{\\rtf"),
+    ("gzip", False, 0, b"\x1f\x8b"),
+    ("rar", False, 0, b"Rar!\x1a\x07"),
+    ("7z", False, 0, b"7z\xbc\xaf\x27\x1c"),
+]
+# Extensions that each type of file is allowed to use. The first extension is used for the copy of a hidden file
+FILE_TYPE_EXTENSIONS = {
+    "png": ("png",),
+    "jpeg": ("jpeg", "jpg", "jpe", "jfif"),
+    "gif": ("gif",),
+    "tiff": ("tiff", "tif"),
+    "bmp": ("bmp", "dib"),
+    "ico": ("ico",),
+    "wmf": ("wmf",),
+    "emf": ("emf",),
+    "webp": ("webp",),
+    "heic": ("heic", "heif"),
+    "avif": ("avif",),
+    "svg": ("svg",),
+    "pdf": ("pdf",),
+    "zip": ("zip", "docx", "docm", "dotx", "dotm", "xlsx", "xlsm", "xltx", "xltm", "pptx", "pptm", "potx", "potm",
+            "ppsx", "ppsm", "vsdx", "odt", "ods", "odp", "jar"),
+    "ole": ("ole", "bin", "doc", "dot", "xls", "xlt", "ppt", "pot", "pps", "msg", "vsd"),
+    "exe": ("exe", "dll", "sys", "scr", "ocx", "cpl"),
+    "elf": ("elf", "so"),
+    "rtf": ("rtf",),
+    "gzip": ("gz", "emz", "wmz"),
+    "rar": ("rar",),
+    "7z": ("7z",),
+}
+
+# Namespaces of the parts that describe the other parts of a document (Open Packaging Conventions)
+CONTENT_TYPES_NAMESPACE = "{http://schemas.openxmlformats.org/package/2006/content-types}"
+RELATIONSHIPS_NAMESPACE = "{http://schemas.openxmlformats.org/package/2006/relationships}"
+# Name of the part that declares the content type of every part of a document
+CONTENT_TYPES_PART_NAME = "[Content_Types].xml"
+# Content types that each type of file can be declared as (checked as prefixes). A part whose actual type is known
+# and is declared as a different content type is reported as a content type mismatch
+FILE_TYPE_CONTENT_TYPES = {
+    "png": ("image/png",),
+    "jpeg": ("image/jpeg", "image/jpg", "image/pjpeg"),
+    "gif": ("image/gif",),
+    "tiff": ("image/tiff",),
+    "bmp": ("image/bmp", "image/x-bmp", "image/x-ms-bmp"),
+    "ico": ("image/x-icon", "image/vnd.microsoft.icon"),
+    "wmf": ("image/x-wmf", "image/wmf"),
+    "emf": ("image/x-emf", "image/emf"),
+    "webp": ("image/webp",),
+    "heic": ("image/heic", "image/heif"),
+    "avif": ("image/avif",),
+    "svg": ("image/svg+xml",),
+    "pdf": ("application/pdf",),
+    "zip": ("application/vnd.openxmlformats-officedocument.", "application/vnd.ms-", "application/vnd.oasis.",
+            "application/zip", "application/x-zip", "application/java-archive"),
+    "ole": ("application/vnd.openxmlformats-officedocument.oleObject", "application/vnd.ms-", "application/msword",
+            "application/x-msmetafile"),
+    "exe": ("application/x-msdownload", "application/vnd.microsoft.portable-executable"),
+    "elf": ("application/x-executable", "application/x-elf"),
+    "rtf": ("application/rtf", "text/rtf"),
+    "gzip": ("application/gzip", "application/x-gzip", "image/x-emz", "image/x-wmz"),
+    "rar": ("application/vnd.rar", "application/x-rar"),
+    "7z": ("application/x-7z-compressed",),
+}
+# Content type that can be declared for a part of any type
+GENERIC_CONTENT_TYPE = "application/octet-stream"
+
+# Name of the manifest file that records the progress of batch runs over a directory
+MANIFEST_FILE_NAME = "docx_itemizer_manifest.jsonl"
+# Matches the names of the base directories created by this script
+BASE_DIR_NAME_PATTERN = re.compile(r".+_Itemized\(\d{8}-\d{6}\)")
+
+# Matches the runs of characters in the decoded contents of a binary member that are added to the search index. The
+# runs are split at control characters and are long enough for the trigram full text index
+INDEX_STRING_PATTERN = re.compile(r"[^\x00-\x1f\x7f]{3,}")
+
+# Tokens of a regex search term that are skipped when finding its keyword: quantifiers, escapes that are not literal
+# characters (with their hex digits, group numbers, or character names), and character classes
+KEYWORD_QUANTIFIER_PATTERN = re.compile(r"([*?+]|\{\d*,?\d*\})[?+]?")
+KEYWORD_ESCAPE_PATTERN = re.compile(r"\\(N\{[^}]*\}?|x[0-9a-fA-F]{0,2}|u[0-9a-fA-F]{0,4}|U[0-9a-fA-F]{0,8}|\d+|.?)",
+                                    re.DOTALL)
+KEYWORD_CLASS_PATTERN = re.compile(r"\[\^?\]?(\\.|[^\]\\])*\]?", re.DOTALL)
+
+# Number of values in the MinHash signature of a document used to find near-duplicate documents
+MINHASH_SIZE = 128
+# Number of bands the signatures are split into to find candidate near-duplicates (MINHASH_SIZE / LSH_BANDS values
+# in each band). Two documents are compared if all of the values of any band are the same
+LSH_BANDS = 16
+# Number of words in each shingle of a document's text
+SHINGLE_SIZE = 5
+# Matches the words of a document's text
+WORD_PATTERN = re.compile(r"\w+")
+
+# Output files at least this large are hashed so a later write of the same contents can be cloned from the first
+# file instead of being written again. Smaller files are cheaper to write than to hash and clone
+CLONE_MIN_SIZE = 256 * 1024
+# The ioctl request that makes a file share the blocks of another file (a reflink) on Linux (btrfs, XFS, etc.)
+FICLONE = 0x40049409
+
+# Number of bytes decompressed at a time when reading a member of a document
+READ_CHUNK_SIZE = 1024 * 1024
+# Documents of up to this many bytes are read into memory once to be hashed, copied and itemized. Larger documents
+# are hashed and then itemized from the file
+MAX_IN_MEMORY_DOC_SIZE = 256 * 1024 * 1024
+# Members smaller than this are not checked for their compression ratio since small files can compress very well
+MIN_RATIO_CHECK_SIZE = 1024 * 1024
+
+# Maximum number of byte offsets of search term matches listed for each file in the log
+MAX_LOGGED_OFFSETS = 10
+# Maximum number of byte offsets of search term matches recorded for each file in "report.json". The total number of
+# matches is always recorded
+MAX_RECORDED_OFFSETS = 1000
 
 
 class Itemizer:
 
-    def __init__(self, doc_path, base_dir_path, extracted_dir_path, zip_dir_path, doc_copy_path):
+    def __init__(self, doc_path, base_dir_path, extracted_dir_path, doc_copy_path, writer, metrics=None,
+                 doc_data=None, embedded_budget=None, limits=None):
         """
         The Itemizer class is responsible for itemizing the different components found within a .docx file
 
-        1. Extracts the documents contents by converting it to a .zip and unzipping
-            it into "Extracted Document" directory
-        2. Copies original .docx file to base directory
-        3. Itemizes the contents of the "Extracted Document" directory into separate directories:
+        1. Copies original .docx file to base directory
+        2. Opens the document as a zip file once and reads every member a single time. Each member is written into
+            the "Extracted Document" directory, itemized and then handed to the inspection stages (ImageFinder,
+            Searcher) so no stage has to walk the "Extracted Document" directory or re-read files from disk.
+            Members are read within the ExtractionLimits so a zip bomb can not fill the disk or memory. Members
+            that break the limits are not extracted and are listed as suspicious parts
+        3. Itemizes the members of the document into separate directories:
             XML, CSS, Media, Content, RELS, and Uncatergorized
-            a. XML Directory: Contains all XML files found in the "Extracted Document" directory
-            b. CSS Directory: Contains all CSS files found in the "Extracted Document" directory
-            c. Media Directory: Contains all media files found in the extracted files in the media directory
-                * Media directory found at "Extracted Document/{Doc Name}/word/media" or "Extracted Document/word/media"
+            a. XML Directory: Contains all XML files found in the document
+            b. CSS Directory: Contains all CSS files found in the document
+            c. Media Directory: Contains all media files found in the document's media directory
+                * Media directory found at "{Doc Name}/word/media" or "word/media" within the document
             d. Content Directory: Contains all XML files from the word directory converted to plain text
-                * Word directory found at "Extracted Document/{Doc Name}/word" or "Extracted Document/word"
-                * XML contents is converted to plain text and stripped of XML elements
-                    by using XSLT and some python to insert newlines
-            e. RELS Directory: Contains all RELS files found in the "Extracted Document" directory
-            f. Uncategorized Directory: Contains all files with unknown file extensions
-                in the "Extracted Document" directory
+                * Word directory found at "{Doc Name}/word" or "word" within the document
+                * XML contents is converted to plain text by streaming through the XML elements. Newlines and
+                    tabs are added for paragraphs, breaks, tabs and table cells
+            e. RELS Directory: Contains all RELS files found in the document
+            f. Uncategorized Directory: Contains all files with unknown file extensions found in the document
+        4. Keeps the members that are zip files (e.g. embedded .docx, .xlsx, and .pptx files in "word/embeddings")
+            in memory so they can be itemized as embedded documents once the document is done. Only as many bytes
+            of embedded documents as the embedded_budget are kept, the others are listed as skipped
 
         :param doc_path: Path to the document
         :param base_dir_path: Path to the base directory that holds all of the output of this script
         :param extracted_dir_path: Path to the "Extracted Document" directory in the base directory
-        :param zip_dir_path: Path to the .zip file that is a copy of the .docx file
-        :param doc_copy_path: Path to copy the original .docx file into the base directory
+        :param doc_copy_path: Path to copy the original .docx file into the base directory or None to not copy it
+        :param writer: The FileWriter used to write all of the output files
+        :param metrics: The Metrics that the time of each stage is recorded in or None to not record them
+        :param doc_data: The document's contents as bytes if it is itemized from memory (e.g. an embedded document,
+            a document given to itemize_bytes, or a document that was read to be hashed), otherwise None to read the
+            document from doc_path
+        :param embedded_budget: Number of bytes of embedded documents to keep or None to not look for them
+        :param limits: The ExtractionLimits the members are read within or None to use the default limits
         """
         self.doc_path = doc_path
+        self.doc_data = doc_data
+        self.writer = writer
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.embedded_budget = embedded_budget
+        self.limits = limits if limits is not None else ExtractionLimits()
         self.base_dir_path = base_dir_path
         self.extracted_dir_path = extracted_dir_path
-        self.zip_dir_path = zip_dir_path
         self.doc_copy_path = doc_copy_path
 
-    def process_doc(self):
+        # Define the paths for the directories for each of the components
+        self.xml_dir_path = os.path.join(self.base_dir_path, "XML")
+        self.css_dir_path = os.path.join(self.base_dir_path, "CSS")
+        self.media_dir_path = os.path.join(self.base_dir_path, "Media")
+        self.content_dir_path = os.path.join(self.base_dir_path, "Content")
+        self.uncategorized_dir_path = os.path.join(self.base_dir_path, "Uncategorized")
+        self.rels_dir_path = os.path.join(self.base_dir_path, "RELS")
+
+    def process_doc(self, stages=()):
         """
         The process_doc function is responsible for:
             1. Copies original .docx file to base directory
-            2. Extracts the documents contents by converting it to a .zip and
-                unzipping it into "Extracted Document" directory
-            3. Calls the itemize function in order to itemize the "Extracted Document" directory
+            2. Creates separate directories for these components of the document:
+                    XML, CSS, Media, Content, RELS, and Uncatergorized
+            3. Reads every member of the document straight from the zip file in a single pass. The bytes of each
+                member are read once and shared between writing the member into the "Extracted Document" directory,
+                itemizing it and every inspection stage
+        :param stages: Objects with an inspect(file_path, data) function (e.g. ImageFinder, Searcher) that are
+            given every member of the document as it is read. Stages that also have an
+            inspect_text(file_path, text) function are given the text extracted into the Content directory
         :return: None
         """
-        # Copy the document to a new file that ends with .zip
-        shutil.copy(self.doc_path, self.zip_dir_path)
+        # Stages that are given the text extracted into the Content directory
+        self.text_stages = [stage for stage in stages if hasattr(stage, "inspect_text")]
+        # Names of the stages that their time is recorded under
+        stage_names = [type(stage).__name__ for stage in stages]
+        metrics = self.metrics
+        # The name, size and SHA-256 hash of every member of the document
+        self.parts = []
+        # The member name, path and bytes of every embedded document that is kept
+        self.embedded_docs = []
+        # The member name, path and size of every embedded document that did not fit in the embedded_budget
+        self.skipped_embedded_docs = []
+        # Number of bytes of embedded documents that can still be kept
+        self.remaining_embedded_budget = self.embedded_budget
+        # The member name and the reason of every member that was not extracted because it broke the limits
+        self.suspicious_parts = []
+        limits = self.limits
 
-        # Extract the .zip file into the "Extracted Document" directory
-        with zipfile.ZipFile(self.zip_dir_path, "r") as zip_ref:
-            zip_ref.extractall(self.extracted_dir_path)
+        # Copy the original document into the base. Embedded documents are already in their parent's output
+        if self.doc_copy_path is not None:
+            with metrics.stage("Copy"):
+                if self.doc_data is not None:  # The document's bytes are in memory so they are not read again
+                    self.writer.write(self.doc_copy_path, self.doc_data)
+                else:
+                    self.writer.copy(self.doc_path, self.doc_copy_path)
+
+        # Create the directories for each the components
+        self.writer.make_dir(self.xml_dir_path)
+        self.writer.make_dir(self.css_dir_path)
+        self.writer.make_dir(self.media_dir_path)
+        self.writer.make_dir(self.content_dir_path)
+        self.writer.make_dir(self.uncategorized_dir_path)
+        self.writer.make_dir(self.rels_dir_path)
 
-        # Remove the unneeded zip file after it has been extracted
-        os.remove(self.zip_dir_path)
+        # Open the document as a zip file. A .docx file is a zip file so it does not need to be copied to a .zip first
+        # An embedded document is opened straight from its bytes in memory
+        doc_file = io.BytesIO(self.doc_data) if self.doc_data is not None else self.doc_path
+        with zipfile.ZipFile(doc_file, "r") as zip_ref:
+            members = zip_ref.infolist()
+            # Only the first max_entries members of a document with too many members are extracted
+            if len(members) > limits.max_entries:
+                self.suspicious_parts.append(("*", "The document has " + str(len(members)) + " files which is over "
+                                              "the limit of " + str(limits.max_entries) + " files. Only the first "
+                                              + str(limits.max_entries) + " files were extracted"))
+                members = members[:limits.max_entries]
+            # Number of uncompressed bytes read from the document
+            doc_byte_count = 0
+            # Loops through every member of the document in the order they are stored
+            for member in members:
+                if member.is_dir():  # Directories are created when the files inside of them are written
+                    continue
+                # Path of the member within the "Extracted Document" directory
+                current_file_path = get_member_path(self.extracted_dir_path, member.filename)
+                if current_file_path is None:  # The member's name does not point to a valid file
+                    continue
+                # Stop extracting once the document's declared size is over the limit. zipfile never reads more
+                # than a member's declared size so the declared sizes are enough to limit the document's size
+                if doc_byte_count + member.file_size > limits.max_doc_size:
+                    self.suspicious_parts.append((member.filename, "The document's uncompressed size is over the "
+                                                  "limit of " + str(limits.max_doc_size) + " bytes. This file and "
+                                                  "the files after it were not extracted"))
+                    break
+                # Read the member's bytes once. They are shared by every step below
+                with metrics.stage("Read"):
+                    data, reason = read_member(zip_ref, member, limits)
+                    if data is None:  # The member broke a limit or could not be read
+                        self.suspicious_parts.append((member.filename, reason))
+                        continue
+                    doc_byte_count += len(data)
+                    metrics.count_read(len(data))
+                    self.parts.append({"name": member.filename, "size": len(data),
+                                       "sha256": hashlib.sha256(data).hexdigest()})
+                # Write the member into the "Extracted Document" directory
+                with metrics.stage("Extract"):
+                    self.writer.write(current_file_path, data)
+                # Itemize the member into its component's directory
+                with metrics.stage("Itemize"):
+                    self.itemize(current_file_path, data)
+                # Let every inspection stage look at the member
+                for i in range(len(stages)):
+                    with metrics.stage(stage_names[i]):
+                        stages[i].inspect(current_file_path, data)
+                # Keep the member if it is an embedded document
+                if self.embedded_budget is not None:
+                    self.find_embedded_doc(member.filename, current_file_path, data)
 
-        # Copy the original document into the base
-        shutil.copy(self.doc_path, self.doc_copy_path)
+    def find_embedded_doc(self, member_name, current_file_path, data):
+        """
+        The find_embedded_doc function is responsible for keeping a member of the document that is a zip file
+        (e.g. an embedded .docx, .xlsx, .pptx or .zip file) so it can be itemized as an embedded document.
+        The member is kept if it fits in what is left of the embedded_budget, otherwise it is skipped
 
-        # Itemize the "Extracted Document" directory
-        self.itemize()
+        :param member_name: Name of the member in the document
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param data: The member's contents as bytes
+        :return: None
+        """
+        file_type, is_image = sniff_file_type(data[:SNIFF_SIZE])
+        if file_type != "zip":
+            return
+        if len(data) <= self.remaining_embedded_budget:
+            self.embedded_docs.append((member_name, current_file_path, data))
+            self.remaining_embedded_budget -= len(data)
+        else:
+            self.skipped_embedded_docs.append((member_name, current_file_path, len(data)))
 
-    def itemize(self):
+    def itemize(self, current_file_path, data):
         """
-        The itemize function is responsible for:
-            1. Creates separate directories for these components of the document:
-                    XML, CSS, Media, Content, RELS, and Uncatergorized
-            2. Itemize the contents of the "Extracted Document" directory into the respective components directories
+        The itemize function is responsible for itemizing one member of the document into its respective
+        component's directory
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param data: The member's contents as bytes
         :return: None
         """
-        # Define the paths for the directories for each of the components
-        xml_dir_path = os.path.join(self.base_dir_path, "XML")
-        css_dir_path = os.path.join(self.base_dir_path, "CSS")
-        media_dir_path = os.path.join(self.base_dir_path, "Media")
-        content_dir_path = os.path.join(self.base_dir_path, "Content")
-        uncategorized_dir_path = os.path.join(self.base_dir_path, "Uncategorized")
-        rels_dir_path = os.path.join(self.base_dir_path, "RELS")
+        # Name of the directory that holds the member
+        current_dir_name = os.path.basename(os.path.dirname(current_file_path))
+        # Name of the member
+        file_name = os.path.basename(current_file_path)
+        # The "media" directory in the document holds certain content from the document such as images
+        if current_dir_name == "media":  # File is in the "media" directory
+            # Copy the current file into the media component's directory
+            media_file_path = os.path.join(self.media_dir_path, file_name)
+            self.writer.write(media_file_path, data)
+        else:
+            # Get the document name without file extension and the file extension
+            doc_name, file_extension = os.path.splitext(file_name)
+            # Separate the files into their respective component's directory
+            if file_extension == ".xml":  # File is an XML file
+                # Path to copy the XML file to
+                xml_file_path = os.path.join(self.xml_dir_path, file_name)
+                # Copy the XML file into the XML component's directory
+                self.writer.write(xml_file_path, data)
+                # The "word" directory in the document holds XML file that contain the user generated text
+                if current_dir_name == "word":  # File is in the "word" directory
+                    # Stream the user generated text from the XML into a .txt file within the Content
+                    # component's directory
+                    word_file_path = os.path.join(self.content_dir_path, doc_name + ".txt")
+                    with self.metrics.stage("Content"):
+                        text = self.extract_text(data, word_file_path, len(self.text_stages) > 0)
+                    for stage in self.text_stages:
+                        with self.metrics.stage(type(stage).__name__):
+                            stage.inspect_text(current_file_path, text)
+            elif file_extension == ".css":  # File is an CSS file
+                # Path to copy the CSS file to
+                css_file_path = os.path.join(self.css_dir_path, file_name)
+                # Copy the CSS file into the CSS component's directory
+                self.writer.write(css_file_path, data)
+            elif file_extension == ".rels":  # File is an RELS file
+                # Path to copy the RELS file to
+                rels_file_path = os.path.join(self.rels_dir_path, file_name)
+                # Copy the RELS file into the RELS component's directory
+                self.writer.write(rels_file_path, data)
+            else:  # File is an uncategorized file
+                # Path to copy the uncategorized file to
+                uncategorized_file_path = os.path.join(self.uncategorized_dir_path, file_name)
+                # Copy the uncategorized file into the Uncategorized component's directory
+                self.writer.write(uncategorized_file_path, data)
 
-        # Create the directories for each the components
-        os.mkdir(xml_dir_path)
-        os.mkdir(css_dir_path)
-        os.mkdir(media_dir_path)
-        os.mkdir(content_dir_path)
-        os.mkdir(uncategorized_dir_path)
-        os.mkdir(rels_dir_path)
-
-        # Loops through every directory and sub-directory that are in the "Extracted Document" directory
-        for (dir_path, dir_names, file_names) in os.walk(self.extracted_dir_path):
-            # Full path of the current directory
-            current_dir_name = os.path.basename(dir_path)
-            # For all files in the current directory
-            for file_name in file_names:
-                # Full path of the current file
-                current_file_path = os.path.join(dir_path, file_name)
-                # The "media" directory in the "Extracted Document" directory holds
-                # certain content from the document such as images
-                if current_dir_name == "media": # File is in the "media" directory
-                    # Copy the current file into the media component's directory
-                    media_file_path = os.path.join(media_dir_path, file_name)
-                    shutil.copy(current_file_path, media_file_path)
-                else:
-                    # Get the document name without file extension and the file extension
-                    doc_name, file_extension = os.path.splitext(file_name)
-                    # Separate the files into their respective component's directory
-                    if file_extension == ".xml":  # File is an XML file
-                        # Path to copy the XML file to
-                        xml_file_path = os.path.join(xml_dir_path, file_name)
-                        # Copy the XML file into the XML component's directory
-                        shutil.copy(current_file_path, xml_file_path)
-                        # The "word" directory in the "Extracted Document" directory holds
-                        # XML file that contain the user generated text
-                        if current_dir_name == "word": # File is in the "word" directory
-                            # Use XSLT to retrieve the user generated text from the XML
-                            dom = et.parse(current_file_path)
-                            # Use in-line XSLT instead of file so the script can run with one less dependency
-                            xslt = et.fromstring(
-                                "<xsl:stylesheet version=\"1.0\" xmlns:xsl=\"http://www.w3.org/1999/XSL/Transform\">\
-                                <xsl:template match=\"*\"><xsl:value-of select=\".\"/></xsl:template></xsl:stylesheet>")
-                            transform = et.XSLT(xslt)
-                            new_dom = transform(dom)
-                            # Remove the XML header from the text
-                            output = str(new_dom).replace("<?xml version=\"1.0\"?>", "")
-                            # Simple way of adding back newline characters to the text
-                            # Adds a newline between a lowercase and uppercase letter. This does not work in all cases
-                            for i in range(len(output) - 1):
-                                current_char = output[i]
-                                next_char = output[i + 1]
-                                if (current_char.islower() and next_char.isupper()) \
-                                        or (current_char.isdigit() and next_char.isupper()):
-                                    output = output[:i + 1] + "\n" + output[i + 1:]
-                            # Write the contents to a .txt file within the Content component's directory
-                            word_file_path = os.path.join(content_dir_path, doc_name + ".txt")
-                            text_file = open(word_file_path, "w")
-                            text_file.write(output)
-                            text_file.close()
-                    elif file_extension == ".css":  # File is an CSS file
-                        # Path to copy the CSS file to
-                        css_file_path = os.path.join(css_dir_path, file_name)
-                        # Copy the CSS file into the CSS component's directory
-                        shutil.copy(current_file_path, css_file_path)
-                    elif file_extension == ".rels":  # File is an RELS file
-                        # Path to copy the RELS file to
-                        rels_file_path = os.path.join(rels_dir_path, file_name)
-                        # Copy the RELS file into the RELS component's directory
-                        shutil.copy(current_file_path, rels_file_path)
-                    else: # File is an uncategorized file
-                        # Path to copy the uncategorized file to
-                        uncategorized_file_path = os.path.join(uncategorized_dir_path, file_name)
-                        # Copy the uncategorized file into the Uncategorized component's directory
-                        shutil.copy(current_file_path, uncategorized_file_path)
+    def extract_text(self, data, text_file_path, keep_text=False):
+        """
+        The extract_text function is responsible for converting a WordprocessingML XML file from the "word"
+        directory into plain text and writing it to a .txt file
+
+        The XML is read with lxml's iterparse so the whole DOM is never loaded. Elements are cleared as soon as
+        they have been handled which keeps the memory used bounded, and the text is written to the .txt file as
+        it is found so the time taken is linear in the size of the XML. The text is written as UTF-8.
+        Text is separated on the document's real boundaries:
+            * Paragraphs (w:p) end with a newline
+            * Tabs (w:tab) and breaks (w:br, w:cr) in a run are written as a tab and a newline
+            * Table cells (w:tc) are separated by tabs and table rows (w:tr) end with a newline. Empty cells keep
+                their tab so the columns of a row stay in place
+        Deleted text from tracked changes (w:delText) is included as it is useful in an investigation. It is
+        separated from the text around it by a space so deleted and inserted words are not joined together
+
+        :param data: The XML file's contents as bytes
+        :param text_file_path: Path of the .txt file to write the text to
+        :param keep_text: True to also return the text that was written
+        :return: The text that was written if keep_text is True, otherwise None
+        """
+        # Tags of the elements that the text is extracted from or that separate the text
+        text_tags = (W_TEXT_TAG, W_DELETED_TEXT_TAG)
+        break_tags = (W_BREAK_TAG, W_CARRIAGE_RETURN_TAG)
+        tags = text_tags + break_tags + (W_TAB_TAG, W_PARAGRAPH_TAG, W_TABLE_CELL_TAG, W_TABLE_ROW_TAG)
+        # Number of table cells the parser is currently in
+        cell_depth = 0
+        # Separator that is written before the next text. Used to separate paragraphs and cells in a table row
+        separator = ""
+        # True if the last text written on the current line was deleted text, False if it was not, and None if
+        # nothing has been written since the last separator
+        last_text_deleted = None
+        import lxml.etree as et  # Streams the text out of the XML file
+        # Pieces of the text that was written if the text is kept
+        text_pieces = [] if keep_text else None
+        # Number of bytes written to the .txt file
+        written_byte_count = 0
+        with self.writer.open(text_file_path) as text_file:
+
+            def write_text(text):
+                # Write a piece of the text to the .txt file and keep it if needed
+                nonlocal written_byte_count
+                encoded_text = text.encode("utf-8")
+                text_file.write(encoded_text)
+                written_byte_count += len(encoded_text)
+                if text_pieces is not None:
+                    text_pieces.append(text)
+
+            # recover=True lets the text be extracted from XML files that are damaged
+            for event, element in et.iterparse(io.BytesIO(data), events=("start", "end"), tag=tags,
+                                               recover=True, huge_tree=True):
+                tag = element.tag
+                if event == "start":
+                    if tag == W_TABLE_CELL_TAG:  # Entering a table cell
+                        cell_depth += 1
+                    continue
+                if tag in text_tags:  # Text of a run
+                    if element.text:
+                        is_deleted = tag == W_DELETED_TEXT_TAG
+                        if separator == "" and last_text_deleted is not None and last_text_deleted != is_deleted:
+                            separator = " "  # Deleted text next to the text that replaced it
+                        write_text(separator + element.text)
+                        separator = ""
+                        last_text_deleted = is_deleted
+                elif tag == W_TAB_TAG:
+                    # Tabs are also used to define tab stops in a paragraph's properties. Only tabs in runs are text
+                    if element.getparent() is not None and element.getparent().tag == W_RUN_TAG:
+                        write_text(separator + "\t")
+                        separator = ""
+                        last_text_deleted = None
+                elif tag in break_tags:  # Line break in a run
+                    write_text(separator + "\n")
+                    separator = ""
+                    last_text_deleted = None
+                elif tag == W_PARAGRAPH_TAG:
+                    if cell_depth > 0:  # Paragraphs in a table cell are kept on the row's line
+                        if "\t" not in separator:  # An empty paragraph does not replace the tabs of empty cells
+                            separator = " "
+                    else:
+                        write_text("\n")
+                        separator = ""
+                    last_text_deleted = None
+                elif tag == W_TABLE_CELL_TAG:  # Cells in a row are separated by tabs
+                    cell_depth -= 1
+                    # The tabs of empty cells are still pending, and replace the separator of the cell's paragraphs
+                    separator = "\t" * (separator.count("\t") + 1)
+                    last_text_deleted = None
+                elif tag == W_TABLE_ROW_TAG:  # Each row of a table is on its own line
+                    write_text("\n")
+                    separator = ""
+                    last_text_deleted = None
+                # Free the memory used by the element and the elements before it
+                # since they are no longer needed
+                element.clear()
+                while element.getprevious() is not None:
+                    del element.getparent()[0]
+        self.metrics.count_write(written_byte_count)
+        if text_pieces is not None:
+            return "".join(text_pieces)
+        return None
 
 
 class ImageFinder:
 
-    def __init__(self, base_dir_path, extracted_dir_path):
+    def __init__(self, base_dir_path, writer):
         """
-        The ImageFinder class is responsible for finding images that have the
-        wrong extension that may be hidden in the document
+        The ImageFinder class is responsible for finding images and other files (e.g. PDFs, zip files, executables,
+        and OLE files) that have the wrong extension that may be hidden in the document
+
+        The ImageFinder is an inspection stage of the Itemizer. It is given every member of the document through
+        the inspect function while the document is being itemized
 
         :param base_dir_path: Path to the base directory that holds all of the output of this script
-        :param extracted_dir_path: Path to the "Extracted Document" directory in the base directory
+        :param writer: The FileWriter used to write all of the output files
         """
+        self.writer = writer
         self.hidden_images_dir_path = os.path.join(base_dir_path, "Hidden Images")
-        self.extracted_dir_path = extracted_dir_path
+        self.hidden_files_dir_path = os.path.join(base_dir_path, "Hidden Files")
+        # Create lists to hold all the information about the hidden images and the hidden files that are not images
+        self.hidden_image_file_paths = []
+        self.hidden_file_paths = []
 
-    def get_hidden_images(self):
+    def inspect(self, current_file_path, data):
+        """
+        The inspect function is responsible for checking if one member of the document is an image
+        or other known type of file that is using the wrong extension
+
+        Files are checked using the sniff_file_type function which only looks at the first SNIFF_SIZE bytes
+        of the file to get the files' actual types
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param data: The member's contents as bytes
+        :return: None
         """
-        The get_hidden_images function is responsible for finding images that have the wrong extension that may be
-        hidden in the document and returning the information about these files.
+        file_name = os.path.basename(current_file_path)
+        # Get the files current name and extension
+        base_file_name, file_extension = os.path.splitext(file_name)
+        # Get the file type from the file's header. None is returned for unknown files
+        file_type, is_image = sniff_file_type(data[:SNIFF_SIZE])
+        # Check if the file is a known type of file and is using the wrong extension
+        if file_type is not None and file_extension[1:].lower() not in FILE_TYPE_EXTENSIONS[file_type]:
+            if is_image:  # Hidden images are put in the "Hidden Images" directory
+                hidden_dir_path = self.hidden_images_dir_path
+                hidden_file_paths = self.hidden_image_file_paths
+            else:  # Other hidden files are put in the "Hidden Files" directory
+                hidden_dir_path = self.hidden_files_dir_path
+                hidden_file_paths = self.hidden_file_paths
+            # Create a directory for the hidden files if it does not already exist
+            self.writer.make_dir(hidden_dir_path)
+            # Copy the hidden file to the hidden files directory
+            hidden_file_path = os.path.join(hidden_dir_path, file_name)
+            self.writer.write(hidden_file_path, data)
+            # Copy the hidden file to the hidden files directory but add the proper extension
+            correct_file_path = os.path.join(hidden_dir_path,
+                                             base_file_name + "." + FILE_TYPE_EXTENSIONS[file_type][0])
+            self.writer.write(correct_file_path, data)
+            # Store the hidden file's original path, the copies' paths, and its type into the hidden files list
+            hidden_file_paths.append([current_file_path, hidden_file_path, correct_file_path, file_type])
 
-        Files are checked using the "imghdr" library to get the files' actual types
+    def get_hidden_images(self):
+        """
+        The get_hidden_images function is responsible for returning the information about the images that have
+        the wrong extension that were found while the document was being itemized
 
         :return: A list containing information about hidden image files
-        (holds the original path, a path to a copy of the file in the "Images" directory,
-         and a path to a copy of the file in the "Images" directory with the proper extension
-        """
-        # Create a list to hold all the information about the hidden images
-        hidden_image_file_paths = []
-        # Loops through every directory and sub-directory that are in the "Extracted Document" directory
-        for (dir_path, dir_names, file_names) in os.walk(self.extracted_dir_path):
-            # For all files in the current directory
-            for file_name in file_names:
-                current_file_path = os.path.join(dir_path, file_name)
-                # Get the files current name and extension
-                base_file_name, file_extension = os.path.splitext(file_name)
-                # Get the file type according to imghdr. None is returned for non-images
-                file_type = imghdr.what(current_file_path)
-                # Check if the file is an image and is using the wrong extension
-                if file_type is not None and not file_extension.endswith(file_type):
-                    # Create a directory for the hidden images if it does not already exist
-                    if not os.path.isdir(self.hidden_images_dir_path):
-                        os.mkdir(self.hidden_images_dir_path)
-                    # Copy the hidden image to the "Hidden Images" directory
-                    hidden_image_file_path = os.path.join(self.hidden_images_dir_path, file_name)
-                    shutil.copy(current_file_path, hidden_image_file_path)
-                    # Copy the hidden image to the "Hidden Images" directory but add the proper extension
-                    image_file_path = os.path.join(self.hidden_images_dir_path, base_file_name + "." + file_type)
-                    shutil.copy(current_file_path, image_file_path)
-                    # Store the hidden image's original path and the copies' paths into the hidden images list
-                    hidden_image_file_paths.append([current_file_path, hidden_image_file_path, image_file_path])
+        (holds the original path, a path to a copy of the file in the "Hidden Images" directory,
+         a path to a copy of the file in the "Hidden Images" directory with the proper extension,
+         and the image's actual type)
+        """
         # Return a list contain all of the information about hidden images
-        return hidden_image_file_paths
+        return self.hidden_image_file_paths
+
+    def get_hidden_files(self):
+        """
+        The get_hidden_files function is responsible for returning the information about the files that are not
+        images that have the wrong extension that were found while the document was being itemized
+
+        :return: A list containing information about hidden files
+        (holds the original path, a path to a copy of the file in the "Hidden Files" directory,
+         a path to a copy of the file in the "Hidden Files" directory with the proper extension,
+         and the file's actual type)
+        """
+        # Return a list contain all of the information about hidden files
+        return self.hidden_file_paths
+
+
+class PatternSet:
+
+    def __init__(self, patterns):
+        """
+        The PatternSet class is responsible for matching many regex patterns against some text or bytes in a
+        single scan instead of scanning once for every pattern
+
+        The patterns are combined into one alternation where each pattern is wrapped in a named group so the
+        pattern that made each match is known. Every pattern is tried at every position the alternation scans
+        past, but inside a match the other patterns are not tried at all (e.g. "ab" is not found inside a match of
+        "abc"), so the offsets of the alternation can miss matches that overlap another pattern's match. Only the
+        positions inside the matches need to be checked: each pattern is tried at those positions, and a pattern
+        that matches at one of them is scanned again on its own so its offsets are the same as scanning for it
+        alone. Text without any matches is only scanned once, and text with a few short matches is only scanned
+        again for the patterns that overlap them. Patterns that can not be combined (they use backreferences or
+        global flags) are scanned on their own.
+
+        :param patterns: The regex patterns to match with as str or bytes
+        """
+        self.patterns = patterns
+        # Compiled alternations of the combined patterns, by the indexes of the patterns in them
+        self.compiled_alternations = {}
+        # Indexes of the patterns that are combined into an alternation and of the patterns scanned on their own
+        self.combined_indexes = []
+        self.separate_indexes = []
+        for i in range(len(patterns)):
+            pattern = patterns[i] if isinstance(patterns[i], str) else patterns[i].decode("latin-1")
+            if re.search(r"\\[1-9]|\(\?P=|\(\?[aiLmsux]+\)", pattern):
+                self.separate_indexes.append(i)
+            else:
+                self.combined_indexes.append(i)
+        # Patterns that use the same group names can not be combined, in which case every pattern is scanned on its own
+        try:
+            self.get_alternation(self.combined_indexes)
+        except re.error:
+            self.separate_indexes = list(range(len(patterns)))
+            self.combined_indexes = []
+        # Compile every separate pattern once. Combined patterns are only compiled on their own when they overlap
+        # another pattern's match
+        self.separate_patterns = [re.compile(patterns[i]) for i in self.separate_indexes]
+        self.compiled_patterns = {}
+
+    def get_alternation(self, indexes):
+        """
+        The get_alternation function is responsible for compiling the alternation of some of the combined patterns.
+        Each alternation is only compiled once
+
+        :param indexes: Indexes of the patterns in the alternation
+        :return: The compiled alternation
+        """
+        indexes = tuple(indexes)
+        if len(indexes) == 0:
+            return None
+        if indexes not in self.compiled_alternations:
+            separator = "|" if isinstance(self.patterns[0], str) else b"|"
+            groups = []
+            for i in indexes:
+                if isinstance(self.patterns[i], str):
+                    groups.append("(?P<pattern" + str(i) + ">" + self.patterns[i] + ")")
+                else:
+                    groups.append(b"(?P<pattern" + str(i).encode() + b">" + self.patterns[i] + b")")
+            self.compiled_alternations[indexes] = re.compile(separator.join(groups))
+        return self.compiled_alternations[indexes]
+
+    def get_pattern(self, i):
+        """
+        The get_pattern function is responsible for compiling one of the combined patterns on its own. Each pattern
+        is only compiled once
+
+        :param i: Index of the pattern
+        :return: The compiled pattern
+        """
+        if i not in self.compiled_patterns:
+            self.compiled_patterns[i] = re.compile(self.patterns[i])
+        return self.compiled_patterns[i]
+
+    def find(self, data):
+        """
+        The find function is responsible for finding which patterns match some text or bytes and where. The offsets
+        of each pattern are the same as the offsets of scanning for that pattern alone with finditer
+
+        :param data: The text or bytes to match the patterns with
+        :return: A dictionary of the index of each pattern that matched to the offsets of its matches
+        """
+        found = {}
+        # Positions inside the matches of the alternation, where only some of the patterns were tried
+        overlapped_positions = set()
+        if len(self.combined_indexes) > 0:
+            for match in self.get_alternation(self.combined_indexes).finditer(data):
+                found.setdefault(int(match.lastgroup[len("pattern"):]), []).append(match.start())
+                overlapped_positions.update(range(match.start(), max(match.end(), match.start() + 1)))
+        if len(overlapped_positions) > 0:
+            overlapped_positions = sorted(overlapped_positions)
+            # Trying every pattern at every position inside long matches is slower than scanning for each pattern
+            rescan_all = len(overlapped_positions) * len(self.combined_indexes) > len(data)
+            for i in self.combined_indexes:
+                pattern = self.get_pattern(i)
+                # A match of the pattern itself at the start of its own match of the alternation is the same match
+                own_offsets = set(found.get(i, ()))
+                if rescan_all or any(position not in own_offsets and pattern.match(data, position)
+                                     for position in overlapped_positions):
+                    offsets = [match.start() for match in pattern.finditer(data)]
+                    if len(offsets) > 0:
+                        found[i] = offsets
+        # Scan with the patterns that could not be combined
+        for i in range(len(self.separate_indexes)):
+            offsets = [match.start() for match in self.separate_patterns[i].finditer(data)]
+            if len(offsets) > 0:
+                found[self.separate_indexes[i]] = offsets
+        return found
+
+
+class ContentPatternSet:
+
+    def __init__(self, search_terms):
+        """
+        The ContentPatternSet class is responsible for matching the search terms against a file's contents and
+        getting the byte offsets of the matches, without making a decoded copy of the contents unless the search
+        terms need their text meaning
+
+        Contents that are valid UTF-8 and not ASCII (e.g. XML with non-ASCII text) are decoded and matched as text
+        so "\\w", "[é]" and "(?i)" match non-ASCII letters. Any other contents (ASCII text and binary files such as
+        media, vbaProject.bin, and embedded OLE objects) are scanned in place as bytes with the search terms that
+        are ASCII and compile as bytes regexes, which match ASCII contents the same way as text regexes (except
+        that "\\s" does not match the \\x1c-\\x1f separators). In binary contents "\\w" and "(?i)" only match ASCII
+        letters. Only the search terms that can not be bytes regexes (e.g. non-ASCII terms or "\\N{...}" escapes)
+        are matched with a Latin-1 copy of the contents, which keeps every byte as one character
+
+        :param search_terms: The regex terms to match with
+        """
+        self.text_patterns = PatternSet(search_terms)
+        # Indexes of the search terms that are also compiled as bytes regexes and of the search terms that are not
+        self.bytes_indexes = []
+        self.latin1_indexes = []
+        for i in range(len(search_terms)):
+            try:
+                if not search_terms[i].isascii():
+                    raise re.error("Non-ASCII search term")
+                re.compile(search_terms[i].encode("ascii"))
+                self.bytes_indexes.append(i)
+            except re.error:
+                self.latin1_indexes.append(i)
+        self.bytes_patterns = PatternSet([search_terms[i].encode("ascii") for i in self.bytes_indexes])
+        self.latin1_patterns = PatternSet([search_terms[i] for i in self.latin1_indexes])
+
+    def find(self, data, max_offsets=None):
+        """
+        The find function is responsible for finding which search terms match a file's contents and the byte
+        offset of every match
+
+        :param data: The file's contents as bytes
+        :param max_offsets: The number of offsets to keep for each search term, or None to keep every offset
+        :return: A dictionary of the index of each search term that matched to a list holding the byte offsets of
+        its first max_offsets matches and the number of matches
+        """
+        found = {}
+        text = None
+        if not data.isascii():
+            try:
+                text = data.decode("utf-8")
+            except UnicodeDecodeError:
+                pass
+        if text is not None:
+            # Character offsets in the decoded text are turned into byte offsets
+            for i, offsets in self.text_patterns.find(text).items():
+                found[i] = [get_byte_offsets(text, offsets[:max_offsets]), len(offsets)]
+            return found
+        # The offsets of the bytes regexes and of the Latin-1 text are already byte offsets
+        for patterns, indexes in ((self.bytes_patterns, self.bytes_indexes),
+                                  (self.latin1_patterns, self.latin1_indexes)):
+            if len(indexes) == 0:
+                continue
+            contents = data if patterns is self.bytes_patterns else data.decode("latin-1")
+            for i, offsets in patterns.find(contents).items():
+                found[indexes[i]] = [offsets[:max_offsets], len(offsets)]
+        return found
 
 
 class Searcher:
 
-    def __init__(self, base_dir_path, extracted_dir_path, search_term):
+    def __init__(self, base_dir_path, search_terms, writer):
         """
         The Searcher class is responsible for finding all file's that
-        contain the search term in their name or in their contents
+        contain the search terms in their name or in their contents
+
+        The Searcher is an inspection stage of the Itemizer. It is given every member of the document through
+        the inspect function while the document is being itemized
 
-        Creates a .txt file contain the search term in the "Search" directory in the base directory
+        All of the search terms are matched in a single scan of each file's name using a PatternSet and in a
+        single scan of each file's contents using a ContentPatternSet. The search terms are matched as text regexes
+        in file names and in UTF-8 text (e.g. "\\w", "[é]" and "(?i)" match non-ASCII letters). The contents of
+        every file are searched including binary files (e.g. media, vbaProject.bin, and embedded OLE objects), which
+        are scanned as bytes, and the offsets of the matches are byte offsets in the file. Only the first
+        MAX_RECORDED_OFFSETS offsets of each file are kept along with the number of matches
+
+        With one search term a .txt file contain the search term is created in the "Search" directory in the base
+        directory and matching files are copied into the "Search" directory.
+        With multiple search terms (a watchlist) each search term has its own "Search/Pattern {Number}" directory
+        that is created the first time the search term is found, and a "watchlist.txt" file listing all of the
+        search terms by number is created in the "Search" directory
 
         :param base_dir_path: Path to the base directory that holds all of the output of this script
-        :param extracted_dir_path: Path to the "Extracted Document" directory in the base directory
-        :param search_term: Path to the directory to put all files that are related to the search term
+        :param search_terms: The regex terms to match with
+        :param writer: The FileWriter used to write all of the output files
         """
+        self.writer = writer
         self.search_dir_path = os.path.join(base_dir_path, "Search")
-        self.unreadable_dir_path = os.path.join(self.search_dir_path, "Unreadable")
-        self.extracted_dir_path = extracted_dir_path
-        self.search_term = search_term
+        self.search_terms = search_terms
+        # Compile the search terms once for the file names and once for the file contents
+        self.patterns = PatternSet(search_terms)
+        self.content_patterns = ContentPatternSet(search_terms)
+
+        # Create lists to hold all the information for files related to the search feature for each search term
+        self.found_file_names = [[] for search_term in search_terms]
+        self.found_file_contents = [[] for search_term in search_terms]
+        self.search_file_paths = [[] for search_term in search_terms]
 
         # Create a "Search" directory
-        os.mkdir(self.search_dir_path)
-        # Create a file named "search_term.txt" in the "Search" and write the search_term to it
-        search_term_file = os.path.join(self.search_dir_path, "search_term.txt")
-        file = open(search_term_file, "w")
-        file.write(search_term)
-        file.close()
+        self.writer.make_dir(self.search_dir_path)
+        if len(search_terms) == 1:
+            # Create a file named "search_term.txt" in the "Search" and write the search_term to it
+            self.write_search_term_file(self.search_dir_path, search_terms[0])
+        else:
+            # Create a file named "watchlist.txt" in the "Search" and write every search term and its number to it
+            watchlist_file = os.path.join(self.search_dir_path, "watchlist.txt")
+            watchlist = "".join(str(i + 1) + ": " + search_terms[i] + "\n" for i in range(len(search_terms)))
+            self.writer.write(watchlist_file, watchlist.encode("utf-8"))
+
+    def get_search_term_dir_path(self, search_term_index):
+        """
+        The get_search_term_dir_path function is responsible for getting the directory that holds the files
+        related to a search term. The directory is created if it does not already exist
+
+        :param search_term_index: Index of the search term
+        :return: Path to the directory for the search term
+        """
+        if len(self.search_terms) == 1:
+            return self.search_dir_path
+        search_term_dir_path = os.path.join(self.search_dir_path, "Pattern " + str(search_term_index + 1))
+        if len(self.search_file_paths[search_term_index]) == 0:
+            # Create the directory and a file named "search_term.txt" in it with the search_term
+            self.writer.make_dir(search_term_dir_path)
+            self.write_search_term_file(search_term_dir_path, self.search_terms[search_term_index])
+        return search_term_dir_path
+
+    def write_search_term_file(self, search_term_dir_path, search_term):
+        """
+        The write_search_term_file function is responsible for creating a file named "search_term.txt"
+        that holds a search term
+
+        :param search_term_dir_path: Path to the directory to create the file in
+        :param search_term: The search term to write to the file
+        :return: None
+        """
+        search_term_file = os.path.join(search_term_dir_path, "search_term.txt")
+        self.writer.write(search_term_file, search_term.encode("utf-8"))
+
+    def inspect(self, current_file_path, data):
+        """
+        The inspect function is responsible for checking if one member of the document
+        contains any of the search terms in its name or in its contents. The byte offset of every match
+        in the member's contents is recorded
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param data: The member's contents as bytes
+        :return: None
+        """
+        file_name = os.path.basename(current_file_path)
+        # Find the search terms that match the current file's name
+        file_name_matches = self.patterns.find(file_name)
+        # Find the search terms that match the current file's contents, the byte offsets of the first matches and
+        # the number of matches
+        file_contents_matches = self.content_patterns.find(data, MAX_RECORDED_OFFSETS)
+        for i in set(file_name_matches) | set(file_contents_matches):
+            if i in file_name_matches:  # Check if the file's name matches the regex
+                # Add the file to the list of matching on file names
+                self.found_file_names[i].append(current_file_path)
+            if i in file_contents_matches:  # Check if the file's contents matches the regex
+                # Add the current file, the byte offsets of the first matches, and the number of matches to the list
+                # of matching on file contents
+                offsets, offset_count = file_contents_matches[i]
+                self.found_file_contents[i].append([current_file_path, offsets, offset_count])
+            # Path to copy the current file to into the search term's directory
+            search_file_path = os.path.join(self.get_search_term_dir_path(i), file_name)
+            if search_file_path not in self.search_file_paths[i]:
+                # If the file has not been copied to the search term's directory
+                # Copy the current file to the search term's directory
+                self.search_file_paths[i].append(search_file_path)
+                self.writer.write(search_file_path, data)
 
     def find_search_term(self):
+        """
+        The find_search_term function is responsible for returning the information about all file's that
+        contain the search terms in their name or in their contents that were found while the document was
+        being itemized
 
+        :return: A list containing information about files that contain each search term in their name or in
+        their contents (holds the search term,
+        the original paths of files with matching names,
+        the original paths of files with matching contents, the byte offsets of the first MAX_RECORDED_OFFSETS
+        matches and the number of matches, and paths to a copies of the files in the search term's directory)
         """
-        The find_search_term function is responsible for finding all file's that
-        contain the search term in their name or in their contents
-
-        Files are checked using the "re" library to get the files' actual types
-
-        :return: A list containing information about files that
-        contain the search term in their name or in their contents
-        (holds the original paths,
-        paths to a copies of the files in the "Search" directory,
-        paths to files that could not be read,
-        and paths to a copies of the unreadable file in the "Search/Unreadable" directory)
-        """
-        # Create lists to hold all the information for files related to the search feature
-        found_file_names = []
-        found_file_contents = []
-        unreadable_file_contents = []
-        search_file_paths = []
-        unreadable_file_paths = []
-        # Loops through every directory and sub-directory that are in the "Extracted Document" directory
-        for (dir_path, dir_names, file_names) in os.walk(self.extracted_dir_path):
-            # For all files in the current directory
-            for file_name in file_names:
-                # Path to the current file
-                current_file_path = os.path.join(dir_path, file_name)
-                # Path to copy the current file to into the "Search" directory in the base folder
-                search_file_path = os.path.join(self.search_dir_path, file_name)
-                # Use "re" library to perform regex match on the current file's name
-                file_name_match = re.search(self.search_term, file_name)
-                if file_name_match:  # Check if the file's name matches the regex
-                    found_file_names.append(current_file_path)  # Add the file to the list of matching on file names
-                    if not os.path.isfile(search_file_path):
-                        # If the file has not been copied to the "Search" directory
-                        # Copy the current file to the search directory
-                        search_file_paths.append(search_file_path)
-                        shutil.copy(current_file_path, search_file_path)
-                try:
-                    # Try to read contents of the current file
-                    file = open(current_file_path, "r")
-                    file_contents = file.read()
-                    # Use "re" library to perform regex match on the current file's contents
-                    file_contents_match = re.search(self.search_term, file_contents)
-                    if file_contents_match:  # Check if the file's contents matches the regex
-                        # Add the current file to the list of matching on file contents
-                        found_file_contents.append(current_file_path)
-                        if not os.path.isfile(search_file_path):
-                            # If the current file has not been copied to the "Search" directory then
-                            # copy the current file to the search directory
-                            search_file_paths.append(search_file_path)
-                            shutil.copy(current_file_path, search_file_path)
-                    file.close()
-                except UnicodeDecodeError:  # Except when the file is unreadable
-                    if not os.path.isdir(self.unreadable_dir_path):
-                        # Create "Unreadable" directory if it does not exist in the "Search" directory
-                        os.mkdir(self.unreadable_dir_path)
-                    if not os.path.isfile(search_file_path):
-                        unreadable_file_path = os.path.join(self.unreadable_dir_path, file_name)
-                        # Add the current file to the list of files with unreadable contents
-                        unreadable_file_contents.append(current_file_path)
-                        # Add the path to the copy of the current file to the list of copies of unreadable files
-                        unreadable_file_paths.append(unreadable_file_path)
-                        # Copy the current file to the "Unreadable" directory
-                        shutil.copy(current_file_path, unreadable_file_path)
-        # Return the needed information about files related to the search_term
-        return found_file_names, found_file_contents, unreadable_file_contents, search_file_paths, unreadable_file_paths
+        # Return the needed information about files related to each search_term
+        return [[self.search_terms[i], self.found_file_names[i], self.found_file_contents[i],
+                 self.search_file_paths[i]] for i in range(len(self.search_terms))]
 
 
-def get_time_stamp():
+def get_search_keyword(search_term):
     """
-    The get_time_stamp function is a helper function used to get the current time stamp as a string
-    Format: %Y%m%d-%H%M%S
+    The get_search_keyword function is a helper function that is used to find a keyword that every match of a regex
+    search term contains, so the search index only has to look at the members that contain the keyword. The keyword
+    is the longest run of literal characters at the top level of the regex (e.g. "invoice" in "invoice\\d+\\.pdf").
+    No keyword is used for case-insensitive or verbose regexes, or for regexes with alternatives at the top level
 
-    :return: The current time stamp as a string (Format: %Y%m%d-%H%M%S)
+    The regex is read one token at a time. Groups and character classes are skipped, and any token that is not a
+    literal character ends the run of literal characters. A literal character followed by a quantifier that lets it
+    be left out ends the run before it
+
+    :param search_term: The regex term or keyword to match with
+    :return: The keyword or None if the regex has no run of at least 3 literal characters
     """
-    return time.strftime("%Y%m%d-%H%M%S")
+    keyword = ""
+    literals = ""
+    i = 0
+    while i < len(search_term):
+        char = search_term[i]
+        quantifier = KEYWORD_QUANTIFIER_PATTERN.match(search_term, i)
+        if quantifier is not None:
+            # The last literal character is only part of the run if it has to be matched at least once
+            if len(literals) > 0 and not quantifier.group().startswith("+"):
+                literals = literals[:-1]
+            if len(literals) > len(keyword):
+                keyword = literals
+            literals = ""
+            i = quantifier.end()
+            continue
+        if char == "\\":
+            escaped = search_term[i + 1:i + 2]
+            if escaped != "" and not (escaped.isascii() and escaped.isalnum()):
+                # An escaped punctuation character (e.g. "\\.") is a literal character
+                char = escaped
+                i += 1
+            else:
+                char = None
+                i = KEYWORD_ESCAPE_PATTERN.match(search_term, i).end() - 1
+        elif char == "[":
+            char = None
+            i = KEYWORD_CLASS_PATTERN.match(search_term, i).end() - 1
+        elif char == "(":
+            flags = re.match(r"\(\?([aiLmsux]+)\)", search_term[i:])
+            if flags is not None and ("i" in flags.group(1) or "x" in flags.group(1)):
+                return None
+            # Skip to the end of the group, along with any groups and character classes in it
+            char = None
+            depth = 0
+            while i < len(search_term):
+                if search_term[i] == "\\":
+                    i += 1
+                elif search_term[i] == "[":
+                    i = KEYWORD_CLASS_PATTERN.match(search_term, i).end() - 1
+                elif search_term[i] == "(":
+                    depth += 1
+                elif search_term[i] == ")":
+                    depth -= 1
+                    if depth == 0:
+                        break
+                i += 1
+        elif char == "|":
+            return None
+        elif char in ".^$)":
+            char = None
+        # The index has no control characters in the text of binary members so they end the run
+        if char is None or ord(char) < 0x20 or ord(char) == 0x7f:
+            if len(literals) > len(keyword):
+                keyword = literals
+            literals = ""
+        else:
+            literals += char
+        i += 1
+    if len(literals) > len(keyword):
+        keyword = literals
+    return keyword if len(keyword) >= 3 else None
 
 
-def get_paths(doc_file_path):
+def decode_contents(data):
     """
-    The get_paths function is a helper function that is used to get the paths of directories
-    that will be used throughout the script. All of these directories are based around the doc_file_path
+    The decode_contents function is a helper function that is used to get the text of a file's contents for the
+    search index. A file that is valid UTF-8 (which every ASCII file is) is decoded as UTF-8. Any other file (e.g.
+    media and other binary files) is decoded as Latin-1, which keeps every byte as one character
 
-    :param doc_file_path: Path to the original .docx file
-    :return:    1. base_dir_path: Path to use for the base directory for the output files of this script
-                2. extracted_dir_path: Path to use for the "Extracted Document" directory that will be in the base
-                directory. This directory contains the unitemized files from unzipping the copy .docx file.
-                3. zip_dir_path: Path to create the .zip file that is a copy of the .docx file
-                4. doc_copy_path: Path to copy the original .docx file. This path is within the base directory.
-                5. log_file_path: Path to create the log file
+    :param data: The file's contents as bytes
+    :return:    1. text: The text of the contents
+                2. is_utf8: True if the text was decoded as UTF-8 and has non-ASCII characters, in which case the
+                offsets of the matches are character offsets that get_byte_offsets turns into byte offsets
     """
-    file_name = os.path.basename(doc_file_path)  # Get the document's file name from the path
-    dir_path = os.path.dirname(doc_file_path)  # Get the path of the directory that contains the document
-    doc_name = os.path.splitext(file_name)[0]  # Get the document's name without the extension
+    if data.isascii():
+        return data.decode("ascii"), False
+    try:
+        return data.decode("utf-8"), True
+    except UnicodeDecodeError:
+        return data.decode("latin-1"), False
 
-    time_stamp = get_time_stamp()  # Get the current time stamp as a string
 
-    # Create the base directory name, "Extracted Directory" name, zip directory name, and log file name
-    base_dir_name = doc_name + "_Itemized(" + time_stamp + ")"
-    extracted_dir_name = "Extracted Document"
-    zip_dir_name = base_dir_name + ".zip"
-    log_file_name = "log.txt"
+def get_byte_offsets(text, offsets):
+    """
+    The get_byte_offsets function is a helper function that is used to turn the character offsets of matches in
+    text that was decoded from UTF-8 into byte offsets in the UTF-8 bytes. Only the text between the offsets is
+    encoded again
 
-    # Create the base directory path, "Extracted Directory" path,
-    # zip directory path, document copy path, and log file path
-    base_dir_path = os.path.join(dir_path, base_dir_name)
-    extracted_dir_path = os.path.join(base_dir_path, extracted_dir_name)
-    zip_dir_path = os.path.join(dir_path, zip_dir_name)
-    doc_copy_path = os.path.join(base_dir_path, file_name)
-    log_file_path = os.path.join(base_dir_path, log_file_name)
+    :param text: The text that was decoded from UTF-8
+    :param offsets: The character offsets in increasing order
+    :return: The byte offsets
+    """
+    byte_offsets = []
+    previous_offset = 0
+    previous_byte_offset = 0
+    for offset in offsets:
+        previous_byte_offset += len(text[previous_offset:offset].encode("utf-8"))
+        previous_offset = offset
+        byte_offsets.append(previous_byte_offset)
+    return byte_offsets
 
-    # Create the base directory
-    os.mkdir(base_dir_path)
 
-    # Return the paths
-    return base_dir_path, extracted_dir_path, zip_dir_path, doc_copy_path, log_file_path
+def sniff_file_type(header):
+    """
+    The sniff_file_type function is a helper function that is used to get the actual type of a file from the
+    first bytes of the file. The header is checked against the signatures in FILE_SIGNATURES and a few
+    formats that need more than a fixed signature (BMP, executables, WebP, HEIC/AVIF, EMF, and SVG)
+
+    :param header: The first SNIFF_SIZE bytes of the file
+    :return:    1. file_type: The file's actual type (a key of FILE_TYPE_EXTENSIONS) or None if it is unknown
+                2. is_image: True if the file is an image
+    """
+    for file_type, is_image, offset, signature in FILE_SIGNATURES:
+        if header.startswith(signature, offset):
+            return file_type, is_image
+    # BMP files start with "BM" followed by a bitmap header that has one of the known sizes at byte 14
+    if header.startswith(b"BM") and header[14:18] in (b"\x0c\x00\x00\x00", b"\x28\x00\x00\x00",
+                                                     b"\x38\x00\x00\x00", b"\x6c\x00\x00\x00",
+                                                     b"\x7c\x00\x00\x00"):
+        return "bmp", True
+    # Executables start with "MZ" and the offset of their "PE" header at byte 60
+    if header.startswith(b"MZ") and len(header) >= 64:
+        pe_offset = int.from_bytes(header[60:64], "little")
+        if pe_offset + 4 > len(header) or header.startswith(b"PE\x00\x00", pe_offset):
+            return "exe", False
+    # WebP is a RIFF file with the "WEBP" form type
+    if header.startswith(b"RIFF") and header.startswith(b"WEBP", 8):
+        return "webp", True
+    # HEIC and AVIF are ISO media files with an image brand
+    if header.startswith(b"ftyp", 4):
+        brand = header[8:12]
+        if brand in (b"heic", b"heix", b"hevc", b"hevx", b"heim", b"heis", b"mif1", b"msf1"):
+            return "heic", True
+        if brand in (b"avif", b"avis"):
+            return "avif", True
+    # EMF files start with a header record with " EMF" at byte 40
+    if header.startswith(b"\x01\x00\x00\x00") and header.startswith(b" EMF", 40):
+        return "emf", True
+    # SVG files are XML files with an "svg" root element
+    text = header.lstrip(b"\xef\xbb\xbf \t\r\n")
+    if text.startswith(b"<svg") or (text.startswith((b"<?xml", b"<!--", b"<!DOCTYPE")) and b"<svg" in text):
+        return "svg", True
+    return None, False
+
+
+class RelationshipGraph:
 
+    def __init__(self, extracted_dir_path):
+        """
+        The RelationshipGraph class is responsible for parsing the "[Content_Types].xml" part and every ".rels"
+        part of the document into a graph of the document's parts and the relationships between them, and for
+        finding the parts that are hidden from or do not match that graph:
+            1. Orphan parts: Parts that no relationship targets. Word never opens them so they are a place to hide
+                files. A ".rels" part is an orphan if the part it describes is missing
+            2. Dangling relationships: Relationships that target a part that is not in the document
+            3. External targets: Relationships that target something outside of the document (e.g. a remote
+                template, an OLE object, an image or a hyperlink on a web server or a network share)
+            4. Content type mismatches: Parts whose actual type (from sniff_file_type) does not match the content
+                type declared for them, and parts with no declared content type
+
+        The RelationshipGraph is an inspection stage of the Itemizer. It is given every member of the document
+        through the inspect function so the graph is built in the same pass as the rest of the itemizing. The graph
+        is held in memory and indexed by the lower case name of each part (part names are not case sensitive).
+        Documents without a "[Content_Types].xml" part (e.g. an embedded zip file) are not checked
+
+        :param extracted_dir_path: Path to the "Extracted Document" directory in the base directory
+        """
+        self.extracted_dir_path = extracted_dir_path
+        # The name, size and actual type of each part by the part's lower case name
+        self.parts = {}
+        # The declared content type of each extension and of each overridden part by their lower case names
+        self.default_content_types = {}
+        self.override_content_types = {}
+        # The relationships of each source part by the part's lower case name ("" is the document itself). Each
+        # relationship has its id, type, target, the target's lower case part name, and True if it is external
+        self.relationships = {}
+        # The lower case names of the source parts of every relationship that targets a part by the part's lower
+        # case name
+        self.referrers = {}
+        # Names of the ".rels" parts and "[Content_Types].xml" if they could not be parsed and the errors
+        self.errors = []
+        self.has_content_types = False
+        self.findings = None
+
+    def get_part_name(self, current_file_path):
+        """
+        The get_part_name function is responsible for getting a member's name within the document
+        from its path within the "Extracted Document" directory
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :return: The member's name within the document (e.g. "word/document.xml")
+        """
+        return os.path.relpath(current_file_path, self.extracted_dir_path).replace(os.sep, "/")
+
+    def inspect(self, current_file_path, data):
+        """
+        The inspect function is responsible for adding one member of the document to the graph. The
+        "[Content_Types].xml" part and ".rels" parts are parsed, and the actual type of every part is recorded
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param data: The member's contents as bytes
+        :return: None
+        """
+        part_name = self.get_part_name(current_file_path)
+        self.parts[part_name.lower()] = {"name": part_name, "size": len(data),
+                                         "type": sniff_file_type(data[:SNIFF_SIZE])[0]}
+        try:
+            if part_name == CONTENT_TYPES_PART_NAME:
+                self.parse_content_types(data)
+            elif part_name.endswith(".rels") and posixpath.basename(posixpath.dirname(part_name)) == "_rels":
+                self.parse_relationships(part_name, data)
+        except Exception as error:  # The part is not valid XML. It is reported instead of failing the document
+            self.errors.append({"name": part_name, "error": str(error)})
+
+    def parse_content_types(self, data):
+        """
+        The parse_content_types function is responsible for reading the content types declared in the
+        "[Content_Types].xml" part
+
+        :param data: The part's contents as bytes
+        :return: None
+        """
+        import lxml.etree as et  # Parses the XML of the part
+        parser = et.XMLParser(resolve_entities=False, no_network=True)
+        root = et.fromstring(data, parser)
+        self.has_content_types = True
+        for element in root.iter(CONTENT_TYPES_NAMESPACE + "Default"):
+            self.default_content_types[element.get("Extension", "").lower()] = element.get("ContentType", "")
+        for element in root.iter(CONTENT_TYPES_NAMESPACE + "Override"):
+            part_name = element.get("PartName", "").lstrip("/")
+            self.override_content_types[part_name.lower()] = element.get("ContentType", "")
+
+    def parse_relationships(self, part_name, data):
+        """
+        The parse_relationships function is responsible for adding the relationships of a ".rels" part to the graph.
+        A ".rels" part at "{Dir}/_rels/{Name}.rels" holds the relationships of the part at "{Dir}/{Name}", and its
+        targets are relative to "{Dir}"
+
+        :param part_name: The part's name within the document (e.g. "word/_rels/document.xml.rels")
+        :param data: The part's contents as bytes
+        :return: None
+        """
+        import lxml.etree as et  # Parses the XML of the part
+        import urllib.parse  # Decodes the escaped characters of the targets
+        rels_dir_name = posixpath.dirname(posixpath.dirname(part_name))
+        source_name = posixpath.join(rels_dir_name, posixpath.basename(part_name)[:-len(".rels")]).lower()
+        parser = et.XMLParser(resolve_entities=False, no_network=True)
+        root = et.fromstring(data, parser)
+        relationships = self.relationships.setdefault(source_name, [])
+        for element in root.iter(RELATIONSHIPS_NAMESPACE + "Relationship"):
+            target = element.get("Target", "")
+            is_external = element.get("TargetMode", "Internal") == "External"
+            target_name = None
+            if not is_external:
+                # Targets are relative to the source's directory unless they start with "/". Fragments are dropped
+                target_path = urllib.parse.unquote(target.split("#")[0])
+                if target_path != "":
+                    if target_path.startswith("/"):
+                        target_name = posixpath.normpath(target_path).lstrip("/").lower()
+                    else:
+                        target_name = posixpath.normpath(posixpath.join("/" + rels_dir_name, target_path))
+                        target_name = target_name.lstrip("/").lower()
+                    self.referrers.setdefault(target_name, []).append(source_name)
+            # The type's last part is its short name (e.g. "image", "hyperlink", "attachedTemplate")
+            relationships.append({"id": element.get("Id", ""), "type": element.get("Type", "").rsplit("/", 1)[-1],
+                                  "target": target, "target_name": target_name, "external": is_external})
+
+    def get_content_type(self, part_name):
+        """
+        The get_content_type function is responsible for getting the content type declared for a part
+
+        :param part_name: The part's name within the document
+        :return: The part's overridden content type, the content type of its extension, or None if neither is declared
+        """
+        content_type = self.override_content_types.get(part_name.lower())
+        if content_type is None:
+            # The extension is everything after the last "." of the name, so "_rels/.rels" has the "rels" extension
+            file_name = posixpath.basename(part_name)
+            extension = file_name.rsplit(".", 1)[1].lower() if "." in file_name else ""
+            content_type = self.default_content_types.get(extension)
+        return content_type
+
+    def get_relationships(self, part_name):
+        """
+        The get_relationships function is responsible for getting the relationships of a part
+
+        :param part_name: The part's name within the document or "" for the document's own relationships
+        :return: A list of the part's relationships
+        """
+        return self.relationships.get(part_name.lower(), [])
+
+    def get_referrers(self, part_name):
+        """
+        The get_referrers function is responsible for getting the parts that have a relationship to a part
+
+        :param part_name: The part's name within the document
+        :return: A list of the lower case names of the source parts ("" is the document itself)
+        """
+        return self.referrers.get(part_name.lower(), [])
+
+    def get_findings(self):
+        """
+        The get_findings function is responsible for checking the graph once every member of the document has been
+        inspected. The findings are only worked out once
+
+        :return: A dictionary with the number of parts and relationships and lists of the orphan parts, dangling
+            relationships, external targets, content type mismatches, and parts that could not be parsed. The lists
+            are empty if the document has no "[Content_Types].xml" part
+        """
+        if self.findings is not None:
+            return self.findings
+        findings = {"package": self.has_content_types, "parts": len(self.parts),
+                    "relationships": sum(len(relationships) for relationships in self.relationships.values()),
+                    "orphans": [], "dangling": [], "external": [], "content_type_mismatches": [],
+                    "errors": self.errors}
+        self.findings = findings
+        if not self.has_content_types:
+            return findings
+        for key, part in sorted(self.parts.items()):
+            part_name = part["name"]
+            if part_name == CONTENT_TYPES_PART_NAME:
+                continue
+            # Check if the part is part of the graph
+            if posixpath.basename(posixpath.dirname(part_name)) == "_rels" and part_name.endswith(".rels"):
+                source_name = posixpath.join(posixpath.dirname(posixpath.dirname(key)),
+                                             posixpath.basename(key)[:-len(".rels")])
+                if source_name != "" and source_name not in self.parts:
+                    findings["orphans"].append({"name": part_name, "reason": "The part it describes is missing"})
+            elif len(self.get_referrers(key)) == 0:
+                findings["orphans"].append({"name": part_name, "reason": "No relationship targets the part"})
+            # Check if the part's actual type matches its declared content type
+            content_type = self.get_content_type(part_name)
+            if content_type is None:
+                findings["content_type_mismatches"].append({"name": part_name, "declared": None,
+                                                            "actual": part["type"]})
+            elif part["type"] is not None:
+                if content_type != GENERIC_CONTENT_TYPE \
+                        and not content_type.startswith(FILE_TYPE_CONTENT_TYPES[part["type"]]):
+                    findings["content_type_mismatches"].append({"name": part_name, "declared": content_type,
+                                                                "actual": part["type"]})
+            elif any(content_type in content_types for content_types in FILE_TYPE_CONTENT_TYPES.values()):
+                # The part is declared as a known type of file but its contents are not that type
+                findings["content_type_mismatches"].append({"name": part_name, "declared": content_type,
+                                                            "actual": None})
+        for source_name, relationships in sorted(self.relationships.items()):
+            # The name of the source part as it is in the document
+            source = self.parts[source_name]["name"] if source_name in self.parts else source_name
+            for relationship in relationships:
+                record = {"source": source, "id": relationship["id"], "type": relationship["type"],
+                          "target": relationship["target"]}
+                if relationship["external"]:
+                    findings["external"].append(record)
+                elif relationship["target_name"] is not None and relationship["target_name"] not in self.parts:
+                    findings["dangling"].append(record)
+        return findings
+
+
+class ContentSignature:
+
+    def __init__(self):
+        """
+        The ContentSignature class is responsible for working out a MinHash signature of a document so documents
+        that are revisions or copies of each other can be grouped by cluster_documents without comparing every pair
+        of documents
+
+        1. The document's features are the shingles (runs of SHINGLE_SIZE words) of the text extracted into the
+            Content directory and the CRC-32 of every member, each hashed to 32 bits with CRC-32
+        2. The signature is a one permutation MinHash: each feature's hash picks one of MINHASH_SIZE bins and each
+            bin keeps the smallest hash it was given, so the signature takes a single pass over the features.
+            Empty bins are filled from the next bin that is not empty (densification) so small documents still get
+            a full signature
+        3. The fraction of the values that are the same in two signatures estimates the Jaccard similarity of the
+            two documents' features
+
+        The ContentSignature is an inspection stage of the Itemizer. It is given every member of the document through
+        the inspect function and the text extracted into the Content directory through the inspect_text function
+        """
+        # The 32 bit hashes of the document's features
+        self.hashes = set()
 
-def log(log_file_path, message):
+    def inspect(self, current_file_path, data):
+        """
+        The inspect function is responsible for adding one member of the document as a feature
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param data: The member's contents as bytes
+        :return: None
+        """
+        self.hashes.add(zlib.crc32(data))
+
+    def inspect_text(self, current_file_path, text):
+        """
+        The inspect_text function is responsible for adding the shingles of the text extracted from one member of
+        the document as features. The words are lower case so changes in case do not change the shingles
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param text: The text that was extracted from the member
+        :return: None
+        """
+        words = WORD_PATTERN.findall(text.lower())
+        for i in range(max(len(words) - SHINGLE_SIZE + 1, 1 if len(words) > 0 else 0)):
+            self.hashes.add(zlib.crc32(" ".join(words[i:i + SHINGLE_SIZE]).encode("utf-8")))
+
+    def get_signature(self):
+        """
+        The get_signature function is responsible for working out the signature once every member of the document
+        has been inspected
+
+        :return: A list of MINHASH_SIZE integers or None if the document has no features
+        """
+        if len(self.hashes) == 0:
+            return None
+        bins = [None] * MINHASH_SIZE
+        for value in self.hashes:
+            # Mix the bits so the bin and the value kept in it come from every bit of the hash
+            value = (value * 0x9e3779b1) & 0xffffffff
+            index = value % MINHASH_SIZE
+            value //= MINHASH_SIZE
+            if bins[index] is None or value < bins[index]:
+                bins[index] = value
+        # Fill each empty bin from the next bin that is not empty. The distance is added so a filled bin only
+        # matches a bin that was filled the same way
+        offset = 2 ** 32 // MINHASH_SIZE
+        signature = []
+        for i in range(MINHASH_SIZE):
+            distance = 0
+            while bins[(i + distance) % MINHASH_SIZE] is None:
+                distance += 1
+            signature.append(bins[(i + distance) % MINHASH_SIZE] + distance * offset)
+        return signature
+
+
+def get_similarity(signature, other_signature):
     """
-    The log function is a helper function that is used to output the results to the console and a log file simultaneously
+    The get_similarity function is a helper function that is used to estimate how similar two documents are from
+    their ContentSignature signatures
 
-    :param log_file_path: Path to the log file
-    :param message: The message to log
-    :return: None
+    :param signature: The signature of the first document
+    :param other_signature: The signature of the second document
+    :return: The estimated Jaccard similarity of the documents from 0 to 1
     """
-    print(message)
-    with open(log_file_path, "a") as file:
-        file.write(message + "\n")
+    return sum(1 for value, other_value in zip(signature, other_signature) if value == other_value) / MINHASH_SIZE
 
 
-def run_docx_itemizer(doc_file_path, search_term, is_dir):
+def cluster_documents(docs, threshold):
     """
-    The run_docx_itemizer is responsible for running all of the sub classes and outputs each sub classes result.
-        1. Runs the Itemizer class to extract and itemize the files from the document
-        2. Runs the ImageFinder class to find any hidden images in the files from the document
-        3. If a search_term is provided, runs the Searcher class to find any files that either their
-        file name or contents regex match the search term
+    The cluster_documents function is responsible for grouping the documents of a batch that are exact duplicates
+    or near-duplicates of each other. It takes about linear time in the number of documents as long as few
+    documents share each bucket:
+        1. Documents with the same SHA-256 hash are exact duplicates
+        2. The signatures are split into LSH_BANDS bands and documents are put in a bucket by the values of each
+            band. Only documents that share a bucket are compared, every pair of them unless they are already in
+            the same cluster, and they are near-duplicates if their estimated similarity is at least the threshold
+        3. Documents are joined into clusters with a union find, so a cluster holds every document that is linked
+            to another document of the cluster by a duplicate
+    The first document of each cluster, in the order they were given, is its representative
 
-    :param doc_file_path: Path to the document
-    :param search_term: The regex term to match with
-    :param is_dir: True if the scripts is running on a whole directory. False if running on one file.
-        This is used for better output formatting
-    :return: None
+    :param docs: A list of the path, SHA-256 hash, and signature of each document
+    :param threshold: Estimated similarity from 0 to 1 at which two documents are near-duplicates
+    :return: A list of the clusters with more than one document. Each cluster is a list of the indexes of its
+        documents in docs, representative first
     """
+    parents = list(range(len(docs)))
 
-    # Get the  paths of directories that will be used throughout the script
-    base_dir_path, extracted_dir_path, zip_dir_path, doc_copy_path, log_file_path = get_paths(doc_file_path)
+    def find(index):
+        # Find the first document of the index's cluster, shortening the path along the way
+        while parents[index] != index:
+            parents[index] = parents[parents[index]]
+            index = parents[index]
+        return index
 
-    # Prefix is used to add an extra tab to the output if running on multiple documents. Imports ouputs formatting
-    prefix = "\t" if is_dir else ""
+    def union(index, other_index):
+        root, other_root = find(index), find(other_index)
+        if root != other_root:
+            parents[max(root, other_root)] = min(root, other_root)
 
-    # Output general info about the file
-    log(log_file_path, "Document Name: " + os.path.basename(doc_file_path))
-    log(log_file_path, prefix + "Processing Document: " + os.path.abspath(doc_file_path))
-    # Create an instance of the Itemizer and use it to process the document
-    itemizer = Itemizer(doc_file_path, base_dir_path, extracted_dir_path, zip_dir_path, doc_copy_path)
-    itemizer.process_doc()
-    # The document has been completely itemized at this point
-    # except for files related to hidden images, and search terms
-    log(log_file_path, prefix + "Completed Itemizing Document")
-    log(log_file_path, prefix + "Itemized Files Location: " + os.path.abspath(base_dir_path))
-    log(log_file_path, prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
-    # Display info about an hidden images found in the document
-    log(log_file_path, prefix + "Finding Hidden Images")
-    # Create an instance of the ImageFinder and use it to find any hidden images in the document
-    image_finder = ImageFinder(base_dir_path, extracted_dir_path)
-    hidden_image_file_paths = image_finder.get_hidden_images()
-    if len(hidden_image_file_paths) > 0: # Check if the document has any hidden images
-        log(log_file_path, prefix + "Hidden Images Found:")
-        for i in range(len(hidden_image_file_paths)): # For each hidden image log out it's info
-            hidden_image_file_path = hidden_image_file_paths[i]
-            log(log_file_path, prefix + "\tHidden Image File " + str(i + 1) + ": " + os.path.basename(hidden_image_file_path[0]))
-            log(log_file_path, prefix + "\t\tHidden Image Found At: " + os.path.abspath(hidden_image_file_path[0]))
-            log(log_file_path, prefix + "\t\tCopy Of Hidden Image At: " + os.path.abspath(hidden_image_file_path[1]))
-            log(log_file_path, prefix + "\t\tCopy Of Hidden Image With Correct Extension: " + os.path.abspath(hidden_image_file_path[2]))
-            if i < len(hidden_image_file_paths) - 1:
-                log(log_file_path, prefix + "\t~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
-    else:
-        log(log_file_path, prefix + "No Hidden Images Found")
-
-    # Check to make sure there is a valid search term
-    if search_term is not None and search_term is not "":
-        # log out information about the search
-        log(log_file_path, prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
-        log(log_file_path, prefix + "Searching File Names And Contents For: " + search_term)
-        # Create an instance of the Searcher class and use it to search the documents files
-        searcher = Searcher(base_dir_path, extracted_dir_path, search_term)
-        found_file_names, found_file_contents, unreadable_file_contents, search_file_paths, unreadable_file_paths = searcher.find_search_term()
-        if len(found_file_names) > 0: # List all files that their names match the regex search term
-            log(log_file_path, prefix + "\tFile Names Match:")
-            for file_path in found_file_names:
-                log(log_file_path, prefix + "\t\t" + os.path.abspath(file_path))
-        if len(found_file_contents) > 0: # List all files that their contents match the regex search term
-            log(log_file_path, prefix + "\tFile Contents Match:")
-            for file_path in found_file_contents:
-                log(log_file_path, prefix + "\t\t" + os.path.abspath(file_path))
-        if len(search_file_paths) > 0:
-            # List all files that have been copied to the "Search" directory
-            # because their names or contents matched the regex search term
-            log(log_file_path, prefix + "\tFound Search Term Files Copied To:")
-            for file_path in search_file_paths:
-                log(log_file_path, prefix + "\t\t" + os.path.abspath(file_path))
-        if len(unreadable_file_contents) > 0: # List all files that their contents could not be read
-            log(log_file_path, prefix + "\tUnreadable File Contents:")
-            for file_path in unreadable_file_contents:
-                log(log_file_path, prefix + "\t\t" + os.path.abspath(file_path))
-        if len(unreadable_file_paths) > 0:
-            # List all files that have been copied to the "Search/Unreadable" directory
-            # because their contents could not be read
-            log(log_file_path, prefix + "\tUnreadable Files Copied To:")
-            for file_path in unreadable_file_paths:
-                log(log_file_path, prefix + "\t\t" + os.path.abspath(file_path))
-        if len(found_file_names) == 0 and len(found_file_contents) == 0 and len(search_file_paths) == 0:
-            log(log_file_path, prefix + "Search Term Not Found")
-    log(log_file_path, "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    # Join the exact duplicates
+    first_indexes = {}
+    for i, (doc_path, digest, signature) in enumerate(docs):
+        if digest in first_indexes:
+            union(first_indexes[digest], i)
+        else:
+            first_indexes[digest] = i
+    # Join the near-duplicates that share a bucket of any band
+    rows = MINHASH_SIZE // LSH_BANDS
+    for band in range(LSH_BANDS):
+        buckets = {}
+        for i, (doc_path, digest, signature) in enumerate(docs):
+            if signature is None:
+                continue
+            buckets.setdefault(tuple(signature[band * rows:(band + 1) * rows]), []).append(i)
+        for indexes in buckets.values():
+            # A document can be a near-duplicate of a later document in the bucket but not of the first one, so
+            # every pair is compared
+            for j in range(len(indexes)):
+                for i in indexes[j + 1:]:
+                    if find(i) != find(indexes[j]) and get_similarity(docs[indexes[j]][2], docs[i][2]) >= threshold:
+                        union(indexes[j], i)
+    clusters = {}
+    for i in range(len(docs)):
+        clusters.setdefault(find(i), []).append(i)
+    return [indexes for root, indexes in sorted(clusters.items()) if len(indexes) > 1]
 
 
-def main():
+def get_cluster_records(docs, threshold):
     """
-    The main function is responsible for handling the user provided arguments and calling the run_docx_itemizer
-    accordingly. This included making sure the path is actually a file or directory, and that all files passed
-    to the run_docx_itemizer function are .docx files.
+    The get_cluster_records function is responsible for getting the clusters of duplicate documents of a batch
+    with the path of their representative and the similarity of each of their documents to the representative
+
+    :param docs: A list of the path, SHA-256 hash, and signature of each document of the batch
+    :param threshold: Estimated similarity from 0 to 1 at which two documents are near-duplicates
+    :return: A list of the clusters with more than one document (holds the path of the representative and the path,
+        SHA-256 hash, whether it is an exact duplicate, and the similarity of each document, representative first)
+    """
+    cluster_records = []
+    for indexes in cluster_documents(docs, threshold):
+        representative_path, representative_digest, representative_signature = docs[indexes[0]]
+        documents = []
+        for i in indexes:
+            doc_path, digest, signature = docs[i]
+            exact = digest == representative_digest
+            similarity = 1.0 if exact or signature is None or representative_signature is None \
+                else get_similarity(representative_signature, signature)
+            documents.append({"document": doc_path, "sha256": digest, "exact": exact, "similarity": similarity})
+        cluster_records.append({"representative": representative_path, "documents": documents})
+    return cluster_records
+
+
+def output_clusters(docs, threshold, cluster_file_path):
+    """
+    The output_clusters function is responsible for outputting the clusters of duplicate documents at the end of a
+    batch so reviewers can review one representative of each cluster
+        1. Prints each cluster with its representative and the similarity of each of its other documents
+        2. Writes a cluster report file with every cluster as JSON
+
+    :param docs: A list of the path, SHA-256 hash, and signature of each document of the batch
+    :param threshold: Estimated similarity from 0 to 1 at which two documents are near-duplicates
+    :param cluster_file_path: Path to the cluster report file to write
     :return: None
     """
-    # Get the user provided arguments from the argument parser
-    args = parser.parse_args()
-    path = args.path
-    search_term = args.search_term
+    cluster_records = get_cluster_records(docs, threshold)
+    duplicate_count = sum(len(cluster_record["documents"]) - 1 for cluster_record in cluster_records)
+    print("Duplicate Clusters: " + str(len(cluster_records)) + " (" + str(duplicate_count)
+          + " Documents Are Duplicates Or Near-Duplicates Of A Representative)")
+    for cluster_record in cluster_records:
+        print("\tRepresentative: " + cluster_record["representative"])
+        for document in cluster_record["documents"][1:]:
+            if document["exact"]:
+                print("\t\tExact Duplicate: " + document["document"])
+            else:
+                print("\t\t" + "%.0f" % (document["similarity"] * 100) + "% Similar: " + document["document"])
+    with open(cluster_file_path, "w", encoding="utf-8") as file:
+        json.dump({"threshold": threshold, "documents": len(docs), "clusters": cluster_records}, file, indent=4)
+    print("\tCluster Report Written To: " + os.path.abspath(cluster_file_path))
 
-    # Check if the path is a directory
-    if os.path.isdir(path):
-        has_doc_file = False
-        # For every directory and sub-directory in the directory at the "path"
-        for (dir_path, dir_names, file_names) in os.walk(path):
-            for file_name in file_names:  # For every file in the current directory
-                file_extension = os.path.splitext(file_name)[1]
-                if file_extension == ".docx":
-                    # The file is a .docx file
-                    current_file_path = os.path.join(dir_path, file_name)
-                    # Run the docx itemizer
-                    run_docx_itemizer(current_file_path, search_term, True)
-                    has_doc_file = True
-        if not has_doc_file:
+
+class SearchIndexer:
+
+    def __init__(self, index_file_path, doc_path, extracted_dir_path, index_contents=False):
+        """
+        The SearchIndexer class is responsible for adding a document to a persistent SearchIndex so the document
+        can be searched later with new search terms without itemizing it again
+
+        The SearchIndexer is an inspection stage of the Itemizer. It is given every member of the document through
+        the inspect function and the text extracted into the Content directory through the inspect_text function.
+        The document is written to the index in one transaction when the SearchIndexer is closed
+
+        :param index_file_path: Path to the SQLite file of the SearchIndex
+        :param doc_path: Path to the document
+        :param extracted_dir_path: Path to the "Extracted Document" directory in the base directory
+        :param index_contents: True to also keep the compressed contents of every member in the index so queries
+            match binary members exactly like the Searcher and give the byte offsets of their matches
+        """
+        self.index_file_path = index_file_path
+        self.doc_path = doc_path
+        self.extracted_dir_path = extracted_dir_path
+        self.index_contents = index_contents
+        # Records for each member of the document and its Content text
+        # (name, kind, size, whole text flag, compressed data or None, text)
+        self.parts = []
+
+    def get_part_name(self, current_file_path):
+        """
+        The get_part_name function is responsible for getting a member's name within the document
+        from its path within the "Extracted Document" directory
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :return: The member's name within the document (e.g. "word/document.xml")
+        """
+        return os.path.relpath(current_file_path, self.extracted_dir_path).replace(os.sep, "/")
+
+    def inspect(self, current_file_path, data):
+        """
+        The inspect function is responsible for recording one member of the document for the index. The member is
+        decoded with decode_contents. The whole text of a text member is stored in the full text index, and only
+        the runs of characters between control characters are stored for a binary member. The member's bytes are
+        also stored compressed if the contents are indexed
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param data: The member's contents as bytes
+        :return: None
+        """
+        text, is_utf8 = decode_contents(data)
+        whole_text = is_utf8 or data.isascii()
+        if not whole_text:
+            text = "\n".join(INDEX_STRING_PATTERN.findall(text))
+        self.parts.append((self.get_part_name(current_file_path), "part", len(data), whole_text,
+                           zlib.compress(data) if self.index_contents else None, text))
+
+    def inspect_text(self, current_file_path, text):
+        """
+        The inspect_text function is responsible for recording the text extracted from one member of the
+        document into the Content directory for the index
+
+        :param current_file_path: Path of the member within the "Extracted Document" directory
+        :param text: The text that was extracted from the member
+        :return: None
+        """
+        self.parts.append((self.get_part_name(current_file_path), "content", len(text.encode("utf-8")), True, None,
+                           text))
+
+    def close(self, base_dir_path, digest):
+        """
+        The close function is responsible for writing the document and its records to the index
+
+        :param base_dir_path: Path to the base directory that holds all of the output of this script
+        :param digest: The SHA-256 hash of the document as a hex string
+        :return: None
+        """
+        index = SearchIndex(self.index_file_path)
+        try:
+            index.add_document(self.doc_path, digest, base_dir_path, self.parts)
+        finally:
+            index.close()
+
+
+class SearchIndex:
+
+    def __init__(self, index_file_path):
+        """
+        The SearchIndex class is responsible for a persistent SQLite index of every document that has been
+        itemized with the index option, so regex and keyword queries can be answered across all of the documents
+        without itemizing them again
+
+        The index holds for every document its path, SHA-256 hash and base directory, and for every member of the
+        document its name, its text (the runs of characters between control characters for a binary member), its
+        compressed bytes if the contents are indexed, and the text that was extracted into the Content directory.
+        The member names and text are in an FTS5 full text index with the trigram tokenizer so a query with a
+        keyword only has to look at the members that contain the keyword
+
+        :param index_file_path: Path to the SQLite file of the index. It is created if it does not already exist
+        """
+        # The timeout lets many worker processes of a batch write to the index at the same time
+        import sqlite3  # Stores the persistent search index
+        self.connection = sqlite3.connect(index_file_path, timeout=60)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        with self.connection:
+            self.connection.execute("CREATE TABLE IF NOT EXISTS documents (id INTEGER PRIMARY KEY, path TEXT UNIQUE, "
+                                    "sha256 TEXT, output TEXT, time_stamp TEXT)")
+            self.connection.execute("CREATE TABLE IF NOT EXISTS parts (id INTEGER PRIMARY KEY, document_id INTEGER, "
+                                    "name TEXT, kind TEXT, size INTEGER, whole_text INTEGER, data BLOB)")
+            self.connection.execute("CREATE VIRTUAL TABLE IF NOT EXISTS parts_fts USING fts5(name, strings, "
+                                    "tokenize='trigram')")
+
+    def add_document(self, doc_path, digest, base_dir_path, parts):
+        """
+        The add_document function is responsible for adding a document and its members to the index. If the
+        document is already in the index its old records are replaced
+
+        :param doc_path: Path to the document
+        :param digest: The SHA-256 hash of the document as a hex string
+        :param base_dir_path: Path to the base directory that holds all of the output of this script
+        :param parts: Records for each member of the document and its Content text
+            (name, kind, size, whole text flag, compressed data or None, text)
+        :return: None
+        """
+        doc_path = os.path.abspath(doc_path)
+        with self.connection:
+            # Remove the records of an earlier run on the same document
+            row = self.connection.execute("SELECT id FROM documents WHERE path = ?", (doc_path,)).fetchone()
+            if row is not None:
+                self.connection.execute("DELETE FROM parts_fts WHERE rowid IN "
+                                        "(SELECT id FROM parts WHERE document_id = ?)", (row[0],))
+                self.connection.execute("DELETE FROM parts WHERE document_id = ?", (row[0],))
+                self.connection.execute("DELETE FROM documents WHERE id = ?", (row[0],))
+            cursor = self.connection.execute("INSERT INTO documents (path, sha256, output, time_stamp) "
+                                             "VALUES (?, ?, ?, ?)", (doc_path, digest, os.path.abspath(base_dir_path),
+                                                                     get_time_stamp()))
+            document_id = cursor.lastrowid
+            for name, kind, size, whole_text, data, text in parts:
+                cursor = self.connection.execute("INSERT INTO parts (document_id, name, kind, size, whole_text, data) "
+                                                 "VALUES (?, ?, ?, ?, ?, ?)",
+                                                 (document_id, name, kind, size, whole_text, data))
+                self.connection.execute("INSERT INTO parts_fts (rowid, name, strings) VALUES (?, ?, ?)",
+                                        (cursor.lastrowid, name, text))
+
+    def query(self, search_term):
+        """
+        The query function is responsible for finding every member of every indexed document that contains the
+        search term in its name or its contents, and the offsets of the matches
+
+        If every match of the search term has to contain a keyword of at least 3 characters (see
+        get_search_keyword) the full text index is used to find the members that may contain it, otherwise every
+        member is checked. The matches are always confirmed with the regex, matched like by the Searcher (see
+        ContentPatternSet). The results are the same as the Searcher's for text members, and for binary members if
+        the contents were indexed. Otherwise a binary member is matched as text with the runs of characters in it,
+        so a match can not span a control character and its offsets are not known. Offsets in a member are byte
+        offsets and offsets in the Content text of a member are character offsets
+
+        :param search_term: The regex term or keyword to match with
+        :return: A list containing information about the matching members (holds the document's path,
+        the member's name, the member's kind ("part" or "content"), True if the member's name matches, and the
+        offsets of the matches in the member's contents or None if its contents match but the offsets are not known)
+        """
+        pattern = re.compile(search_term)
+        keyword = get_search_keyword(search_term)
+        select = "SELECT documents.path, parts.name, parts.kind, parts.whole_text, parts.data, parts_fts.strings " \
+                 "FROM parts JOIN documents ON documents.id = parts.document_id " \
+                 "JOIN parts_fts ON parts_fts.rowid = parts.id "
+        if keyword is not None:
+            # Only look at the members that the full text index says contain the keyword
+            rows = self.connection.execute(select + "WHERE parts_fts MATCH ? ORDER BY documents.path, parts.id",
+                                           ("\"" + keyword.replace("\"", "\"\"") + "\"",))
+        else:
+            rows = self.connection.execute(select + "ORDER BY documents.path, parts.id")
+        results = []
+        content_patterns = ContentPatternSet([search_term])
+        for doc_path, name, kind, whole_text, data, text in rows:
+            if data is not None:  # The member's contents are matched the same way as by the Searcher
+                offsets = content_patterns.find(zlib.decompress(data)).get(0, [[]])[0]
+            else:
+                offsets = [match.start() for match in pattern.finditer(text)]
+                if kind == "part" and whole_text and not text.isascii():
+                    # Non-ASCII text of a member is UTF-8 so its offsets are turned into byte offsets
+                    offsets = get_byte_offsets(text, offsets)
+            if len(offsets) > 0 and data is None and not whole_text:
+                # The offsets in the runs of characters of a binary member are not offsets in the member
+                offsets = None
+            name_match = kind == "part" and pattern.search(posixpath.basename(name)) is not None
+            if name_match or offsets is None or len(offsets) > 0:
+                results.append([doc_path, name, kind, name_match, offsets])
+        return results
+
+    def close(self):
+        """
+        The close function is responsible for closing the connection to the index
+
+        :return: None
+        """
+        self.connection.close()
+
+
+class FileWriter:
+
+    def __init__(self, metrics=None, scheduler=None):
+        """
+        The FileWriter class is responsible for writing all of the output files of a document to the file system.
+        Every output file is written through a FileWriter so other ways of storing the output can be used by
+        replacing the FileWriter (e.g. BlobStoreWriter)
+
+        :param metrics: The Metrics that the output files are counted in or None to not count them
+        :param scheduler: The WriteScheduler that writes the output files, concurrently and without writing the
+            same contents twice, or None to write each output file right away
+        """
+        self.metrics = metrics if metrics is not None else NULL_METRICS
+        self.scheduler = scheduler
+
+    def make_dir(self, dir_path):
+        """
+        The make_dir function is responsible for creating a directory if it does not already exist
+
+        :param dir_path: Path of the directory to create
+        :return: None
+        """
+        os.makedirs(dir_path, exist_ok=True)
+
+    def write(self, file_path, data):
+        """
+        The write function is responsible for writing bytes to a file. Any missing directories in the
+        file's path are created
+
+        :param file_path: Path of the file to write
+        :param data: The contents to write as bytes
+        :return: None
+        """
+        if self.scheduler is not None:
+            self.scheduler.write(file_path, data)
+        else:
+            # Create the directories that will hold the file if they do not already exist
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            with open(file_path, "wb") as file:
+                file.write(data)
+        self.metrics.count_write(len(data))
+
+    def copy(self, source_file_path, file_path):
+        """
+        The copy function is responsible for copying a file that is not part of the document (e.g. the
+        original .docx file) to an output file
+
+        :param source_file_path: Path of the file to copy
+        :param file_path: Path of the file to write
+        :return: None
+        """
+        if self.scheduler is not None:
+            self.scheduler.copy(source_file_path, file_path)
+        else:
+            os.makedirs(os.path.dirname(file_path), exist_ok=True)
+            shutil.copy(source_file_path, file_path)
+        self.metrics.count_write(os.path.getsize(source_file_path))
+
+    def open(self, file_path):
+        """
+        The open function is responsible for opening a file so its contents can be written a piece at a time
+
+        :param file_path: Path of the file to write
+        :return: A binary file object that is closed once all of the contents have been written. The caller
+            counts the bytes written to it in the writer's Metrics
+        """
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        return open(file_path, "wb")
+
+    def close(self):
+        """
+        The close function is responsible for finishing any work once all of a document's output files
+        have been written. The writes of the WriteScheduler are waited for
+
+        :return: None
+        """
+        if self.scheduler is not None:
+            self.scheduler.close()
+
+
+class WriteScheduler:
+
+    def __init__(self, write_threads=4):
+        """
+        The WriteScheduler class is responsible for writing the output files of a FileWriter. Documents with many
+        large media files spend most of their time waiting on writes, and the same contents are often written to
+        several output files (e.g. "Extracted Document", Media, "Hidden Images", and Search)
+
+        1. Writes are run by a pool of write_threads threads so the document is itemized while its files are
+            written. Only a few writes are queued for each thread. Once the queue is full the oldest write is
+            waited for so the memory held by queued writes stays bounded
+        2. Output files of at least CLONE_MIN_SIZE bytes are hashed. A later write of the same contents is cloned
+            from the first output file with clone_file (a reflink, or a copy in the kernel with copy_file_range or
+            sendfile) instead of being written again from memory. Copies of files that are not part of the document
+            (e.g. the original .docx file) are cloned the same way
+        3. Writes to the same output file are run in the order they were queued. Different parts of a document
+            can have the same output file (e.g. word/document.xml and word/glossary/document.xml are both
+            XML/document.xml) and the last write has to win as it would if the files were written one after the
+            other. A clone also waits for the earlier writes of the file it is cloned from, and later writes of
+            that file wait for the clone
+        4. The number of files and bytes written and cloned, and how they were cloned, are recorded so the I/O
+            that was saved can be reported
+
+        :param write_threads: Number of threads that write the output files. 0 to write them in the calling thread
+        """
+        self.write_threads = write_threads
+        self.executor = None
+        if write_threads > 0:
+            import concurrent.futures  # Runs the writes in a pool of threads
+            self.executor = concurrent.futures.ThreadPoolExecutor(max_workers=write_threads,
+                                                                  thread_name_prefix="DocxItemizerWriter")
+        # Writes that have been queued and are not known to be done, oldest first
+        self.pending = collections.deque()
+        self.max_pending = max(write_threads, 1) * 4
+        # The path of the first output file of each large contents by the contents' SHA-256 hash, and the hash by
+        # the path so the path can be forgotten once it is written again with other contents
+        self.written = {}
+        self.written_digests = {}
+        # The last queued write that writes or reads each output file. A new write of the file waits for it
+        self.last_futures = {}
+        # Directories that have already been created
+        self.dir_paths = set()
+        # Number of files and bytes written from memory and cloned from another file, and the number of files
+        # cloned with each method. They are updated by the threads of the pool while holding the lock
+        self.lock = threading.Lock()
+        self.record = {"files_written": 0, "bytes_written": 0, "files_cloned": 0, "bytes_cloned": 0,
+                       "duplicate_files": 0, "duplicate_bytes": 0, "clone_methods": {}}
+
+    def make_parent_dir(self, file_path):
+        """
+        The make_parent_dir function is responsible for creating the directory of a file if it has not already
+        been created, without a system call for every file
+
+        :param file_path: Path of the file
+        :return: None
+        """
+        dir_path = os.path.dirname(file_path)
+        if dir_path not in self.dir_paths:
+            os.makedirs(dir_path, exist_ok=True)
+            self.dir_paths.add(dir_path)
+
+    def submit(self, file_paths, function, *args):
+        """
+        The submit function is responsible for running a write in the pool, or right away if there is no pool.
+        The write is run after the earlier writes that write or read any of its files
+
+        :param file_paths: Paths of the files that the write writes or reads
+        :param function: The function that does the write
+        :param args: The arguments of the function
+        :return: None
+        """
+        if self.executor is None:
+            function(*args)
+            return
+        # Wait for the oldest write once the queue is full
+        while len(self.pending) >= self.max_pending:
+            self.pending.popleft().result()
+        previous_futures = []
+        for file_path in file_paths:
+            previous_future = self.last_futures.get(file_path)
+            if previous_future is not None and not previous_future.done():
+                previous_futures.append(previous_future)
+        future = self.executor.submit(self.run_after, previous_futures, function, *args)
+        for file_path in file_paths:
+            self.last_futures[file_path] = future
+        self.pending.append(future)
+
+    def run_after(self, previous_futures, function, *args):
+        """
+        The run_after function is responsible for running a write once the earlier writes of its files are done.
+        It is run by the pool. The earlier writes were queued first and the pool runs the writes in the order they
+        were queued, so waiting for them can not block the pool
+
+        :param previous_futures: The Futures of the earlier writes of the files. Their errors are raised by flush
+        :param function: The function that does the write
+        :param args: The arguments of the function
+        :return: None
+        """
+        import concurrent.futures
+        concurrent.futures.wait(previous_futures)
+        function(*args)
+
+    def forget(self, file_path):
+        """
+        The forget function is responsible for forgetting the contents of an output file that is written again,
+        so later writes of the same contents are not cloned from it
+
+        :param file_path: Path of the file that is written
+        :return: None
+        """
+        digest = self.written_digests.pop(file_path, None)
+        if digest is not None and self.written.get(digest) == file_path:
+            del self.written[digest]
+
+    def write(self, file_path, data):
+        """
+        The write function is responsible for queueing a write of bytes to a file. If the same large contents were
+        already written to another output file they are cloned from it
+
+        :param file_path: Path of the file to write
+        :param data: The contents to write as bytes
+        :return: None
+        """
+        self.make_parent_dir(file_path)
+        self.forget(file_path)
+        if len(data) >= CLONE_MIN_SIZE:
+            digest = hashlib.sha256(data).digest()
+            source_file_path = self.written.get(digest)
+            if source_file_path is not None and source_file_path != file_path:
+                with self.lock:
+                    self.record["duplicate_files"] += 1
+                    self.record["duplicate_bytes"] += len(data)
+                self.submit((source_file_path, file_path), self.clone_write, source_file_path, file_path, data)
+                return
+            self.written[digest] = file_path
+            self.written_digests[file_path] = digest
+        self.submit((file_path,), self.write_file, file_path, data)
+
+    def copy(self, source_file_path, file_path):
+        """
+        The copy function is responsible for queueing a copy of a file that is not part of the document
+        (e.g. the original .docx file) to an output file
+
+        :param source_file_path: Path of the file to copy
+        :param file_path: Path of the file to write
+        :return: None
+        """
+        self.make_parent_dir(file_path)
+        self.forget(file_path)
+        self.submit((file_path,), self.clone, source_file_path, file_path)
+
+    def write_file(self, file_path, data):
+        """
+        The write_file function is responsible for writing bytes to a file. It is run by the pool
+
+        :param file_path: Path of the file to write
+        :param data: The contents to write as bytes
+        :return: None
+        """
+        with open(file_path, "wb") as file:
+            file.write(data)
+        with self.lock:
+            self.record["files_written"] += 1
+            self.record["bytes_written"] += len(data)
+
+    def clone(self, source_file_path, file_path):
+        """
+        The clone function is responsible for cloning a file with clone_file and recording how it was cloned.
+        It is run by the pool
+
+        :param source_file_path: Path of the file to clone
+        :param file_path: Path of the file to write
+        :return: None
+        """
+        method = clone_file(source_file_path, file_path)
+        size = os.path.getsize(file_path)
+        with self.lock:
+            self.record["files_cloned"] += 1
+            self.record["bytes_cloned"] += size
+            self.record["clone_methods"][method] = self.record["clone_methods"].get(method, 0) + 1
+
+    def clone_write(self, source_file_path, file_path, data):
+        """
+        The clone_write function is responsible for writing contents that were already written to another output
+        file by cloning that file. It is run by the pool once the write of the other file is done
+
+        :param source_file_path: Path of the output file that has the same contents
+        :param file_path: Path of the file to write
+        :param data: The contents to write as bytes. They are written normally if the clone fails
+        :return: None
+        """
+        try:
+            self.clone(source_file_path, file_path)
+        except OSError:
+            self.write_file(file_path, data)
+
+    def get_record(self):
+        """
+        The get_record function is responsible for getting the machine readable record of the writes
+
+        :return: A dictionary of the number of files and bytes written, cloned and found to be duplicates, and the
+            number of files cloned with each method
+        """
+        with self.lock:
+            return dict(self.record, clone_methods=dict(self.record["clone_methods"]))
+
+    def flush(self):
+        """
+        The flush function is responsible for waiting for every queued write. The first error of any write is
+        raised
+
+        :return: None
+        """
+        while len(self.pending) > 0:
+            self.pending.popleft().result()
+        self.last_futures = {}
+
+    def close(self):
+        """
+        The close function is responsible for waiting for every queued write and stopping the pool
+
+        :return: None
+        """
+        self.flush()
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+        self.written = {}
+        self.written_digests = {}
+
+
+def clone_file(source_file_path, file_path):
+    """
+    The clone_file function is a helper function that is used to copy a file with the fastest method the file
+    system supports, without reading the file into this process when it can:
+        1. A reflink (FICLONE), where the copy shares the blocks of the file on copy on write file systems (e.g.
+            btrfs and XFS), so nothing is copied
+        2. os.copy_file_range, which copies in the kernel and lets network file systems copy on the server
+        3. os.sendfile, which copies in the kernel
+        4. A normal copy if none of them are supported
+
+    :param source_file_path: Path of the file to copy
+    :param file_path: Path of the file to write. It is replaced if it already exists
+    :return: The method that was used: "reflink", "copy_file_range", "sendfile", or "copy"
+    """
+    with open(source_file_path, "rb") as source_file, open(file_path, "wb") as file:
+        try:
+            import fcntl  # Makes the reflink. Only available on Unix
+            fcntl.ioctl(file.fileno(), FICLONE, source_file.fileno())
+            return "reflink"
+        except (ImportError, OSError):
+            pass
+        size = os.fstat(source_file.fileno()).st_size
+        for method in ("copy_file_range", "sendfile"):
+            if not hasattr(os, method):
+                continue
+            copied_size = 0
+            try:
+                while copied_size < size:
+                    if method == "copy_file_range":
+                        count = os.copy_file_range(source_file.fileno(), file.fileno(), size - copied_size,
+                                                   copied_size, copied_size)
+                    else:
+                        os.lseek(file.fileno(), copied_size, os.SEEK_SET)
+                        count = os.sendfile(file.fileno(), source_file.fileno(), copied_size, size - copied_size)
+                    if count == 0:  # The file got shorter while it was copied
+                        break
+                    copied_size += count
+                return method
+            except OSError:  # The method is not supported between these files. Start again with the next one
+                file.truncate(0)
+        file.seek(0)
+        file.truncate(0)
+        source_file.seek(0)
+        shutil.copyfileobj(source_file, file, READ_CHUNK_SIZE)
+        return "copy"
+
+
+class BlobStoreWriter(FileWriter):
+
+    def __init__(self, store_dir_path, base_dir_path, metrics=None):
+        """
+        The BlobStoreWriter class is responsible for writing the output files of a document into a
+        content-addressed blob store so identical files are only stored once
+
+        1. Every unique file is stored once in the store directory under its SHA-256 hash
+            (e.g. "{Store}/ab/abcdef...")
+        2. The output files (e.g. the files in "Extracted Document", XML, Media, "Hidden Images", and "Search")
+            are hard links to the file in the store. If a hard link can not be made (e.g. the store is on a
+            different file system) the file is copied instead
+        3. A "manifest.json" file is written in the base directory that maps the path of each output file,
+            relative to the base directory, to its SHA-256 hash
+        Files in the store are made read only since all of the output files that link to them share their contents,
+        except on Windows where read only files can not be removed (see add_blob). The same store can be used by many
+        documents and many processes at the same time
+
+        :param store_dir_path: Path to the directory of the blob store
+        :param base_dir_path: Path to the base directory that holds all of the output of this script
+        :param metrics: The Metrics that the output files are counted in or None to not count them
+        """
+        FileWriter.__init__(self, metrics)
+        self.store_dir_path = store_dir_path
+        self.base_dir_path = base_dir_path
+        # Maps the path of each output file relative to the base directory to its SHA-256 hash
+        self.manifest = {}
+
+    def get_blob_path(self, digest):
+        """
+        The get_blob_path function is responsible for getting the path of a file in the store
+
+        :param digest: The SHA-256 hash of the file as a hex string
+        :return: Path of the file in the store
+        """
+        return os.path.join(self.store_dir_path, digest[:2], digest)
+
+    def add_blob(self, temp_file_path, digest):
+        """
+        The add_blob function is responsible for moving a newly written file into the store. If the store already
+        has the file the new file is removed instead
+
+        :param temp_file_path: Path of the newly written file. It must be in the store directory
+        :param digest: The SHA-256 hash of the file as a hex string
+        :return: Path of the file in the store
+        """
+        blob_path = self.get_blob_path(digest)
+        if os.path.isfile(blob_path):
+            os.remove(temp_file_path)
+        else:
+            os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+            # Windows does not remove read only files, so the new file and the output files that link to it (e.g. the
+            # partial output removed by remove_output) could not be removed
+            if os.name != "nt":
+                os.chmod(temp_file_path, 0o444)
+            try:
+                # Linking fails if another process added the same file first, in which case the new file is not needed
+                os.link(temp_file_path, blob_path)
+            except FileExistsError:
+                pass
+            os.remove(temp_file_path)
+        return blob_path
+
+    def link_blob(self, digest, file_path):
+        """
+        The link_blob function is responsible for making an output file that has the contents of a file in the store
+
+        :param digest: The SHA-256 hash of the file as a hex string
+        :param file_path: Path of the output file
+        :return: None
+        """
+        blob_path = self.get_blob_path(digest)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        if os.path.lexists(file_path):
+            os.remove(file_path)
+        try:
+            os.link(blob_path, file_path)
+        except OSError:  # Hard links are not supported between the store and the output so reflink or copy it
+            clone_file(blob_path, file_path)
+        # Record the output file's hash in the manifest
+        self.manifest[os.path.relpath(file_path, self.base_dir_path)] = digest
+
+    def write(self, file_path, data):
+        """
+        The write function is responsible for storing bytes in the store, if they are not already stored,
+        and making an output file that links to them
+
+        :param file_path: Path of the file to write
+        :param data: The contents to write as bytes
+        :return: None
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if not os.path.isfile(self.get_blob_path(digest)):
+            with self.open_temp_file() as (temp_file, temp_file_path):
+                temp_file.write(data)
+            self.add_blob(temp_file_path, digest)
+        self.link_blob(digest, file_path)
+        self.metrics.count_write(len(data))
+
+    def copy(self, source_file_path, file_path):
+        """
+        The copy function is responsible for storing a file that is not part of the document (e.g. the
+        original .docx file) in the store and making an output file that links to it
+
+        :param source_file_path: Path of the file to copy
+        :param file_path: Path of the file to write
+        :return: None
+        """
+        with self.open(file_path) as file:
+            with open(source_file_path, "rb") as source_file:
+                shutil.copyfileobj(source_file, file)
+        self.metrics.count_write(os.path.getsize(source_file_path))
+
+    def open(self, file_path):
+        """
+        The open function is responsible for opening a file so its contents can be written a piece at a time.
+        The contents are written to a temporary file in the store and hashed as they are written, and once the
+        file is closed it is added to the store and linked to the output file
+
+        :param file_path: Path of the file to write
+        :return: A BlobFile that is closed once all of the contents have been written
+        """
+        return BlobFile(self, file_path)
+
+    @contextlib.contextmanager
+    def open_temp_file(self):
+        """
+        The open_temp_file function is responsible for opening a new temporary file in the store directory.
+        Temporary files are written in the store directory so they can be linked into the store
+
+        :return: A context manager that gives the temporary binary file object and its path
+        """
+        os.makedirs(self.store_dir_path, exist_ok=True)
+        import tempfile  # Creates temporary files in the blob store
+        file_descriptor, temp_file_path = tempfile.mkstemp(dir=self.store_dir_path, suffix=".tmp")
+        with os.fdopen(file_descriptor, "wb") as temp_file:
+            yield temp_file, temp_file_path
+
+    def close(self):
+        """
+        The close function is responsible for writing the "manifest.json" file in the base directory
+
+        :return: None
+        """
+        manifest_file_path = os.path.join(self.base_dir_path, "manifest.json")
+        with open(manifest_file_path, "w", encoding="utf-8") as file:
+            json.dump(self.manifest, file, indent=4, sort_keys=True)
+
+
+class BlobFile:
+
+    def __init__(self, blob_store_writer, file_path):
+        """
+        The BlobFile class is responsible for writing an output file of a BlobStoreWriter a piece at a time.
+        The pieces are written to a temporary file in the store and hashed as they are written. Once the BlobFile
+        is closed the temporary file is added to the store and linked to the output file
+
+        :param blob_store_writer: The BlobStoreWriter the file is written for
+        :param file_path: Path of the output file
+        """
+        self.blob_store_writer = blob_store_writer
+        self.file_path = file_path
+        self.hash = hashlib.sha256()
+        self.temp_file_context = blob_store_writer.open_temp_file()
+        self.temp_file, self.temp_file_path = self.temp_file_context.__enter__()
+
+    def write(self, data):
+        """
+        The write function is responsible for writing the next piece of the file
+
+        :param data: The piece to write as bytes
+        :return: None
+        """
+        self.hash.update(data)
+        self.temp_file.write(data)
+
+    def close(self):
+        """
+        The close function is responsible for adding the file to the store and linking it to the output file
+
+        :return: None
+        """
+        self.temp_file_context.__exit__(None, None, None)
+        digest = self.hash.hexdigest()
+        self.blob_store_writer.add_blob(self.temp_file_path, digest)
+        self.blob_store_writer.link_blob(digest, self.file_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:
+            self.close()
+        else:  # Do not store a file that was not completely written
+            self.temp_file_context.__exit__(exc_type, exc_value, exc_traceback)
+            os.remove(self.temp_file_path)
+
+
+class ArchiveWriter(FileWriter):
+
+    def __init__(self, archive_path, root_dir_path, archive_format, metrics=None, write_index=True):
+        """
+        The ArchiveWriter class is responsible for writing the output files of a document into a single
+        uncompressed .tar or .zip archive instead of thousands of small files, which is much faster on network file
+        systems and only uses one inode
+
+        1. Every output file and directory is added to the archive in one sequential write. The names in the
+            archive are the paths of the output files relative to the root directory, so extracting the archive into
+            the root directory gives the same base directory (e.g. "{Doc Name}_Itemized({Time Stamp})/XML/...") that
+            is written without an archive
+        2. Files are stored uncompressed so every file's contents are one range of bytes in the archive
+        3. An index file ("{Archive}.index.json") is written next to the archive. It maps the name of each file
+            in the archive to the offset and size of its contents so one file can be read with a single seek
+            (see read_archive_part) without reading through the archive
+        4. A file that is written again (e.g. word/document.xml and word/glossary/document.xml are both
+            XML/document.xml) replaces the earlier file the same way it does in a base directory. The earlier
+            contents can not be taken out of the sequential archive, but they are no longer listed: a .zip
+            archive's central directory and the index only have the last file of each name, and extracting a .tar
+            archive (or reading it with tarfile) gives the last member of each name
+
+        :param archive_path: Path of the archive to write. It must not already exist
+        :param root_dir_path: Path to the directory that the names in the archive are relative to
+        :param archive_format: "tar" or "zip"
+        :param metrics: The Metrics that the output files are counted in or None to not count them
+        :param write_index: True to write the index file when the archive is closed
+        """
+        FileWriter.__init__(self, metrics)
+        self.archive_path = archive_path
+        self.root_dir_path = root_dir_path
+        self.archive_format = archive_format
+        self.write_index = write_index
+        # Maps the name of each file in the archive to the offset and size of its contents
+        self.index = {}
+        # The ZipInfo of each file in a .zip archive so a file that is written again can replace it
+        self.zip_infos = {}
+        # Names of the directories that have been added to the archive
+        self.dir_names = set()
+        # Mode "x" never overwrites an archive that already exists
+        if archive_format == "tar":
+            import tarfile  # Writes the output files into a .tar archive
+            self.archive = tarfile.open(archive_path, "x", format=tarfile.PAX_FORMAT)
+        else:
+            self.archive = zipfile.ZipFile(archive_path, "x", zipfile.ZIP_STORED, allowZip64=True)
+
+    def get_name(self, path):
+        """
+        The get_name function is a helper function that is used to get the name in the archive of an output file
+
+        :param path: Path of the output file or directory
+        :return: The path relative to the root directory with "/" separators
+        """
+        return os.path.relpath(path, self.root_dir_path).replace(os.sep, "/")
+
+    def make_dir(self, dir_path):
+        """
+        The make_dir function is responsible for adding a directory to the archive if it has not already been
+        added. Empty directories (e.g. a Media directory without media) are kept so the layout stays the same
+
+        :param dir_path: Path of the directory to add
+        :return: None
+        """
+        name = self.get_name(dir_path)
+        if name in self.dir_names:
+            return
+        self.dir_names.add(name)
+        if self.archive_format == "tar":
+            import tarfile
+            dir_info = tarfile.TarInfo(name)
+            dir_info.type = tarfile.DIRTYPE
+            dir_info.mode = 0o755
+            dir_info.mtime = time.time()
+            self.archive.addfile(dir_info)
+        else:
+            self.archive.writestr(zipfile.ZipInfo(name + "/", time.localtime()[:6]), b"")
+
+    def add_file(self, name, size, source_file):
+        """
+        The add_file function is responsible for adding a file to the archive and recording it in the index. The
+        contents are copied from source_file a chunk at a time so a large file is never held in memory
+
+        :param name: Name of the file in the archive
+        :param size: Number of bytes in the file
+        :param source_file: A binary file-like object to read the contents from
+        :return: None
+        """
+        if self.archive_format == "tar":
+            import tarfile
+            file_info = tarfile.TarInfo(name)
+            file_info.size = size
+            file_info.mode = 0o644
+            file_info.mtime = time.time()
+            self.archive.addfile(file_info, source_file)
+            # The contents end at the archive's offset, before padding to a whole 512 byte block
+            padded_size = (size + tarfile.BLOCKSIZE - 1) // tarfile.BLOCKSIZE * tarfile.BLOCKSIZE
+            self.index[name] = {"offset": self.archive.offset - padded_size, "size": size}
+        else:
+            if name in self.zip_infos:
+                # Stop listing the earlier file of the same name so it is replaced
+                self.archive.filelist.remove(self.zip_infos[name])
+                del self.archive.NameToInfo[name]
+            file_info = zipfile.ZipInfo(name, time.localtime()[:6])
+            file_info.compress_type = zipfile.ZIP_STORED
+            file_info.file_size = size
+            with self.archive.open(file_info, "w") as file:
+                shutil.copyfileobj(source_file, file, READ_CHUNK_SIZE)
+            self.zip_infos[name] = file_info
+            # The offset of the contents is found from the local header once the archive is closed
+            self.index[name] = {"header_offset": file_info.header_offset, "size": size}
+
+    def add_bytes(self, name, data):
+        """
+        The add_bytes function is responsible for adding a file that is in memory to the archive
+
+        :param name: Name of the file in the archive
+        :param data: The contents of the file as bytes
+        :return: None
+        """
+        self.add_file(name, len(data), io.BytesIO(data))
+
+    def write(self, file_path, data):
+        """
+        The write function is responsible for adding a file to the archive
+
+        :param file_path: Path of the file to write
+        :param data: The contents to write as bytes
+        :return: None
+        """
+        self.add_bytes(self.get_name(file_path), data)
+        self.metrics.count_write(len(data))
+
+    def copy(self, source_file_path, file_path):
+        """
+        The copy function is responsible for adding a file that is not part of the document (e.g. the
+        original .docx file) to the archive. It is streamed into the archive a chunk at a time
+
+        :param source_file_path: Path of the file to copy
+        :param file_path: Path of the file to write
+        :return: None
+        """
+        with open(source_file_path, "rb") as source_file:
+            size = os.fstat(source_file.fileno()).st_size
+            self.add_file(self.get_name(file_path), size, source_file)
+        self.metrics.count_write(size)
+
+    def open(self, file_path):
+        """
+        The open function is responsible for opening a file so its contents can be written a piece at a time.
+        The pieces are kept in memory and the file is added to the archive once it is closed, since the size of a
+        file has to be known before it is added
+
+        :param file_path: Path of the file to write
+        :return: A BufferedFile that is closed once all of the contents have been written
+        """
+        return BufferedFile(self, self.get_name(file_path))
+
+    def append_archive(self, archive_path):
+        """
+        The append_archive function is responsible for adding every directory and file of another archive of the
+        same format to this archive. It is used to join the archives of the documents of a batch into one archive.
+        Each file is streamed from the other archive a chunk at a time
+
+        :param archive_path: Path of the archive to add
+        :return: None
+        """
+        if self.archive_format == "tar":
+            import tarfile
+            with tarfile.open(archive_path, "r") as archive:
+                for member in archive:
+                    if member.isdir():
+                        self.make_dir(os.path.join(self.root_dir_path, member.name))
+                    elif member.isfile():
+                        self.add_file(member.name, member.size, archive.extractfile(member))
+        else:
+            with zipfile.ZipFile(archive_path, "r") as archive:
+                for member in archive.infolist():
+                    if member.is_dir():
+                        self.make_dir(os.path.join(self.root_dir_path, member.filename.rstrip("/")))
+                    else:
+                        with archive.open(member) as member_file:
+                            self.add_file(member.filename, member.file_size, member_file)
+
+    def close(self):
+        """
+        The close function is responsible for finishing the archive and writing its index file
+
+        :return: None
+        """
+        self.archive.close()
+        if not self.write_index:
+            return
+        if self.archive_format == "zip":
+            # The contents of a stored file start after its local header, which is 30 bytes plus its name and extra
+            with open(self.archive_path, "rb") as archive_file:
+                for entry in self.index.values():
+                    archive_file.seek(entry["header_offset"])
+                    header = archive_file.read(30)
+                    name_length = int.from_bytes(header[26:28], "little")
+                    extra_length = int.from_bytes(header[28:30], "little")
+                    entry["offset"] = entry.pop("header_offset") + 30 + name_length + extra_length
+        with open(self.archive_path + ".index.json", "w", encoding="utf-8") as file:
+            json.dump({"format": self.archive_format, "files": self.index}, file, indent=4, sort_keys=True)
+
+
+class MemoryWriter(FileWriter):
+
+    def __init__(self, base_dir_path, metrics=None):
+        """
+        The MemoryWriter class is responsible for keeping the output files of a document in memory instead of
+        writing them to the file system. It is used by itemize_bytes so a service can itemize documents it already
+        has in memory (e.g. from a message queue) and get every output file back without touching the disk
+
+        :param base_dir_path: Path to the base directory that the names of the output files are relative to.
+            It is never created
+        :param metrics: The Metrics that the output files are counted in or None to not count them
+        """
+        FileWriter.__init__(self, metrics)
+        self.base_dir_path = base_dir_path
+        # Maps the path of each output file relative to the base directory (e.g. "XML/document.xml") to its contents
+        self.files = {}
+        # Paths of the directories relative to the base directory. Empty directories are kept so the layout stays
+        # the same as the base directory
+        self.dir_names = set()
+
+    def get_name(self, path):
+        """
+        The get_name function is a helper function that is used to get the name of an output file
+
+        :param path: Path of the output file or directory
+        :return: The path relative to the base directory with "/" separators
+        """
+        return os.path.relpath(path, self.base_dir_path).replace(os.sep, "/")
+
+    def make_dir(self, dir_path):
+        """
+        The make_dir function is responsible for recording a directory
+
+        :param dir_path: Path of the directory
+        :return: None
+        """
+        self.dir_names.add(self.get_name(dir_path))
+
+    def add_bytes(self, name, data):
+        """
+        The add_bytes function is responsible for keeping the contents of a file
+
+        :param name: Name of the file relative to the base directory
+        :param data: The contents of the file as bytes
+        :return: None
+        """
+        self.files[name] = data
+
+    def write(self, file_path, data):
+        """
+        The write function is responsible for keeping the contents of a file in memory
+
+        :param file_path: Path of the file to write
+        :param data: The contents to write as bytes
+        :return: None
+        """
+        self.add_bytes(self.get_name(file_path), data)
+        self.metrics.count_write(len(data))
+
+    def copy(self, source_file_path, file_path):
+        """
+        The copy function is responsible for reading a file that is not part of the document into memory
+
+        :param source_file_path: Path of the file to copy
+        :param file_path: Path of the file to write
+        :return: None
+        """
+        with open(source_file_path, "rb") as source_file:
+            data = source_file.read()
+        self.write(file_path, data)
+
+    def open(self, file_path):
+        """
+        The open function is responsible for opening a file so its contents can be written a piece at a time
+
+        :param file_path: Path of the file to write
+        :return: A BufferedFile that is closed once all of the contents have been written
+        """
+        return BufferedFile(self, self.get_name(file_path))
+
+
+class BufferedFile:
+
+    def __init__(self, writer, name):
+        """
+        The BufferedFile class is responsible for writing an output file of an ArchiveWriter or a MemoryWriter a
+        piece at a time. The pieces are kept in memory and the file is added to the writer once the BufferedFile is
+        closed
+
+        :param writer: The ArchiveWriter or MemoryWriter the file is written for
+        :param name: Name of the file in the writer
+        """
+        self.writer = writer
+        self.name = name
+        self.buffer = io.BytesIO()
+
+    def write(self, data):
+        """
+        The write function is responsible for writing the next piece of the file
+
+        :param data: The piece to write as bytes
+        :return: None
+        """
+        self.buffer.write(data)
+
+    def close(self):
+        """
+        The close function is responsible for adding the file to the writer
+
+        :return: None
+        """
+        self.writer.add_bytes(self.name, self.buffer.getvalue())
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_traceback):
+        if exc_type is None:  # Do not add a file that was not completely written
+            self.close()
+
+
+def read_archive_part(archive_path, name):
+    """
+    The read_archive_part function is responsible for reading one file from an archive written by an ArchiveWriter
+    using the archive's index file, without reading through the rest of the archive
+
+    :param archive_path: Path of the archive
+    :param name: Name of the file in the archive (e.g. "{Doc Name}_Itemized({Time Stamp})/XML/document.xml")
+    :return: The contents of the file as bytes or None if the file is not in the archive
+    """
+    with open(archive_path + ".index.json", "r", encoding="utf-8") as file:
+        entry = json.load(file)["files"].get(name)
+    if entry is None:
+        return None
+    with open(archive_path, "rb") as archive_file:
+        archive_file.seek(entry["offset"])
+        return archive_file.read(entry["size"])
+
+
+class ItemizerOptions:
+
+    def __init__(self, search_terms=(), store_dir_path=None, index_file_path=None, metrics=False,
+                 profile_doc=None, max_depth=3, max_embedded_size=256 * 1024 * 1024, limits=None, archive_format=None,
+                 archive_root_dir_path=None, batch_archive_path=None, in_memory=False, signature=False,
+                 write_threads=4, index_contents=False):
+        """
+        The ItemizerOptions class is responsible for holding the options used to itemize each document so they can
+        be passed to run_docx_itemizer and to the worker processes of a batch as one object
+
+        :param search_terms: The regex terms to match with. Multiple terms are given when a watchlist is used
+        :param store_dir_path: Path to the directory of a blob store to write the output files into or None to
+            write the output files normally
+        :param index_file_path: Path to the SQLite file of a SearchIndex to add each document to or None
+        :param metrics: True to record the Metrics of each stage in the record of each document
+        :param profile_doc: File name or path of a document to profile with cProfile or None
+        :param max_depth: How many levels of embedded documents are itemized. 0 to not itemize embedded documents
+        :param max_embedded_size: Number of bytes of embedded documents that are itemized for each document,
+            including the embedded documents of its embedded documents
+        :param limits: The ExtractionLimits the members of each document are read within or None to use the
+            default limits
+        :param archive_format: "tar" or "zip" to write the output files of each document into an archive with an
+            ArchiveWriter or None to write the output files normally
+        :param archive_root_dir_path: Path to the directory that the names in the archives are relative to or None
+            to use the directory of each document
+        :param batch_archive_path: Path to the archive that the archives of every document of a batch are joined
+            into or None to keep an archive for each document
+        :param in_memory: True to keep the output files of each document in memory with a MemoryWriter instead of
+            writing them to the file system
+        :param signature: True to add the ContentSignature of each document to its record so near-duplicate
+            documents can be clustered
+        :param write_threads: Number of threads of the WriteScheduler that writes the output files of each document
+            when they are written to the file system. 0 to write them in the thread that itemizes the document
+        :param index_contents: True to keep the compressed contents of every member in the SearchIndex
+        """
+        self.search_terms = list(search_terms)
+        self.store_dir_path = store_dir_path
+        self.index_file_path = index_file_path
+        self.metrics = metrics
+        self.profile_doc = profile_doc
+        self.max_depth = max_depth
+        self.max_embedded_size = max_embedded_size
+        self.limits = limits if limits is not None else ExtractionLimits()
+        self.archive_format = archive_format
+        self.archive_root_dir_path = archive_root_dir_path
+        self.batch_archive_path = batch_archive_path
+        self.in_memory = in_memory
+        self.signature = signature
+        self.write_threads = write_threads
+        self.index_contents = index_contents
+
+    def create_metrics(self):
+        """
+        The create_metrics function is responsible for creating the Metrics of a document
+
+        :return: A Metrics if the metrics are recorded, otherwise NULL_METRICS
+        """
+        if self.metrics:
+            return Metrics()
+        return NULL_METRICS
+
+    def is_profiled(self, doc_file_path):
+        """
+        The is_profiled function is responsible for checking if a document is the document that is profiled
+
+        :param doc_file_path: Path to the document
+        :return: True if the document's file name or path is the profiled document
+        """
+        if self.profile_doc is None:
+            return False
+        return self.profile_doc in (os.path.basename(doc_file_path), doc_file_path) \
+            or os.path.abspath(self.profile_doc) == os.path.abspath(doc_file_path)
+
+    def get_archive_path(self, base_dir_path, root_dir_path):
+        """
+        The get_archive_path function is responsible for getting the path of the archive of a document. The archive
+        is named after the path of the base directory in the root directory
+        (e.g. "{Doc Name}_Itemized({Time Stamp}).tar"). In a batch that is joined into one archive it is a part
+        that is joined into the batch's archive once the document is done
+
+        :param base_dir_path: Path to the base directory that holds all of the output of this script
+        :param root_dir_path: Path to the directory that the names in the archive are relative to
+        :return: Path of the archive of the document
+        """
+        name = os.path.relpath(base_dir_path, root_dir_path).replace(os.sep, "_")
+        if self.batch_archive_path is not None:
+            return self.batch_archive_path + "." + name + ".part"
+        return os.path.join(root_dir_path, name + "." + self.archive_format)
+
+    def create_writer(self, base_dir_path, metrics=None, root_dir_path=None):
+        """
+        The create_writer function is responsible for creating the FileWriter used to write the output
+        files of a document
+
+        :param base_dir_path: Path to the base directory that holds all of the output of this script
+        :param metrics: The Metrics that the output files are counted in or None to not count them
+        :param root_dir_path: Path to the directory that the names in an archive are relative to
+        :return: A MemoryWriter if the output is kept in memory, an ArchiveWriter if an archive is used, a
+            BlobStoreWriter if a blob store is used, otherwise a FileWriter
+        """
+        if self.in_memory:
+            return MemoryWriter(base_dir_path, metrics)
+        if self.archive_format is not None:
+            # The archive of a batch's document does not need an index since it is joined into the batch's archive
+            return ArchiveWriter(self.get_archive_path(base_dir_path, root_dir_path), root_dir_path,
+                                 self.archive_format, metrics, self.batch_archive_path is None)
+        if self.store_dir_path is not None:
+            return BlobStoreWriter(self.store_dir_path, base_dir_path, metrics)
+        return FileWriter(metrics, WriteScheduler(self.write_threads))
+
+
+class ExtractionLimits:
+
+    def __init__(self, max_part_size=256 * 1024 * 1024, max_doc_size=1024 * 1024 * 1024, max_entries=10000,
+                 max_ratio=200, member_timeout=60):
+        """
+        The ExtractionLimits class is responsible for holding the limits that the members of a document are read
+        within. A crafted document (e.g. a zip bomb with a 10 GB document.xml or thousands of tiny files) would
+        otherwise fill the disk and memory and hang the worker. A member that breaks a limit is not extracted and
+        the document is flagged as suspicious instead of failing
+
+        :param max_part_size: Number of uncompressed bytes a member can have
+        :param max_doc_size: Number of uncompressed bytes all of a document's members can have
+        :param max_entries: Number of members a document can have
+        :param max_ratio: How many times larger than its compressed size a member can be. Only checked for
+            members larger than MIN_RATIO_CHECK_SIZE since small files can compress very well
+        :param member_timeout: Number of seconds reading a member can take
+        """
+        self.max_part_size = max_part_size
+        self.max_doc_size = max_doc_size
+        self.max_entries = max_entries
+        self.max_ratio = max_ratio
+        self.member_timeout = member_timeout
+
+
+class EmbeddedDoc:
+
+    def __init__(self, name, file_path, data, base_dir_path, depth, budget, parent_doc_path, root_doc_path):
+        """
+        The EmbeddedDoc class is responsible for holding a document that is embedded in another document
+        (e.g. a .docx, .xlsx or .pptx file in "word/embeddings" or a zip file) until it is itemized. Embedded
+        documents are itemized from their bytes in memory into the "Embedded" directory of their parent's base
+        directory, and can be itemized by a different worker process than their parent. The bytes are then saved
+        to a file so only the file's path is passed between the processes
+
+        :param name: Name of the member of the parent document that holds the embedded document
+        :param file_path: Path of the member within the parent's "Extracted Document" directory
+        :param data: The embedded document's contents as bytes
+        :param base_dir_path: Path to the base directory for the output of the embedded document
+        :param depth: How many documents the embedded document is nested in. 1 for a document embedded in a
+            document of the directory
+        :param budget: Number of bytes of its own embedded documents that can be itemized
+        :param parent_doc_path: Path to the document that the embedded document is embedded in
+        :param root_doc_path: Path to the document of the directory that the embedded document is nested in
+        """
+        self.name = name
+        self.file_path = file_path
+        self.data = data
+        self.base_dir_path = base_dir_path
+        self.depth = depth
+        self.budget = budget
+        self.parent_doc_path = parent_doc_path
+        self.root_doc_path = root_doc_path
+        # Path to the file that holds the embedded document's contents once they have been saved
+        self.data_file_path = None
+
+    def save(self, dir_path):
+        """
+        The save function is responsible for writing the embedded document's contents to a new file in a directory
+        and dropping them from memory, so the EmbeddedDoc can be passed to another process without its contents
+
+        :param dir_path: Path to the directory to create the file in
+        :return: None
+        """
+        import tempfile  # Creates the file that holds the embedded document's contents
+        file_descriptor, self.data_file_path = tempfile.mkstemp(dir=dir_path, suffix=".bin")
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(self.data)
+        self.data = None
+
+    def get_data(self):
+        """
+        The get_data function is responsible for getting the embedded document's contents from memory or from the
+        file they were saved to
+
+        :return: The embedded document's contents as bytes
+        """
+        if self.data is not None:
+            return self.data
+        with open(self.data_file_path, "rb") as file:
+            return file.read()
+
+
+def read_member(zip_ref, member, limits):
+    """
+    The read_member function is responsible for reading a member of a document within the ExtractionLimits.
+        1. The member's declared size and compression ratio are checked before it is read
+        2. The member is decompressed a chunk at a time and its actual size, compression ratio, and the time
+            taken are checked after each chunk so a member that breaks a limit is stopped early
+        3. A member that is damaged (e.g. a bad CRC or compressed data) or uses an unsupported compression is
+            not extracted instead of stopping the whole document
+
+    :param zip_ref: The zipfile.ZipFile of the document
+    :param member: The zipfile.ZipInfo of the member
+    :param limits: The ExtractionLimits the member is read within
+    :return:    1. data: The member's contents as bytes or None if it was not read
+                2. reason: Why the member was not read or None if it was read
+    """
+    compress_size = max(member.compress_size, 1)
+    # Check the sizes declared in the zip file before reading anything
+    if member.file_size > limits.max_part_size:
+        return None, "Declared size of " + str(member.file_size) + " bytes is over the limit of " \
+            + str(limits.max_part_size) + " bytes"
+    if member.file_size > MIN_RATIO_CHECK_SIZE and member.file_size / compress_size > limits.max_ratio:
+        return None, "Declared compression ratio of " + str(member.file_size // compress_size) \
+            + " is over the limit of " + str(limits.max_ratio)
+    start_time = time.monotonic()
+    chunks = []
+    size = 0
+    try:
+        with zip_ref.open(member) as member_file:
+            while True:
+                chunk = member_file.read(READ_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                # Check the actual size in case the declared size is wrong
+                if size > limits.max_part_size or size > member.file_size:
+                    return None, "Uncompressed size is over the declared size of " + str(member.file_size) \
+                        + " bytes or the limit of " + str(limits.max_part_size) + " bytes"
+                if size > MIN_RATIO_CHECK_SIZE and size / compress_size > limits.max_ratio:
+                    return None, "Compression ratio is over the limit of " + str(limits.max_ratio)
+                if time.monotonic() - start_time > limits.member_timeout:
+                    return None, "Reading took more than the limit of " + str(limits.member_timeout) + " seconds"
+                chunks.append(chunk)
+    except (zipfile.BadZipFile, zlib.error, EOFError, NotImplementedError, RuntimeError) as error:
+        # RuntimeError is raised for encrypted members
+        return None, "Could not be read: " + str(error)
+    return b"".join(chunks), None
+
+
+def get_time_stamp():
+    """
+    The get_time_stamp function is a helper function used to get the current time stamp as a string
+    Format: %Y%m%d-%H%M%S
+
+    :return: The current time stamp as a string (Format: %Y%m%d-%H%M%S)
+    """
+    return time.strftime("%Y%m%d-%H%M%S")
+
+
+def get_paths(doc_file_path, make_base_dir=True, base_dir_path=None):
+    """
+    The get_paths function is a helper function that is used to get the paths of directories
+    that will be used throughout the script. All of these directories are based around the doc_file_path
+
+    :param doc_file_path: Path to the original .docx file
+    :param make_base_dir: True to create the base directory. It is not created when the output is archived
+    :param base_dir_path: Path to use for the base directory or None to name it after the document and the current
+        time stamp
+    :return:    1. base_dir_path: Path to use for the base directory for the output files of this script
+                2. extracted_dir_path: Path to use for the "Extracted Document" directory that will be in the base
+                directory. This directory contains the unitemized files from the .docx file.
+                3. doc_copy_path: Path to copy the original .docx file. This path is within the base directory.
+                4. log_file_path: Path to create the log file
+    """
+    file_name = os.path.basename(doc_file_path)  # Get the document's file name from the path
+    dir_path = os.path.dirname(doc_file_path)  # Get the path of the directory that contains the document
+    doc_name = os.path.splitext(file_name)[0]  # Get the document's name without the extension
+
+    # Create the base directory name, "Extracted Directory" name, and log file name
+    if base_dir_path is None:
+        time_stamp = get_time_stamp()  # Get the current time stamp as a string
+        base_dir_name = doc_name + "_Itemized(" + time_stamp + ")"
+    extracted_dir_name = "Extracted Document"
+    log_file_name = "log.txt"
+
+    # Create the base directory path, "Extracted Directory" path, document copy path, and log file path
+    if base_dir_path is None:
+        base_dir_path = os.path.join(dir_path, base_dir_name)
+    extracted_dir_path = os.path.join(base_dir_path, extracted_dir_name)
+    doc_copy_path = os.path.join(base_dir_path, file_name)
+    log_file_path = os.path.join(base_dir_path, log_file_name)
+
+    # Create the base directory
+    if make_base_dir:
+        os.mkdir(base_dir_path)
+
+    # Return the paths
+    return base_dir_path, extracted_dir_path, doc_copy_path, log_file_path
+
+
+def get_embedded_paths(base_dir_path, make_base_dir=True):
+    """
+    The get_embedded_paths function is a helper function that is used to get the paths of directories that will be
+    used for an embedded document. Embedded documents are not copied since they are already in their parent's
+    "Extracted Document" directory
+
+    :param base_dir_path: Path to the base directory for the output of the embedded document
+    :param make_base_dir: True to create the base directory. It is not created when the output is archived
+    :return:    1. base_dir_path: Path to use for the base directory for the output of the embedded document
+                2. extracted_dir_path: Path to use for the "Extracted Document" directory in the base directory
+                3. doc_copy_path: None since embedded documents are not copied
+                4. log_file_path: Path to create the log file
+    """
+    # Create the base directory
+    if make_base_dir:
+        os.makedirs(base_dir_path)
+    return base_dir_path, os.path.join(base_dir_path, "Extracted Document"), None, \
+        os.path.join(base_dir_path, "log.txt")
+
+
+def get_member_path(extracted_dir_path, member_name):
+    """
+    The get_member_path function is a helper function that is used to get the path a member of the document
+    will have within the "Extracted Document" directory. The member's name is cleaned the same way
+    zipfile's extractall does so a member can never be written outside of the "Extracted Document" directory
+
+    :param extracted_dir_path: Path to the "Extracted Document" directory in the base directory
+    :param member_name: The name of the member within the document (e.g. "word/document.xml")
+    :return: The path of the member within the "Extracted Document" directory or None if the name is empty
+    """
+    # Remove drive letters, empty parts, and parent and current directory references from the member's name
+    member_name = os.path.splitdrive(member_name.replace("\\", "/"))[1]
+    name_parts = [part for part in member_name.split("/") if part not in ("", ".", "..")]
+    if len(name_parts) == 0:
+        return None
+    return os.path.join(extracted_dir_path, *name_parts)
+
+
+class Metrics:
+
+    def __init__(self):
+        """
+        The Metrics class is responsible for recording how long each stage of itemizing a document takes so a slow
+        document or batch can be narrowed down to the stage that is slow
+
+        For every stage (e.g. Copy, Read, Extract, Itemize, Content, ImageFinder, Searcher, Report) it records:
+            1. wall_time: The wall clock time spent in the stage in seconds
+            2. cpu_time: The CPU time spent in the stage in seconds
+            3. bytes_read: The number of bytes read by the stage
+            4. bytes_written: The number of bytes written to output files by the stage
+            5. files: The number of output files written by the stage
+        Stages can be nested (e.g. Content runs inside of Itemize). The time of a nested stage is only counted
+        for the nested stage so the times of all of the stages add up to the time of the whole document.
+        Bytes and files are counted for the stage that is currently running, or "Other" if no stage is running
+        """
+        # The metrics of each stage by its name
+        self.stages = {}
+        # Names of the stages that are currently running. The last stage is the one that is counted
+        self.stack = []
+        # Wall clock and CPU time when the time was last counted for a stage
+        self.last_wall_time = 0
+        self.last_cpu_time = 0
+
+    def get_stage(self, name):
+        """
+        The get_stage function is a helper function that is used to get the metrics of a stage
+
+        :param name: Name of the stage
+        :return: The dictionary of the stage's metrics
+        """
+        stage = self.stages.get(name)
+        if stage is None:
+            stage = {"wall_time": 0, "cpu_time": 0, "bytes_read": 0, "bytes_written": 0, "files": 0}
+            self.stages[name] = stage
+        return stage
+
+    def count_time(self):
+        """
+        The count_time function is a helper function that is used to add the time since the time was last counted
+        to the stage that is currently running
+
+        :return: None
+        """
+        wall_time = time.perf_counter()
+        cpu_time = time.process_time()
+        if len(self.stack) > 0:
+            stage = self.get_stage(self.stack[-1])
+            stage["wall_time"] += wall_time - self.last_wall_time
+            stage["cpu_time"] += cpu_time - self.last_cpu_time
+        self.last_wall_time = wall_time
+        self.last_cpu_time = cpu_time
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """
+        The stage function is responsible for timing the code that is run inside of it as a stage
+
+        :param name: Name of the stage
+        :return: A context manager that times the stage
+        """
+        self.count_time()
+        self.stack.append(name)
+        try:
+            yield
+        finally:
+            self.count_time()
+            self.stack.pop()
+
+    def count_read(self, byte_count):
+        """
+        The count_read function is responsible for counting bytes read by the stage that is currently running
+
+        :param byte_count: Number of bytes that were read
+        :return: None
+        """
+        self.get_stage(self.stack[-1] if len(self.stack) > 0 else "Other")["bytes_read"] += byte_count
+
+    def count_write(self, byte_count, file_count=1):
+        """
+        The count_write function is responsible for counting an output file written by the stage that is
+        currently running
+
+        :param byte_count: Number of bytes that were written
+        :param file_count: Number of output files that were written
+        :return: None
+        """
+        stage = self.get_stage(self.stack[-1] if len(self.stack) > 0 else "Other")
+        stage["bytes_written"] += byte_count
+        stage["files"] += file_count
+
+    def get_record(self):
+        """
+        The get_record function is responsible for getting the metrics of every stage for the Report's record
+
+        :return: A dictionary of each stage's name to its metrics
+        """
+        return self.stages
+
+
+class NullMetrics:
+
+    def __init__(self):
+        """
+        The NullMetrics class is used in place of Metrics when the metrics are not recorded. Every function does
+        nothing so the stages add almost no time to the itemizing of a document
+        """
+        # The same context manager is given for every stage since it does nothing
+        self.null_context = contextlib.nullcontext()
+
+    def stage(self, name):
+        """
+        The stage function does nothing
+
+        :param name: Name of the stage
+        :return: A context manager that does nothing
+        """
+        return self.null_context
+
+    def count_read(self, byte_count):
+        """
+        The count_read function does nothing
+
+        :param byte_count: Number of bytes that were read
+        :return: None
+        """
+
+    def count_write(self, byte_count, file_count=1):
+        """
+        The count_write function does nothing
+
+        :param byte_count: Number of bytes that were written
+        :param file_count: Number of output files that were written
+        :return: None
+        """
+
+    def get_record(self):
+        """
+        The get_record function does nothing
+
+        :return: None
+        """
+        return None
+
+
+# Used by every document that does not record metrics
+NULL_METRICS = NullMetrics()
+
+
+class Report:
+
+    def __init__(self, doc_path, base_dir_path, log_file_path):
+        """
+        The Report class is responsible for collecting the results of a document in memory while it is itemized
+        and writing them once when the document is done, instead of opening the log file for every line
+
+        A Report holds:
+            1. The lines of the human readable log that is written to the log file and printed to the console
+            2. A machine readable record of the document that is written as JSON to "report.json" in the base
+                directory (e.g. the document's hash, the path, size and hash of each of its files, hidden images
+                and hidden files, and search term matches)
+
+        :param doc_path: Path to the document
+        :param base_dir_path: Path to the base directory that holds all of the output of this script
+        :param log_file_path: Path to the log file
+        """
+        self.log_file_path = log_file_path
+        self.report_file_path = os.path.join(base_dir_path, "report.json")
+        self.lines = []
+        self.record = {"document": os.path.abspath(doc_path), "output": os.path.abspath(base_dir_path)}
+        # The EmbeddedDocs found in the document that still need to be itemized. They are not part of the record
+        self.embedded_docs = []
+        # The output files of the document if they are kept in memory, mapping each file's path relative to the
+        # base directory to its contents, otherwise None
+        self.files = None
+
+    def log(self, message):
+        """
+        The log function is responsible for adding a line to the log
+
+        :param message: The message to log
+        :return: None
+        """
+        self.lines.append(message)
+
+    def get_text(self):
+        """
+        The get_text function is responsible for getting the human readable log
+
+        :return: The lines of the log joined by newlines
+        """
+        return "".join(line + "\n" for line in self.lines)
+
+    def write(self, writer):
+        """
+        The write function is responsible for writing the log file and the "report.json" file
+
+        :param writer: The FileWriter used to write all of the output files
+        :return: None
+        """
+        writer.write(self.log_file_path, self.get_text().encode("utf-8"))
+        writer.write(self.report_file_path, json.dumps(self.record, indent=4).encode("utf-8"))
+
+
+def log_hidden_files(report, prefix, hidden_file_paths, kind):
+    """
+    The log_hidden_files function is a helper function that is used to log the information about hidden images
+    or other hidden files found by the ImageFinder
+
+    :param report: The Report of the document
+    :param prefix: Prefix to add to each line of the log
+    :param hidden_file_paths: The information about the hidden files from the ImageFinder
+    :param kind: "Image" for hidden images or "File" for other hidden files
+    :return: None
+    """
+    # Label of each hidden file in the log (e.g. "Hidden Image File 1" or "Hidden File 1")
+    label = "Hidden Image File " if kind == "Image" else "Hidden File "
+    if len(hidden_file_paths) > 0: # Check if the document has any hidden files
+        report.log(prefix + "Hidden " + kind + "s Found:")
+        for i in range(len(hidden_file_paths)): # For each hidden file log out it's info
+            hidden_file_path = hidden_file_paths[i]
+            report.log(prefix + "\t" + label + str(i + 1) + ": " + os.path.basename(hidden_file_path[0]))
+            report.log(prefix + "\t\tActual File Type: " + hidden_file_path[3])
+            report.log(prefix + "\t\tHidden " + kind + " Found At: " + os.path.abspath(hidden_file_path[0]))
+            report.log(prefix + "\t\tCopy Of Hidden " + kind + " At: " + os.path.abspath(hidden_file_path[1]))
+            report.log(prefix + "\t\tCopy Of Hidden " + kind + " With Correct Extension: " + os.path.abspath(hidden_file_path[2]))
+            if i < len(hidden_file_paths) - 1:
+                report.log(prefix + "\t~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    else:
+        report.log(prefix + "No Hidden " + kind + "s Found")
+
+
+def log_writes(report, prefix, write_record):
+    """
+    The log_writes function is a helper function that is used to log how the output files of a document were
+    written by its WriteScheduler and the I/O that was saved by cloning files
+
+    :param report: The Report of the document
+    :param prefix: Prefix added to the start of every line
+    :param write_record: The record from the WriteScheduler's get_record function
+    :return: None
+    """
+    report.log(prefix + "Output Files Written: " + str(write_record["files_written"]) + " Files ("
+               + str(write_record["bytes_written"]) + " Bytes)")
+    if write_record["files_cloned"] > 0:
+        methods = ", ".join(method + ": " + str(count)
+                            for method, count in sorted(write_record["clone_methods"].items()))
+        report.log(prefix + "Output Files Cloned: " + str(write_record["files_cloned"]) + " Files ("
+                   + str(write_record["bytes_cloned"]) + " Bytes, " + methods + ")")
+    if write_record["duplicate_files"] > 0:
+        report.log(prefix + "\tDuplicate Output Files Cloned Instead Of Written: "
+                   + str(write_record["duplicate_files"]) + " Files (" + str(write_record["duplicate_bytes"])
+                   + " Bytes Not Written From Memory)")
+
+
+def log_relationship_findings(report, prefix, findings, extracted_dir_path):
+    """
+    The log_relationship_findings function is a helper function that is used to log the findings of the
+    RelationshipGraph of a document
+
+    :param report: The Report of the document
+    :param prefix: Prefix added to the start of every line
+    :param findings: The findings from the RelationshipGraph's get_findings function
+    :param extracted_dir_path: Path to the "Extracted Document" directory in the base directory
+    :return: None
+    """
+    report.log(prefix + "Checking Relationships")
+    if not findings["package"]:
+        report.log(prefix + "No Content Types Found. The Document Is Not An Office Document")
+        return
+    report.log(prefix + "\tParts: " + str(findings["parts"]) + ", Relationships: " + str(findings["relationships"]))
+    if len(findings["orphans"]) > 0:
+        report.log(prefix + "\tOrphan Parts (Not Part Of The Relationships): " + str(len(findings["orphans"])))
+        for orphan in findings["orphans"]:
+            report.log(prefix + "\t\t" + os.path.abspath(get_member_path(extracted_dir_path, orphan["name"])))
+            report.log(prefix + "\t\t\tReason: " + orphan["reason"])
+    if len(findings["dangling"]) > 0:
+        report.log(prefix + "\tDangling Relationships (Target Not Found): " + str(len(findings["dangling"])))
+        for relationship in findings["dangling"]:
+            report.log(prefix + "\t\t" + relationship["source"] + " " + relationship["id"] + " ("
+                       + relationship["type"] + "): " + relationship["target"])
+    if len(findings["external"]) > 0:
+        report.log(prefix + "\tExternal Targets: " + str(len(findings["external"])))
+        for relationship in findings["external"]:
+            report.log(prefix + "\t\t" + relationship["source"] + " " + relationship["id"] + " ("
+                       + relationship["type"] + "): " + relationship["target"])
+    if len(findings["content_type_mismatches"]) > 0:
+        report.log(prefix + "\tContent Type Mismatches: " + str(len(findings["content_type_mismatches"])))
+        for mismatch in findings["content_type_mismatches"]:
+            report.log(prefix + "\t\t" + os.path.abspath(get_member_path(extracted_dir_path, mismatch["name"])))
+            report.log(prefix + "\t\t\tDeclared Content Type: "
+                       + (mismatch["declared"] if mismatch["declared"] is not None else "Not Declared")
+                       + ", Actual File Type: " + (mismatch["actual"] if mismatch["actual"] is not None else "Unknown"))
+    for error in findings["errors"]:
+        report.log(prefix + "\tPart Could Not Be Parsed: " + error["name"] + " (" + error["error"] + ")")
+    if sum(len(findings[key]) for key in ("orphans", "dangling", "external", "content_type_mismatches",
+                                          "errors")) == 0:
+        report.log(prefix + "No Relationship Problems Found")
+
+
+def get_hidden_file_record(hidden_file_path):
+    """
+    The get_hidden_file_record function is a helper function that is used to convert the information about a
+    hidden image or other hidden file from the ImageFinder into a record for the Report
+
+    :param hidden_file_path: The information about the hidden file from the ImageFinder
+    :return: A dictionary with the hidden file's path, the paths of its copies, and its actual type
+    """
+    return {"path": os.path.abspath(hidden_file_path[0]), "copy": os.path.abspath(hidden_file_path[1]),
+            "corrected_copy": os.path.abspath(hidden_file_path[2]), "type": hidden_file_path[3]}
+
+
+def format_offsets(offsets, offset_count=None):
+    """
+    The format_offsets function is a helper function that is used to format the byte offsets of the matches
+    in a file for the log. Only the first MAX_LOGGED_OFFSETS offsets are listed
+
+    :param offsets: The byte offsets of the matches in a file
+    :param offset_count: The number of matches in the file or None if every offset is given
+    :return: The offsets as a string (e.g. "12, 40, 96 (+5 More)")
+    """
+    if offset_count is None:
+        offset_count = len(offsets)
+    formatted = ", ".join(str(offset) for offset in offsets[:MAX_LOGGED_OFFSETS])
+    if offset_count > MAX_LOGGED_OFFSETS:
+        formatted += " (+" + str(offset_count - MAX_LOGGED_OFFSETS) + " More)"
+    return formatted
+
+
+def run_docx_itemizer(doc_file_path, options, is_dir, embedded_doc=None, doc_data=None, base_dir_path=None):
+    """
+    The run_docx_itemizer is responsible for running all of the sub classes and outputs each sub classes result.
+        1. Runs the Itemizer class to extract and itemize the files from the document
+        2. Runs the ImageFinder class to find any hidden images in the files from the document
+        3. Runs the RelationshipGraph class to find the parts of the document that no relationship targets, the
+        relationships that target missing parts or external targets, and parts that do not match their content type
+        4. If search_terms are provided, runs the Searcher class to find any files that either their
+        file name or contents regex match the search terms
+        5. If a search index is used, runs the SearchIndexer class to add the document to the search index
+        6. Lists the documents embedded in the document. They are added to the Report's embedded_docs so the
+        caller can itemize them, into the "Embedded" directory of the base directory, with the same options
+    The ImageFinder, RelationshipGraph and Searcher are run as inspection stages of the Itemizer so the document is
+    only read once.
+    If metrics are recorded the Metrics of each stage are added to the record of the document, and if the document
+    is the profiled document it is profiled with cProfile and the profile is written to its base directory
+
+    :param doc_file_path: Path to the document
+    :param options: The ItemizerOptions used to itemize the document
+    :param is_dir: True if the scripts is running on a whole directory. False if running on one file.
+        This is used for better output formatting
+    :param embedded_doc: The EmbeddedDoc if the document is embedded in another document, otherwise None.
+        An embedded document is itemized from its bytes in memory and doc_file_path is the path of the member
+        within its parent's "Extracted Document" directory
+    :param doc_data: The document's contents as bytes to itemize it from memory or None to read it from
+        doc_file_path. doc_file_path is still used to name the base directory
+    :param base_dir_path: Path to the base directory of the document or None to name it after the document and the
+        current time stamp. A batch names it before the document is started so it can be recorded in the manifest
+    :return: The Report of the document. The caller outputs the log with the Report's get_text function
+    """
+
+    # Profile the document if it is the profiled document
+    profiler = None
+    if options.is_profiled(doc_file_path):
+        import cProfile  # Profiles the itemizing of the document
+        profiler = cProfile.Profile()
+        profiler.enable()
+    # Metrics records the time of each stage. If metrics are not recorded it does nothing
+    metrics = options.create_metrics()
+    # Get the  paths of directories that will be used throughout the script
+    # The output is written to an archive or kept in memory instead of a base directory if either is used
+    make_base_dir = options.archive_format is None and not options.in_memory
+    if embedded_doc is None:
+        base_dir_path, extracted_dir_path, doc_copy_path, log_file_path = get_paths(doc_file_path, make_base_dir,
+                                                                                    base_dir_path)
+        root_doc_path = doc_file_path
+        depth = 0
+        embedded_budget = options.max_embedded_size
+    else:
+        base_dir_path, extracted_dir_path, doc_copy_path, log_file_path = \
+            get_embedded_paths(embedded_doc.base_dir_path, make_base_dir)
+        root_doc_path = embedded_doc.root_doc_path
+        depth = embedded_doc.depth
+        embedded_budget = embedded_doc.budget
+        doc_data = embedded_doc.get_data()
+    # Embedded documents deeper than the depth limit are listed but not itemized
+    if depth >= options.max_depth:
+        embedded_budget = 0
+    search_terms = options.search_terms
+    # Create the writer that is used to write all of the output files. The names in an archive are relative to the
+    # directory of the document of the directory, so embedded documents keep the layout of their parent
+    archive_root_dir_path = options.archive_root_dir_path
+    if archive_root_dir_path is None:
+        archive_root_dir_path = os.path.dirname(os.path.abspath(root_doc_path))
+    writer = options.create_writer(base_dir_path, metrics, archive_root_dir_path)
+
+    # Prefix is used to add an extra tab to the output if running on multiple documents. Imports ouputs formatting
+    prefix = "\t" if is_dir else ""
+    # The report collects the log and the machine readable record of the document until it is written
+    report = Report(doc_file_path, base_dir_path, log_file_path)
+    with metrics.stage("Hash"):
+        if doc_data is None and os.path.getsize(doc_file_path) <= MAX_IN_MEMORY_DOC_SIZE:
+            # Read the document once. The same bytes are hashed here and then copied and itemized from memory
+            with open(doc_file_path, "rb") as doc_file:
+                doc_data = doc_file.read()
+        if doc_data is None:
+            doc_digest = hash_file(doc_file_path)
+            doc_size = os.path.getsize(doc_file_path)
+        else:
+            doc_digest = hashlib.sha256(doc_data).hexdigest()
+            doc_size = len(doc_data)
+        metrics.count_read(doc_size)
+
+    # Output general info about the file
+    if embedded_doc is None:
+        report.log("Document Name: " + os.path.basename(doc_file_path))
+    else:
+        report.log("Embedded Document Name: " + embedded_doc.name)
+        report.log(prefix + "Embedded In: " + os.path.abspath(embedded_doc.parent_doc_path))
+    report.log(prefix + "Processing Document: " + os.path.abspath(doc_file_path))
+    # Create the inspection stages. Every member of the document is given to each stage while it is itemized
+    # ImageFinder finds any hidden images in the document
+    image_finder = ImageFinder(base_dir_path, writer)
+    # RelationshipGraph finds the parts that are hidden from the document's relationships
+    relationship_graph = RelationshipGraph(extracted_dir_path)
+    stages = [image_finder, relationship_graph]
+    # Check to make sure there are search terms
+    has_search_terms = len(search_terms) > 0
+    if has_search_terms:
+        # Searcher finds any files that their name or contents match the search terms
+        searcher = Searcher(base_dir_path, search_terms, writer)
+        stages.append(searcher)
+    # Create an instance of the Itemizer and use it to process the document in a single pass
+    if options.index_file_path is not None:
+        # SearchIndexer adds the document to the search index
+        search_indexer = SearchIndexer(options.index_file_path, doc_file_path, extracted_dir_path,
+                                       options.index_contents)
+        stages.append(search_indexer)
+    if options.signature:
+        # ContentSignature works out the signature used to find near-duplicate documents
+        content_signature = ContentSignature()
+        stages.append(content_signature)
+    itemizer = Itemizer(doc_file_path, base_dir_path, extracted_dir_path, doc_copy_path, writer, metrics,
+                        doc_data, embedded_budget, options.limits)
+    try:
+        itemizer.process_doc(stages)
+    except Exception:
+        # Finish the writes that were queued before the document failed and stop the writer's threads, so no
+        # output file is written after the caller has reported the error or removed the partial output
+        try:
+            writer.close()
+        except OSError:
+            pass
+        raise
+    if options.index_file_path is not None:
+        with metrics.stage("SearchIndexer"):
+            search_indexer.close(base_dir_path, doc_digest)
+    # The document has been completely itemized and inspected at this point
+    report.log(prefix + "Completed Itemizing Document")
+    report.log(prefix + "Itemized Files Location: " + os.path.abspath(base_dir_path))
+    # Path of the archive that the output files are written into
+    archive_path = None
+    if options.archive_format is not None:
+        archive_path = options.batch_archive_path
+        if archive_path is None:
+            archive_path = writer.archive_path
+        report.log(prefix + "Itemized Files Archived To: " + os.path.abspath(archive_path))
+    if options.index_file_path is not None:
+        report.log(prefix + "Added Document To Search Index: " + os.path.abspath(options.index_file_path))
+    report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    # Display info about an hidden images and other hidden files found in the document
+    report.log(prefix + "Finding Hidden Images")
+    log_hidden_files(report, prefix, image_finder.get_hidden_images(), "Image")
+    report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    report.log(prefix + "Finding Hidden Files")
+    log_hidden_files(report, prefix, image_finder.get_hidden_files(), "File")
+    report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    # Display info about the embedded documents and queue them to be itemized
+    report.log(prefix + "Finding Embedded Documents")
+    embedded_docs = itemizer.embedded_docs
+    # What is left of the budget is shared by the embedded documents for their own embedded documents
+    child_budget = itemizer.remaining_embedded_budget // len(embedded_docs) if len(embedded_docs) > 0 else 0
+    for name, file_path, data in embedded_docs:
+        # The base directory is named after the member's path in the document (e.g. "word_embeddings_x.docx")
+        child_base_dir_path = os.path.join(base_dir_path, "Embedded",
+                                           os.path.relpath(file_path, extracted_dir_path).replace(os.sep, "_"))
+        report.embedded_docs.append(EmbeddedDoc(name, file_path, data, child_base_dir_path, depth + 1, child_budget,
+                                                doc_file_path, embedded_doc.root_doc_path
+                                                if embedded_doc is not None else doc_file_path))
+        report.log(prefix + "\tEmbedded Document: " + os.path.abspath(file_path))
+        report.log(prefix + "\t\tItemized To: " + os.path.abspath(child_base_dir_path))
+    skip_reason = "Depth Limit" if depth >= options.max_depth else "Size Budget"
+    for name, file_path, size in itemizer.skipped_embedded_docs:
+        report.log(prefix + "\tEmbedded Document Not Itemized (" + skip_reason + "): " + os.path.abspath(file_path)
+                   + " (" + str(size) + " Bytes)")
+    if len(embedded_docs) == 0 and len(itemizer.skipped_embedded_docs) == 0:
+        report.log(prefix + "No Embedded Documents Found")
+    report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    # Display info about the files that were not extracted because they broke the extraction limits
+    report.log(prefix + "Checking Extraction Limits")
+    if len(itemizer.suspicious_parts) > 0:
+        report.log(prefix + "\tSuspicious Document: " + str(len(itemizer.suspicious_parts))
+                   + " Files Broke The Extraction Limits")
+        for name, reason in itemizer.suspicious_parts:
+            report.log(prefix + "\t\tFile Not Extracted: " + name)
+            report.log(prefix + "\t\t\tReason: " + reason)
+    else:
+        report.log(prefix + "All Files Are Within The Extraction Limits")
+    report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    # Display info about the parts that are hidden from or do not match the document's relationships
+    with metrics.stage("RelationshipGraph"):
+        relationship_findings = relationship_graph.get_findings()
+    log_relationship_findings(report, prefix, relationship_findings, extracted_dir_path)
+
+    if has_search_terms:
+        # Patterns of a watchlist that were not found. They are only counted to keep the output short
+        not_found_count = 0
+        for search_term, found_file_names, found_file_contents, search_file_paths in searcher.find_search_term():
+            if len(search_terms) > 1 and len(search_file_paths) == 0:
+                not_found_count += 1
+                continue
+            # log out information about the search
+            report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+            report.log(prefix + "Searching File Names And Contents For: " + search_term)
+            if len(found_file_names) > 0: # List all files that their names match the regex search term
+                report.log(prefix + "\tFile Names Match:")
+                for file_path in found_file_names:
+                    report.log(prefix + "\t\t" + os.path.abspath(file_path))
+            if len(found_file_contents) > 0: # List all files that their contents match the regex search term
+                report.log(prefix + "\tFile Contents Match:")
+                for file_path, offsets, offset_count in found_file_contents:
+                    report.log(prefix + "\t\t" + os.path.abspath(file_path))
+                    report.log(prefix + "\t\t\tByte Offsets: " + format_offsets(offsets, offset_count))
+            if len(search_file_paths) > 0:
+                # List all files that have been copied to the search term's directory
+                # because their names or contents matched the regex search term
+                report.log(prefix + "\tFound Search Term Files Copied To:")
+                for file_path in search_file_paths:
+                    report.log(prefix + "\t\t" + os.path.abspath(file_path))
+            if len(found_file_names) == 0 and len(found_file_contents) == 0 and len(search_file_paths) == 0:
+                report.log(prefix + "Search Term Not Found")
+        if len(search_terms) > 1:
+            report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+            report.log(prefix + "Watchlist Patterns Found: " + str(len(search_terms) - not_found_count)
+                       + "/" + str(len(search_terms)))
+    # Wait for the output files to be written so the record of the writes is complete. The log and "report.json"
+    # files are written after it
+    write_record = None
+    if writer.scheduler is not None:
+        with metrics.stage("Write"):
+            writer.scheduler.flush()
+        write_record = writer.scheduler.get_record()
+        report.log(prefix + "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+        log_writes(report, prefix, write_record)
+    report.log("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+
+    # Fill in the machine readable record of the document
+    report.record["sha256"] = doc_digest
+    report.record["size"] = doc_size
+    report.record["depth"] = depth
+    report.record["parent"] = os.path.abspath(embedded_doc.parent_doc_path) if embedded_doc is not None else None
+    report.record["time_stamp"] = get_time_stamp()
+    report.record["files"] = itemizer.parts
+    report.record["suspicious"] = len(itemizer.suspicious_parts) > 0
+    report.record["suspicious_files"] = [{"name": name, "reason": reason}
+                                         for name, reason in itemizer.suspicious_parts]
+    report.record["hidden_images"] = [get_hidden_file_record(hidden_file_path)
+                                      for hidden_file_path in image_finder.get_hidden_images()]
+    report.record["hidden_files"] = [get_hidden_file_record(hidden_file_path)
+                                     for hidden_file_path in image_finder.get_hidden_files()]
+    report.record["relationships"] = relationship_findings
+    report.record["search"] = []
+    if has_search_terms:
+        for search_term, found_file_names, found_file_contents, search_file_paths in searcher.find_search_term():
+            report.record["search"].append({
+                "search_term": search_term,
+                "file_names": [os.path.abspath(file_path) for file_path in found_file_names],
+                "file_contents": [{"path": os.path.abspath(file_path), "offsets": offsets,
+                                   "offset_count": offset_count}
+                                  for file_path, offsets, offset_count in found_file_contents],
+                "copies": [os.path.abspath(file_path) for file_path in search_file_paths]})
+    report.record["search_index"] = os.path.abspath(options.index_file_path) \
+        if options.index_file_path is not None else None
+    report.record["embedded"] = [{"name": child.name, "path": os.path.abspath(child.file_path),
+                                  "size": len(child.data), "output": os.path.abspath(child.base_dir_path)}
+                                 for child in report.embedded_docs]
+    report.record["skipped_embedded"] = [{"name": name, "path": os.path.abspath(file_path), "size": size,
+                                          "reason": skip_reason}
+                                         for name, file_path, size in itemizer.skipped_embedded_docs]
+    report.record["archive"] = os.path.abspath(archive_path) if archive_path is not None else None
+    if options.signature:
+        with metrics.stage("ContentSignature"):
+            report.record["signature"] = content_signature.get_signature()
+    report.record["writes"] = write_record
+    # The metrics are filled in while the report is written so "report.json" does not have the Report stage
+    report.record["metrics"] = metrics.get_record()
+    if profiler is not None:
+        profiler.disable()
+        profile_file_path, profile_summary_file_path = write_profile(profiler, base_dir_path, writer)
+        report.log(prefix + "Profile Written To: " + os.path.abspath(profile_file_path))
+        report.log(prefix + "Profile Summary Written To: " + os.path.abspath(profile_summary_file_path))
+        report.log("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+    # Write the log and the record once and finish writing the output files
+    with metrics.stage("Report"):
+        report.write(writer)
+        writer.close()
+    if options.in_memory:
+        report.files = writer.files
+    return report
+
+
+def iter_reports(doc_file_path, options, doc_data=None):
+    """
+    The iter_reports function is responsible for running the run_docx_itemizer on a single document and then on
+    every document embedded in it, depth first, so each embedded document follows the document it is embedded in
+
+    :param doc_file_path: Path to the document
+    :param options: The ItemizerOptions used to itemize the documents
+    :param doc_data: The document's contents as bytes to itemize it from memory or None to read it from
+        doc_file_path
+    :return: A generator of the Report of the document and then of each of its embedded documents
+    """
+    report = run_docx_itemizer(doc_file_path, options, False, doc_data=doc_data)
+    yield report
+    embedded_doc_stack = list(reversed(report.embedded_docs))
+    while len(embedded_doc_stack) > 0:
+        embedded_doc = embedded_doc_stack.pop()
+        report = run_docx_itemizer(embedded_doc.file_path, options, False, embedded_doc)
+        yield report
+        embedded_doc_stack.extend(reversed(report.embedded_docs))
+
+
+def itemize_bytes(doc, doc_name="document.docx", options=None, output_dir_path=None):
+    """
+    The itemize_bytes function is the library entry point of the script. It itemizes a document that is already
+    in memory (e.g. a document from a message queue) and returns the results as Reports instead of printing them
+
+        1. The document is itemized straight from its bytes. Nothing is read from the file system
+        2. If output_dir_path is None the output files are kept in memory and every Report's files maps each
+            output file's path relative to the document's base directory (e.g. "XML/document.xml",
+            "Content/document.txt", "report.json") to its contents. Otherwise the output files are written into a
+            base directory in output_dir_path the same way the command line does, using the options' blob store or
+            archive if they have one
+        3. The record of each Report holds the same machine readable results as "report.json"
+
+    Example:
+        reports = itemize_bytes(message.body, "memo.docx", ItemizerOptions(search_terms=["secret"]))
+        reports[0].record["hidden_images"], reports[0].files["Content/document.txt"]
+
+    :param doc: The document's contents as bytes or a binary file-like object to read them from
+    :param doc_name: File name of the document. It is used to name the base directory and the copy of the document
+    :param options: The ItemizerOptions used to itemize the document or None to use the default options
+    :param output_dir_path: Path to a directory to write the output files into or None to keep them in memory
+    :return: The Report of the document followed by the Reports of its embedded documents, depth first
+    """
+    import copy  # Copies the options so the caller's options are not changed
+    if not isinstance(doc, (bytes, bytearray, memoryview)):
+        doc = doc.read()
+    options = copy.copy(options) if options is not None else ItemizerOptions()
+    options.in_memory = output_dir_path is None
+    # Only the name of the document is used so the base directory is made in the output directory
+    doc_file_path = os.path.join(output_dir_path if output_dir_path is not None else "", os.path.basename(doc_name))
+    return list(iter_reports(doc_file_path, options, bytes(doc)))
+
+
+def write_profile(profiler, base_dir_path, writer):
+    """
+    The write_profile function is responsible for writing the profile of a document to its base directory
+        1. "profile.pstats": The profile in the pstats format that can be loaded with pstats or snakeviz
+        2. "profile.txt": The 40 functions that took the most cumulative time
+
+    :param profiler: The cProfile.Profile of the document once it has been disabled
+    :param base_dir_path: Path to the base directory that holds all of the output of this script
+    :param writer: The FileWriter used to write all of the output files
+    :return: Paths to the "profile.pstats" and "profile.txt" files
+    """
+    import marshal  # Writes the profile in the pstats format
+    import pstats  # Writes a summary of the profile
+    profile_file_path = os.path.join(base_dir_path, "profile.pstats")
+    profile_summary_file_path = os.path.join(base_dir_path, "profile.txt")
+    # The pstats format is the marshalled stats of the profile, which is what Profile.dump_stats writes
+    profiler.create_stats()
+    writer.write(profile_file_path, marshal.dumps(profiler.stats))
+    summary = io.StringIO()
+    pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(40)
+    writer.write(profile_summary_file_path, summary.getvalue().encode("utf-8"))
+    return profile_file_path, profile_summary_file_path
+
+
+def run_batch_doc(doc_file_path, options, embedded_doc=None, base_dir_path=None, embedded_dir_path=None):
+    """
+    The run_batch_doc function is responsible for running the run_docx_itemizer on one document of a batch.
+    The log of the document is returned instead of being printed so the batch can print the logs of the
+    documents in order, and any error is caught so a failure stays isolated to its document.
+
+    :param doc_file_path: Path to the document
+    :param options: The ItemizerOptions used to itemize the document
+    :param embedded_doc: The EmbeddedDoc if the document is embedded in another document, otherwise None
+    :param base_dir_path: Path to the base directory of the document or None to name it when it is itemized
+    :param embedded_dir_path: Path to the directory that the contents of the embedded documents found in the
+        document are saved to (see EmbeddedDoc.save) or None to keep them in memory
+    :return:    1. output: The log of the document
+                2. error: The traceback of the error that stopped the document from being itemized or None
+                3. record: The machine readable record of the document from its Report or None if it failed
+                4. embedded_docs: The EmbeddedDocs found in the document that still need to be itemized
+    """
+    try:
+        report = run_docx_itemizer(doc_file_path, options, True, embedded_doc, base_dir_path=base_dir_path)
+        if embedded_dir_path is not None:
+            for child_embedded_doc in report.embedded_docs:
+                child_embedded_doc.save(embedded_dir_path)
+        return report.get_text(), None, report.record, report.embedded_docs
+    except Exception:
+        import traceback  # Records the error of a document that failed to be itemized
+        return "", traceback.format_exc(), None, []
+
+
+class RunManifest:
+
+    def __init__(self, manifest_file_path):
+        """
+        The RunManifest class is responsible for recording the progress of batch runs over a directory in a
+        persistent manifest file so a run that is interrupted, or a run over a directory that has new documents,
+        only itemizes the documents that have not already been itemized
+
+        The manifest is a JSON lines file. A record is appended when a document is queued (by the watch mode),
+        started, completed, or failed holding the document's path, size, modification time, SHA-256 hash, and base
+        directory. Records are flushed to disk as soon as they are written so the manifest is also the durable queue
+        of the watch mode. The latest record of each document is used to decide if it is:
+            1. Completed: The document has the same size and modification time, or the same SHA-256 hash, as
+                when it was completed so it is skipped
+            2. Interrupted: The document was started but never completed or failed. The partial output of the
+                interrupted run, in the base directory recorded when it was started, is removed and the document is
+                itemized again
+            3. Queued: The document was waiting to be itemized by the watch mode when it stopped. It is itemized
+                as soon as the watch mode starts again
+            4. New, changed, or failed: The document is itemized. The partial output of a failed document is
+                removed when it fails so the reruns of a document that keeps failing do not pile up
+
+        :param manifest_file_path: Path to the manifest file. It is created if it does not already exist
+        """
+        self.manifest_file_path = manifest_file_path
+        # The latest record of each document by its absolute path
+        self.records = {}
+        if os.path.isfile(manifest_file_path):
+            with open(manifest_file_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    try:
+                        record = json.loads(line)
+                    except ValueError:  # The last record may be cut off if a run was killed while writing it
+                        continue
+                    self.records[record["path"]] = record
+        self.file = open(manifest_file_path, "a", encoding="utf-8")
+
+    def add_record(self, doc_file_path, status, digest=None, base_dir_path=None):
+        """
+        The add_record function is responsible for appending a record for a document to the manifest file
+
+        :param doc_file_path: Path to the document
+        :param status: "queued", "started", "completed", or "failed"
+        :param digest: The SHA-256 hash of the document as a hex string
+        :param base_dir_path: Path to the base directory of the document
+        :return: None
+        """
+        stat = os.stat(doc_file_path)
+        record = {"path": os.path.abspath(doc_file_path), "status": status, "size": stat.st_size,
+                  "mtime": stat.st_mtime, "sha256": digest, "time_stamp": get_time_stamp(),
+                  "output": os.path.abspath(base_dir_path) if base_dir_path is not None else None}
+        self.records[record["path"]] = record
+        self.file.write(json.dumps(record) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def is_completed(self, doc_file_path):
+        """
+        The is_completed function is responsible for checking if a document has already been itemized and has
+        not changed since. The document is only hashed if its size or modification time have changed
+
+        :param doc_file_path: Path to the document
+        :return: True if the document has already been itemized
+        """
+        record = self.records.get(os.path.abspath(doc_file_path))
+        if record is None or record["status"] != "completed":
+            return False
+        stat = os.stat(doc_file_path)
+        if stat.st_size == record["size"] and stat.st_mtime == record["mtime"]:
+            return True
+        if stat.st_size == record["size"] and hash_file(doc_file_path) == record["sha256"]:
+            # The document was touched but its contents are the same. Record it so it is not hashed again
+            self.add_record(doc_file_path, "completed", record["sha256"], record["output"])
+            return True
+        return False
+
+    def is_failed(self, doc_file_path):
+        """
+        The is_failed function is responsible for checking if a document failed to be itemized and has not changed
+        since, so the watch mode does not keep itemizing a document that will fail again
+
+        :param doc_file_path: Path to the document
+        :return: True if the document failed and has the same size and modification time
+        """
+        record = self.records.get(os.path.abspath(doc_file_path))
+        if record is None or record["status"] != "failed":
+            return False
+        stat = os.stat(doc_file_path)
+        return stat.st_size == record["size"] and stat.st_mtime == record["mtime"]
+
+    def get_unfinished(self):
+        """
+        The get_unfinished function is responsible for getting the documents that were queued or being itemized
+        when an earlier run stopped and that still exist
+
+        :return: Paths to the unfinished documents in the order they were recorded
+        """
+        return [path for path, record in self.records.items()
+                if record["status"] in ("queued", "started") and os.path.isfile(path)]
+
+    def start(self, doc_file_path, base_dir_path):
+        """
+        The start function is responsible for recording that a document is being itemized and the base directory
+        its output will be written to. If the document was interrupted in an earlier run the partial output of that
+        run is removed first
+
+        :param doc_file_path: Path to the document
+        :param base_dir_path: Path to the base directory of the document
+        :return: Paths to the partial base directories and archives that were removed
+        """
+        removed_dir_paths = []
+        record = self.records.get(os.path.abspath(doc_file_path))
+        if record is not None and record["status"] == "started" and record["output"] is not None:
+            removed_dir_paths = remove_output(record["output"])
+        self.add_record(doc_file_path, "started", base_dir_path=base_dir_path)
+        return removed_dir_paths
+
+    def fail(self, doc_file_path):
+        """
+        The fail function is responsible for recording that a document failed to be itemized and removing the
+        partial output in the base directory it was started with
+
+        :param doc_file_path: Path to the document
+        :return: Paths to the partial base directories and archives that were removed
+        """
+        removed_dir_paths = []
+        record = self.records.get(os.path.abspath(doc_file_path))
+        if record is not None and record["status"] == "started" and record["output"] is not None:
+            removed_dir_paths = remove_output(record["output"])
+        self.add_record(doc_file_path, "failed")
+        return removed_dir_paths
+
+    def close(self):
+        """
+        The close function is responsible for closing the manifest file
+
+        :return: None
+        """
+        self.file.close()
+
+
+def remove_output(base_dir_path):
+    """
+    The remove_output function is a helper function that is used to remove the partial output of a document that
+    was interrupted or failed: its base directory, or its archive and the archives of its embedded documents
+
+    :param base_dir_path: Path to the base directory of the document
+    :return: Paths to the base directories and archives that were removed
+    """
+    removed_dir_paths = []
+    dir_path = os.path.dirname(base_dir_path)
+    if not os.path.isdir(dir_path):
+        return removed_dir_paths
+    # Matches the base directory and the archives of the document and its embedded documents
+    pattern = re.compile(re.escape(os.path.basename(base_dir_path))
+                         + r"(?:_Embedded_.+)?(?:\.(?:tar|zip)(?:\.index\.json)?)?")
+    for dir_name in os.listdir(dir_path):
+        if pattern.fullmatch(dir_name):
+            removed_dir_path = os.path.join(dir_path, dir_name)
+            if os.path.isdir(removed_dir_path):
+                shutil.rmtree(removed_dir_path)
+            else:
+                os.remove(removed_dir_path)
+            removed_dir_paths.append(removed_dir_path)
+    return removed_dir_paths
+
+
+def output_metrics(doc_metrics, metrics_file_path):
+    """
+    The output_metrics function is responsible for outputting the Metrics of every document at the end of a run
+        1. Prints a table of the total time, bytes, and files of each stage over every document, slowest first
+        2. Prints the documents that took the most time
+        3. Writes a metrics file with the metrics of each document and the totals of each stage as JSON
+
+    :param doc_metrics: A list of the path and the record of the Metrics of each document
+    :param metrics_file_path: Path to the metrics file to write
+    :return: None
+    """
+    # Add up the metrics of each stage over every document
+    totals = {}
+    for doc_path, stages in doc_metrics:
+        for name, stage in stages.items():
+            total = totals.setdefault(name, {"wall_time": 0, "cpu_time": 0, "bytes_read": 0, "bytes_written": 0,
+                                             "files": 0})
+            for key in total:
+                total[key] += stage[key]
+    total_wall_time = max(sum(total["wall_time"] for total in totals.values()), 1e-9)
+
+    print("Stage Metrics:")
+    print("\t" + "Stage".ljust(20) + "Wall Sec".rjust(10) + "Wall %".rjust(8) + "CPU Sec".rjust(10)
+          + "MB Read".rjust(10) + "MB Written".rjust(12) + "Files".rjust(8))
+    for name, total in sorted(totals.items(), key=lambda item: item[1]["wall_time"], reverse=True):
+        print("\t" + name.ljust(20) + ("%.3f" % total["wall_time"]).rjust(10)
+              + ("%.1f" % (total["wall_time"] / total_wall_time * 100)).rjust(8)
+              + ("%.3f" % total["cpu_time"]).rjust(10) + ("%.2f" % (total["bytes_read"] / 1000000)).rjust(10)
+              + ("%.2f" % (total["bytes_written"] / 1000000)).rjust(12) + str(total["files"]).rjust(8))
+    # List the slowest documents so a slow batch can be narrowed down to the documents that are slow
+    doc_wall_times = [(sum(stage["wall_time"] for stage in stages.values()), doc_path)
+                      for doc_path, stages in doc_metrics]
+    print("\tSlowest Documents:")
+    for wall_time, doc_path in sorted(doc_wall_times, reverse=True)[:5]:
+        print("\t\t" + "%.3f" % wall_time + " Seconds: " + doc_path)
+
+    with open(metrics_file_path, "w", encoding="utf-8") as file:
+        json.dump({"documents": [{"document": doc_path, "stages": stages} for doc_path, stages in doc_metrics],
+                   "totals": totals}, file, indent=4)
+    print("\tMetrics Written To: " + os.path.abspath(metrics_file_path))
+
+
+class WorkerCrashError(Exception):
+
+    def __init__(self, message):
+        """
+        The WorkerCrashError class is the error of a document whose worker process crashed while itemizing it
+        (e.g. it was killed by the out of memory killer or a library segfaulted). It is set by recover_pool in
+        place of the error of the broken pool
+
+        :param message: The description of the crash
+        """
+        super().__init__(message)
+
+
+def recover_pool(executor, jobs, tasks, initializer=None):
+    """
+    The recover_pool function is responsible for carrying on after a worker process of a pool crashed. A crash
+    breaks the whole pool, every document that was submitted to it fails with BrokenProcessPool, and no more
+    documents can be submitted. The pool does not say which document crashed so:
+        1. The broken pool is shut down and a new pool is started
+        2. Documents that were done before the crash keep their results
+        3. The documents that were not done are run again one at a time in the new pool. A document that crashes
+            on its own is the one that crashed the pool. It fails with a WorkerCrashError and the pool is started
+            again after it. The other documents are itemized normally, so only the document that crashed fails
+    The partial output of each document that is run again is removed first
+
+    :param executor: The broken ProcessPoolExecutor
+    :param jobs: Number of worker processes of the new pool
+    :param tasks: The Future, function, arguments, and base directory path (or None) of each document that was
+        submitted to the broken pool and has not been output
+    :param initializer: The initializer of the worker processes of the new pool
+    :return:    1. executor: The new ProcessPoolExecutor
+                2. futures: A done Future for each task, in the same order. The Future of a document that crashed
+                has a WorkerCrashError
+    """
+    import concurrent.futures  # Starts the new process pool
+    from concurrent.futures.process import BrokenProcessPool  # The error of the documents of a broken pool
+    # Every Future of the broken pool is done once it has been shut down
+    executor.shutdown()
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=initializer)
+    futures = []
+    for future, function, args, base_dir_path in tasks:
+        if isinstance(future.exception(), BrokenProcessPool):
+            # Run the document again on its own
+            if base_dir_path is not None:
+                remove_output(base_dir_path)
+            future = executor.submit(function, *args)
+            concurrent.futures.wait([future])
+            if isinstance(future.exception(), BrokenProcessPool):  # The document crashed the pool again
+                executor.shutdown()
+                executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=initializer)
+                if base_dir_path is not None:
+                    remove_output(base_dir_path)
+                future = concurrent.futures.Future()
+                future.set_exception(WorkerCrashError("The worker process crashed while itemizing the document"))
+        futures.append(future)
+    return executor, futures
+
+
+def run_batch(doc_file_paths, options, jobs, manifest=None, report_stream=None, metrics_file_path=None,
+              batch_archive_writer=None, cluster_file_path=None, cluster_threshold=0.8):
+    """
+    The run_batch function is responsible for running the run_docx_itemizer on every document of a directory.
+        1. If a RunManifest is given documents that have already been itemized are skipped, and the progress
+            of every document is recorded in it
+        2. If jobs is 1 the documents are itemized one at a time in this process
+        3. If jobs is more than 1 the documents are itemized in parallel by a pool of jobs worker processes.
+            Only a limited number of documents are queued ahead of the document that is being output so the
+            memory used stays the same no matter how many documents are in the batch
+        4. The embedded documents found in a document are itemized the same way as the documents of the
+            directory. When jobs is more than 1 they are submitted to the same pool, within the same limit of
+            queued documents, so a document with many embedded documents is itemized in parallel with the rest of
+            the batch. Their contents are passed to the pool in temporary files instead of between the processes
+    The output of each document is printed in the same order as doc_file_paths whichever way it is run, with the
+    output of its embedded documents right after it. A document that fails to be itemized, or whose worker process
+    crashes (see recover_pool), is reported and the batch continues with the next document. A document is only
+    recorded as completed in the RunManifest once all of its embedded documents are done. A summary of the batch's
+    progress and throughput is printed at the end.
+
+    :param doc_file_paths: Paths to the documents in the batch
+    :param options: The ItemizerOptions used to itemize each document
+    :param jobs: Number of documents to itemize in parallel
+    :param manifest: The RunManifest of the batch or None to itemize every document
+    :param report_stream: A text file that the record of every document is written to as a line of JSON
+        (in the same order as the output) or None
+    :param metrics_file_path: Path to write the Metrics of every document to at the end of the batch or None.
+        The metrics are only recorded if they are turned on in the options
+    :param batch_archive_writer: The ArchiveWriter of the batch's archive that the archive of each document is
+        joined into, in the same order as the output, or None
+    :param cluster_file_path: Path to write the clusters of duplicate documents to at the end of the batch or None.
+        The signatures of the documents are only worked out if they are turned on in the options. Documents that
+        were skipped are clustered with the signature in their "report.json" file if it has one
+    :param cluster_threshold: Estimated similarity from 0 to 1 at which two documents are near-duplicates
+    :return: None
+    """
+    start_time = time.time()
+    # Skip the documents that have already been itemized
+    skipped_count = 0
+    if manifest is not None:
+        all_doc_file_paths = doc_file_paths
+        doc_file_paths = [doc_file_path for doc_file_path in all_doc_file_paths
+                          if not manifest.is_completed(doc_file_path)]
+        skipped_count = len(all_doc_file_paths) - len(doc_file_paths)
+    # The path, SHA-256 hash, and signature of each document of the directory that is clustered
+    signature_docs = []
+    if cluster_file_path is not None and manifest is not None:
+        # Documents that were itemized by an earlier run are clustered with the signature in their report
+        itemized_doc_file_paths = set(doc_file_paths)
+        for doc_file_path in all_doc_file_paths:
+            if doc_file_path not in itemized_doc_file_paths:
+                signature_doc = read_signature(manifest.records[os.path.abspath(doc_file_path)]["output"])
+                if signature_doc is not None:
+                    signature_docs.append(signature_doc)
+    # Paths of the documents that failed to be itemized
+    failed_doc_file_paths = []
+    # Paths of the embedded documents that failed to be itemized
+    failed_embedded_doc_paths = []
+    # Paths of the documents that had files that broke the extraction limits
+    suspicious_doc_paths = []
+    # Number of embedded documents that have been itemized
+    embedded_count = 0
+    # Number of documents of the directory that have been output
+    doc_number = 0
+    # Number of bytes in the documents that have been itemized
+    total_bytes = 0
+    # The path and the record of the Metrics of each document that was itemized
+    doc_metrics = []
+    # The number of embedded documents that are not done, the error and the record of each document of the
+    # directory that still has embedded documents being itemized, by the document's path
+    open_docs = {}
+
+    def start_doc(doc_file_path):
+        # Name the base directory of a document, record that the document is being itemized, and get the output
+        # about any partial output that was removed
+        base_dir_path = get_paths(doc_file_path, False)[0]
+        if manifest is None:
+            return base_dir_path, ""
+        removed_dir_paths = manifest.start(doc_file_path, base_dir_path)
+        return base_dir_path, "".join("Removed Partial Output Of Interrupted Run: "
+                                      + os.path.abspath(removed_dir_path) + "\n"
+                                      for removed_dir_path in removed_dir_paths)
+
+    def output_result(doc_file_path, output, error, record, embedded_docs, embedded_doc):
+        # Print the output of a document, its progress through the batch and any error it had
+        nonlocal doc_number, embedded_count
+        print(output, end="")
+        if report_stream is not None and record is not None:
+            report_stream.write(json.dumps(record) + "\n")
+        if record is not None and record.get("metrics") is not None:
+            doc_metrics.append((record["document"], record["metrics"]))
+        if record is not None and record["suspicious"]:
+            suspicious_doc_paths.append(doc_file_path)
+        if embedded_doc is None and record is not None and "signature" in record:
+            signature_docs.append((record["document"], record["sha256"], record["signature"]))
+        if batch_archive_writer is not None and record is not None:
+            # Join the document's archive into the batch's archive
+            archive_part_path = options.get_archive_path(record["output"], options.archive_root_dir_path)
+            if os.path.isfile(archive_part_path):
+                batch_archive_writer.append_archive(archive_part_path)
+                os.remove(archive_part_path)
+        if error is not None:
+            if embedded_doc is None:
+                failed_doc_file_paths.append(doc_file_path)
+                print("Failed To Itemize Document: " + os.path.abspath(doc_file_path))
+            else:
+                failed_embedded_doc_paths.append(doc_file_path)
+                print("Failed To Itemize Embedded Document: " + os.path.abspath(doc_file_path))
+            print("\t" + error.rstrip().replace("\n", "\n\t"))
+            print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+        if embedded_doc is None:
+            doc_number += 1
+            print("Progress: " + str(doc_number) + "/" + str(len(doc_file_paths)) + " Documents")
+            root_doc_path = doc_file_path
+            open_doc = [len(embedded_docs), error, record]
+        else:
+            if error is None:
+                embedded_count += 1
+            root_doc_path = embedded_doc.root_doc_path
+            open_doc = open_docs[root_doc_path]
+            # This embedded document is done but its own embedded documents are not
+            open_doc[0] += len(embedded_docs) - 1
+        if open_doc[0] > 0:
+            open_docs[root_doc_path] = open_doc
+            return
+        open_docs.pop(root_doc_path, None)
+        # The document and all of its embedded documents are done
+        if manifest is not None:
+            if open_doc[1] is not None:
+                manifest.fail(root_doc_path)
+            else:
+                manifest.add_record(root_doc_path, "completed", open_doc[2]["sha256"], open_doc[2]["output"])
+
+    if jobs <= 1:  # Itemize the documents one at a time
+        for doc_file_path in doc_file_paths:
+            base_dir_path, start_output = start_doc(doc_file_path)
+            print(start_output, end="")
+            output, error, record, embedded_docs = run_batch_doc(doc_file_path, options, None, base_dir_path)
+            output_result(doc_file_path, output, error, record, embedded_docs, None)
+            total_bytes += os.path.getsize(doc_file_path)
+            # Itemize the embedded documents depth first so each one is output right after its parent
+            embedded_doc_stack = list(reversed(embedded_docs))
+            while len(embedded_doc_stack) > 0:
+                embedded_doc = embedded_doc_stack.pop()
+                output, error, record, embedded_docs = run_batch_doc(embedded_doc.file_path, options, embedded_doc)
+                output_result(embedded_doc.file_path, output, error, record, embedded_docs, embedded_doc)
+                embedded_doc_stack.extend(reversed(embedded_docs))
+    else:  # Itemize the documents in parallel
+        import concurrent.futures  # Itemizes the documents in parallel using a process pool
+        from concurrent.futures.process import BrokenProcessPool  # The error of the documents of a crashed pool
+        import tempfile  # Creates the directory that the contents of the embedded documents are passed in
+        executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs)
+        embedded_dir_path = tempfile.mkdtemp(prefix="docx_itemizer_embedded_")
+        # Documents in the order they will be output, with the Future (or None if the document has not been
+        # submitted to the pool yet) and the base directory path (or None) of each
+        pending = collections.deque()
+
+        def recover():
+            # Start a new pool after a worker process crashed and replace the Futures of the submitted documents
+            nonlocal executor
+            submitted_indexes = [i for i in range(len(pending)) if pending[i][2] is not None]
+            tasks = []
+            for i in submitted_indexes:
+                doc_file_path, start_output, future, embedded_doc, base_dir_path = pending[i]
+                tasks.append((future, run_batch_doc,
+                              (doc_file_path, options, embedded_doc, base_dir_path, embedded_dir_path),
+                              base_dir_path if embedded_doc is None else embedded_doc.base_dir_path))
+            executor, futures = recover_pool(executor, jobs, tasks)
+            for i, future in zip(submitted_indexes, futures):
+                doc_file_path, start_output, old_future, embedded_doc, base_dir_path = pending[i]
+                pending[i] = (doc_file_path, start_output, future, embedded_doc, base_dir_path)
+
+        def submit_doc(doc_file_path, embedded_doc, base_dir_path):
+            # Submit a document to the pool, starting a new pool first if a worker process has crashed
+            try:
+                return executor.submit(run_batch_doc, doc_file_path, options, embedded_doc, base_dir_path,
+                                       embedded_dir_path)
+            except BrokenProcessPool:
+                recover()
+                return executor.submit(run_batch_doc, doc_file_path, options, embedded_doc, base_dir_path,
+                                       embedded_dir_path)
+
+        try:
+            # Number of documents that are queued ahead of the document that is being output
+            max_pending = jobs * 4
+            next_doc_index = 0
+            while next_doc_index < len(doc_file_paths) or len(pending) > 0:
+                # Keep the pool busy by submitting documents until the limit is reached. The embedded documents
+                # that are waiting are output first so they are submitted before the documents of the directory
+                submitted_count = sum(1 for pending_doc in pending if pending_doc[2] is not None)
+                for i in range(len(pending)):
+                    if submitted_count >= max_pending:
+                        break
+                    doc_file_path, start_output, future, embedded_doc, base_dir_path = pending[i]
+                    if future is None:
+                        pending[i] = (doc_file_path, start_output, submit_doc(doc_file_path, embedded_doc, None),
+                                      embedded_doc, base_dir_path)
+                        submitted_count += 1
+                while next_doc_index < len(doc_file_paths) and submitted_count < max_pending:
+                    doc_file_path = doc_file_paths[next_doc_index]
+                    base_dir_path, start_output = start_doc(doc_file_path)
+                    pending.append((doc_file_path, start_output, submit_doc(doc_file_path, None, base_dir_path),
+                                    None, base_dir_path))
+                    submitted_count += 1
+                    next_doc_index += 1
+                # Wait for the oldest document so the output stays in order
+                doc_file_path, start_output, future, embedded_doc, base_dir_path = pending[0]
+                try:
+                    output, error, record, embedded_docs = future.result()
+                except BrokenProcessPool:  # A worker process crashed. Find the document that crashed it
+                    recover()
+                    continue
+                except WorkerCrashError as crash_error:
+                    output, error, record, embedded_docs = "", str(crash_error) + "\n", None, []
+                except Exception:  # The worker process itself failed
+                    import traceback
+                    output, error, record, embedded_docs = "", traceback.format_exc(), None, []
+                pending.popleft()
+                # Output the embedded documents next, before the other documents. They are submitted to the pool
+                # once there is room
+                for child_embedded_doc in reversed(embedded_docs):
+                    pending.appendleft((child_embedded_doc.file_path, "", None, child_embedded_doc, None))
+                output_result(doc_file_path, start_output + output, error, record, embedded_docs, embedded_doc)
+                if embedded_doc is None:
+                    total_bytes += os.path.getsize(doc_file_path)
+                elif embedded_doc.data_file_path is not None:
+                    os.remove(embedded_doc.data_file_path)
+        finally:
+            executor.shutdown()
+            shutil.rmtree(embedded_dir_path, ignore_errors=True)
+
+    # Output a summary of the batch
+    elapsed_time = max(time.time() - start_time, 1e-9)
+    itemized_count = len(doc_file_paths) - len(failed_doc_file_paths)
+    print("Batch Summary:")
+    print("\tItemized Documents: " + str(itemized_count) + "/" + str(len(doc_file_paths)))
+    if manifest is not None:
+        print("\tSkipped Documents (Already Itemized): " + str(skipped_count))
+    print("\tFailed Documents: " + str(len(failed_doc_file_paths)))
+    for doc_file_path in failed_doc_file_paths:
+        print("\t\t" + os.path.abspath(doc_file_path))
+    print("\tItemized Embedded Documents: " + str(embedded_count))
+    if len(suspicious_doc_paths) > 0:
+        print("\tSuspicious Documents (Broke The Extraction Limits): " + str(len(suspicious_doc_paths)))
+        for doc_path in suspicious_doc_paths:
+            print("\t\t" + os.path.abspath(doc_path))
+    if len(failed_embedded_doc_paths) > 0:
+        print("\tFailed Embedded Documents: " + str(len(failed_embedded_doc_paths)))
+        for doc_path in failed_embedded_doc_paths:
+            print("\t\t" + os.path.abspath(doc_path))
+    print("\tElapsed Time: " + "%.2f" % elapsed_time + " Seconds")
+    print("\tThroughput: " + "%.2f" % (len(doc_file_paths) / elapsed_time) + " Documents/Second, "
+          + "%.2f" % (total_bytes / elapsed_time / 1000000) + " MB/Second")
+    if metrics_file_path is not None:
+        output_metrics(doc_metrics, metrics_file_path)
+    if cluster_file_path is not None:
+        output_clusters(signature_docs, cluster_threshold, cluster_file_path)
+
+
+def read_signature(base_dir_path):
+    """
+    The read_signature function is a helper function that is used to read the signature of a document that was
+    itemized by an earlier run from the "report.json" file in its base directory
+
+    :param base_dir_path: Path to the base directory of the document
+    :return: The path, SHA-256 hash, and signature of the document or None if its report has no signature
+    """
+    report_file_path = os.path.join(base_dir_path, "report.json") if base_dir_path is not None else None
+    if report_file_path is None or not os.path.isfile(report_file_path):  # e.g. the output was archived
+        return None
+    with open(report_file_path, "r", encoding="utf-8") as file:
+        record = json.load(file)
+    if "signature" not in record:
+        return None
+    return record["document"], record["sha256"], record["signature"]
+
+
+class FolderWatcher:
+
+    def __init__(self, dir_path, manifest, settle_time, excluded_dir_paths=()):
+        """
+        The FolderWatcher class is responsible for finding the documents in a drop directory that are ready to be
+        itemized by the watch mode. The directory is polled since it is often a network share where file system
+        events are not reliable
+
+        1. Each poll lists the .docx files in the directory, skipping the output of this script, and checks the
+            size and modification time of each one. Documents that are already completed in the RunManifest, or
+            that failed and have not changed, are skipped without being read
+        2. A document is only ready once its size and modification time have not changed for settle_time
+            seconds so documents that are still being copied into the directory are not itemized
+
+        :param dir_path: Path to the directory to watch
+        :param manifest: The RunManifest of the directory
+        :param settle_time: Number of seconds a document's size and modification time must stay the same
+        :param excluded_dir_paths: Paths to other directories that should not be searched (e.g. the blob store)
+        """
+        self.dir_path = dir_path
+        self.manifest = manifest
+        self.settle_time = settle_time
+        self.excluded_dir_paths = excluded_dir_paths
+        # The size and modification time of each document that is not ready yet and when they were first seen
+        self.candidates = {}
+        # Paths of the documents that are queued or being itemized so they are not found again
+        self.active = set()
+
+    def poll(self):
+        """
+        The poll function is responsible for checking the directory once
+
+        :return: Paths to the documents that are ready to be itemized, in the order they were found
+        """
+        now = time.time()
+        ready = []
+        candidates = {}
+        for doc_file_path in find_doc_files(self.dir_path, self.excluded_dir_paths):
+            if doc_file_path in self.active:
+                continue
+            try:
+                stat = os.stat(doc_file_path)
+                if self.manifest.is_completed(doc_file_path) or self.manifest.is_failed(doc_file_path):
+                    continue
+            except OSError:  # The document was removed or renamed while the directory was polled
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            candidate = self.candidates.get(doc_file_path)
+            if candidate is None or candidate[0] != signature:  # New or still being written
+                candidates[doc_file_path] = (signature, now)
+            elif now - candidate[1] >= self.settle_time and stat.st_size > 0:
+                ready.append(doc_file_path)
+            else:
+                candidates[doc_file_path] = candidate
+        # Documents that are gone are forgotten
+        self.candidates = candidates
+        return ready
+
+
+def run_watch_doc(doc_file_path, options, base_dir_path=None):
+    """
+    The run_watch_doc function is responsible for itemizing a document of the watch mode and every document
+    embedded in it, depth first, in one worker process. Only the output and records are sent back to the watch
+    mode so the embedded documents' bytes never leave the worker
+
+    :param doc_file_path: Path to the document
+    :param options: The ItemizerOptions used to itemize the documents
+    :param base_dir_path: Path to the base directory of the document or None to name it when it is itemized
+    :return: A list of the path, output, error, record, and True if it is embedded of the document and each of its
+        embedded documents, in the order they were itemized
+    """
+    output, error, record, embedded_docs = run_batch_doc(doc_file_path, options, None, base_dir_path)
+    results = [(doc_file_path, output, error, record, False)]
+    embedded_doc_stack = list(reversed(embedded_docs))
+    while len(embedded_doc_stack) > 0:
+        embedded_doc = embedded_doc_stack.pop()
+        output, error, record, embedded_docs = run_batch_doc(embedded_doc.file_path, options, embedded_doc)
+        results.append((embedded_doc.file_path, output, error, record, True))
+        embedded_doc_stack.extend(reversed(embedded_docs))
+    return results
+
+
+def ignore_interrupts():
+    """
+    The ignore_interrupts function is responsible for making a worker process of the watch mode ignore Ctrl+C and
+    SIGTERM, which are sent to every process of the terminal or service, so the watch mode can let its workers
+    finish their documents
+
+    :return: None
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+
+
+def run_watch(dir_path, options, jobs, manifest, report_stream=None, metrics_file_path=None, poll_interval=2,
+              settle_time=5, queue_size=None, excluded_dir_paths=()):
+    """
+    The run_watch function is responsible for running the watch mode. It keeps running, itemizing every document
+    that is dropped into a directory soon after it has been completely written, until it is stopped
+        1. A FolderWatcher polls the directory every poll_interval seconds for documents that are ready
+        2. Ready documents are recorded as queued in the RunManifest and added to a bounded queue. Once the queue
+            is full the directory is not polled until there is room again, so when documents arrive faster than
+            they can be itemized they wait in the directory instead of in memory
+        3. A pool of jobs worker processes itemizes the documents of the queue (and their embedded documents).
+            Only jobs documents are handed to the pool at a time so the rest of the queue stays in the manifest.
+            The output of each document is printed as soon as it is done
+        4. If a worker process crashes the pool is started again and only the document that crashed it fails
+            (see recover_pool), so one bad document can not stop the watch mode
+        5. Ctrl+C or SIGTERM stops the watch mode gracefully. No more documents are started, the documents that
+            are being itemized are finished, and the documents left in the queue stay queued in the manifest.
+            When the watch mode is started again the queued documents, and any documents that were interrupted by
+            killing it, are itemized first
+
+    :param dir_path: Path to the directory to watch
+    :param options: The ItemizerOptions used to itemize each document
+    :param jobs: Number of documents to itemize in parallel
+    :param manifest: The RunManifest of the directory
+    :param report_stream: A text file that the record of every document is written to as a line of JSON or None
+    :param metrics_file_path: Path to write the Metrics of every document to when the watch mode stops or None
+    :param poll_interval: Number of seconds between each poll of the directory
+    :param settle_time: Number of seconds a document's size and modification time must stay the same before it is
+        itemized
+    :param queue_size: Number of documents that can be queued or None for 4 times the number of jobs
+    :param excluded_dir_paths: Paths to other directories that should not be searched (e.g. the blob store)
+    :return: None
+    """
+    import concurrent.futures  # Itemizes the documents in parallel using a process pool
+    from concurrent.futures.process import BrokenProcessPool  # The error of the documents of a crashed pool
+    jobs = max(jobs, 1)
+    if queue_size is None:
+        queue_size = jobs * 4
+    start_time = time.time()
+    watcher = FolderWatcher(dir_path, manifest, settle_time, excluded_dir_paths)
+    # Documents that are ready and waiting for a worker, oldest first
+    queue = collections.deque()
+    # The path and the base directory path of the document of each future that is being itemized
+    running = {}
+    # Number of documents, embedded documents and failed documents that have been itemized
+    doc_count = 0
+    embedded_count = 0
+    failed_count = 0
+    # The path and the record of the Metrics of each document that was itemized
+    doc_metrics = []
+    # True once the watch mode has been asked to stop
+    stopping = False
+
+    def request_stop(signal_number, frame):
+        nonlocal stopping
+        if not stopping:
+            print("Stopping: Finishing " + str(len(running)) + " Running Documents")
+        stopping = True
+
+    # Documents that were queued or interrupted when the watch mode last stopped are itemized first
+    for doc_file_path in manifest.get_unfinished()[:queue_size]:
+        queue.append(doc_file_path)
+        watcher.active.add(doc_file_path)
+    if len(queue) > 0:
+        print("Resuming " + str(len(queue)) + " Queued Documents")
+    print("Watching: " + os.path.abspath(dir_path) + " (Press Ctrl+C to stop)")
+
+    executor = concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=ignore_interrupts)
+
+    def recover():
+        # Start a new pool after a worker process crashed and replace the Futures of the running documents
+        nonlocal executor, running
+        tasks = [(future, run_watch_doc, (doc_file_path, options, base_dir_path), base_dir_path)
+                 for future, (doc_file_path, base_dir_path) in running.items()]
+        executor, futures = recover_pool(executor, jobs, tasks, ignore_interrupts)
+        running = dict(zip(futures, running.values()))
+
+    previous_handlers = {signal.SIGINT: signal.signal(signal.SIGINT, request_stop),
+                         signal.SIGTERM: signal.signal(signal.SIGTERM, request_stop)}
+    try:
+        while not stopping or len(running) > 0:
+            if not stopping:
+                # Only look for new documents while there is room in the queue
+                if len(queue) < queue_size:
+                    for doc_file_path in watcher.poll()[:queue_size - len(queue)]:
+                        manifest.add_record(doc_file_path, "queued")
+                        queue.append(doc_file_path)
+                        watcher.active.add(doc_file_path)
+                # Hand the queued documents to the workers that are free
+                while len(queue) > 0 and len(running) < jobs:
+                    doc_file_path = queue.popleft()
+                    if not os.path.isfile(doc_file_path):  # The document was removed while it was queued
+                        watcher.active.discard(doc_file_path)
+                        continue
+                    base_dir_path = get_paths(doc_file_path, False)[0]
+                    for removed_dir_path in manifest.start(doc_file_path, base_dir_path):
+                        print("Removed Partial Output Of Interrupted Run: " + os.path.abspath(removed_dir_path))
+                    try:
+                        future = executor.submit(run_watch_doc, doc_file_path, options, base_dir_path)
+                    except BrokenProcessPool:
+                        recover()
+                        future = executor.submit(run_watch_doc, doc_file_path, options, base_dir_path)
+                    running[future] = (doc_file_path, base_dir_path)
+            if len(running) == 0:
+                time.sleep(poll_interval)
+                continue
+            done = concurrent.futures.wait(running, timeout=poll_interval,
+                                           return_when=concurrent.futures.FIRST_COMPLETED)[0]
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                # A worker process crashed. Find the document that crashed it. The running documents are all
+                # done once the pool is recovered
+                recover()
+                continue
+            for future in done:
+                doc_file_path = running.pop(future)[0]
+                watcher.active.discard(doc_file_path)
+                try:
+                    results = future.result()
+                except WorkerCrashError as crash_error:
+                    results = [(doc_file_path, "", str(crash_error) + "\n", None, False)]
+                except Exception:  # The worker process itself failed
+                    import traceback
+                    results = [(doc_file_path, "", traceback.format_exc(), None, False)]
+                # Output the document and its embedded documents
+                root_error = None
+                root_record = None
+                for result_path, output, error, record, is_embedded in results:
+                    print(output, end="")
+                    if report_stream is not None and record is not None:
+                        report_stream.write(json.dumps(record) + "\n")
+                        report_stream.flush()
+                    if record is not None and record.get("metrics") is not None:
+                        doc_metrics.append((record["document"], record["metrics"]))
+                    if error is not None:
+                        print("Failed To Itemize " + ("Embedded " if is_embedded else "") + "Document: "
+                              + os.path.abspath(result_path))
+                        print("\t" + error.rstrip().replace("\n", "\n\t"))
+                        print("~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~")
+                    if is_embedded:
+                        embedded_count += 1 if error is None else 0
+                    else:
+                        root_error, root_record = error, record
+                doc_count += 1
+                # The document is recorded once it and all of its embedded documents are done
+                if os.path.isfile(doc_file_path):
+                    if root_error is not None:
+                        failed_count += 1
+                        manifest.fail(doc_file_path)
+                    else:
+                        manifest.add_record(doc_file_path, "completed", root_record["sha256"],
+                                            root_record["output"])
+                print("Watch Progress: " + str(doc_count) + " Documents Done, " + str(len(running))
+                      + " Running, " + str(len(queue)) + " Queued")
+    finally:
+        executor.shutdown()
+        for signal_number, handler in previous_handlers.items():
+            signal.signal(signal_number, handler)
+
+    # Output a summary of the watch mode
+    elapsed_time = max(time.time() - start_time, 1e-9)
+    print("Watch Summary:")
+    print("\tItemized Documents: " + str(doc_count - failed_count) + "/" + str(doc_count))
+    print("\tFailed Documents: " + str(failed_count))
+    print("\tItemized Embedded Documents: " + str(embedded_count))
+    print("\tDocuments Left In Queue: " + str(len(queue)))
+    print("\tElapsed Time: " + "%.2f" % elapsed_time + " Seconds")
+    if metrics_file_path is not None:
+        output_metrics(doc_metrics, metrics_file_path)
+
+
+def find_doc_files(dir_path, excluded_dir_paths=()):
+    """
+    The find_doc_files function is a helper function that is used to find every .docx file in a directory and its
+    sub-directories. The base directories written by this script (e.g. "{Doc Name}_Itemized({Time Stamp})") are
+    not searched so the copies of documents in them are not itemized again
+
+    :param dir_path: Path to the directory to search
+    :param excluded_dir_paths: Paths to other directories that should not be searched (e.g. the blob store)
+    :return: Paths to the .docx files in the directory
+    """
+    excluded_dir_paths = set(os.path.abspath(excluded_dir_path) for excluded_dir_path in excluded_dir_paths)
+    doc_file_paths = []
+    # For every directory and sub-directory in the directory at the "dir_path"
+    for (current_dir_path, dir_names, file_names) in os.walk(dir_path):
+        # Do not walk into the output of this script
+        dir_names[:] = [dir_name for dir_name in dir_names
+                        if not BASE_DIR_NAME_PATTERN.fullmatch(dir_name)
+                        and os.path.abspath(os.path.join(current_dir_path, dir_name)) not in excluded_dir_paths]
+        dir_names.sort()
+        for file_name in sorted(file_names):  # For every file in the current directory
+            file_extension = os.path.splitext(file_name)[1]
+            if file_extension == ".docx":
+                # The file is a .docx file
+                doc_file_paths.append(os.path.join(current_dir_path, file_name))
+    return doc_file_paths
+
+
+def hash_file(file_path):
+    """
+    The hash_file function is a helper function that is used to get the SHA-256 hash of a file
+
+    :param file_path: Path to the file
+    :return: The SHA-256 hash of the file as a hex string
+    """
+    file_hash = hashlib.sha256()
+    with open(file_path, "rb") as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b""):
+            file_hash.update(chunk)
+    return file_hash.hexdigest()
+
+
+def run_query(index_file_path, search_term):
+    """
+    The run_query function is responsible for searching every document in a search index for a search term
+    and outputting the documents, members, and offsets that match
+
+    :param index_file_path: Path to the SQLite file of the search index
+    :param search_term: The regex term or keyword to match with
+    :return: None
+    """
+    start_time = time.time()
+    index = SearchIndex(index_file_path)
+    try:
+        results = index.query(search_term)
+    finally:
+        index.close()
+    elapsed_time = time.time() - start_time
+
+    print("Querying Search Index For: " + search_term)
+    current_doc_path = None
+    for doc_path, name, kind, name_match, offsets in results:
+        if doc_path != current_doc_path:  # Output the document's path before its members
+            print("\tDocument: " + doc_path)
+            current_doc_path = doc_path
+        print("\t\tFile: " + name + (" (Content)" if kind == "content" else ""))
+        if name_match:
+            print("\t\t\tFile Name Matches")
+        if offsets is None:
+            print("\t\t\tFile Contents Match (Index Contents To Get The Byte Offsets)")
+        elif len(offsets) > 0:
+            offset_label = "Text Offsets: " if kind == "content" else "Byte Offsets: "
+            print("\t\t\t" + offset_label + format_offsets(offsets))
+    if len(results) == 0:
+        print("\tSearch Term Not Found")
+    print("Found In " + str(len(set(result[0] for result in results))) + " Documents (" + str(len(results))
+          + " Files) In " + "%.3f" % elapsed_time + " Seconds")
+
+
+def open_report_stream(report_stream_file_path):
+    """
+    The open_report_stream function is a helper function that is used to open the JSON lines file that the
+    record of every itemized document is appended to
+
+    :param report_stream_file_path: Path to the JSON lines file or None
+    :return: The opened text file or None if no path was given
+    """
+    if report_stream_file_path is None:
+        return None
+    return open(report_stream_file_path, "a", encoding="utf-8")
+
+
+def remove_archive_parts(batch_archive_path):
+    """
+    The remove_archive_parts function is a helper function that is used to remove the archives of documents that
+    were not joined into the batch's archive (e.g. the partial archive of a document that failed)
+
+    :param batch_archive_path: Path to the batch's archive
+    :return: None
+    """
+    dir_path = os.path.dirname(batch_archive_path)
+    prefix = os.path.basename(batch_archive_path) + "."
+    for file_name in os.listdir(dir_path):
+        if file_name.startswith(prefix) and file_name.endswith(".part"):
+            os.remove(os.path.join(dir_path, file_name))
+
+
+def read_watchlist(watchlist_file_path):
+    """
+    The read_watchlist function is a helper function that is used to read the search terms from a watchlist file.
+    The watchlist has one regex search term per line. Empty lines and lines starting with "#" are skipped
+
+    :param watchlist_file_path: Path to the watchlist file
+    :return: The search terms in the watchlist
+    """
+    search_terms = []
+    with open(watchlist_file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            line = line.rstrip("\r\n")
+            if line.strip() != "" and not line.startswith("#"):
+                search_terms.append(line)
+    return search_terms
+
+
+def get_parser():
+    """
+    The get_parser function is responsible for setting up the parser for the Docx Itemizer script. The parser is
+    only built when the script is run from the command line, not when it is imported as a library
+
+    :return: The argparse.ArgumentParser of the script
+    """
+    import argparse  # Parses the arguments passed by the user. Also provides a help menu using the [-h] flag
+    parser = argparse.ArgumentParser(description="Docx Itemizer")
+    # Non Optional Argument: Path to a .docx file or directory containing .docx file(s)
+    parser.add_argument("path", type=str, nargs="?",
+                        help="Required Argument: Path to .docx file or directory containing .docx file(s). "
+                             "Not needed with --query")
+    # Optional Argument: Term to search for in file names and file contents while itemizing the .docx file(s)
+    parser.add_argument("search_term", type=str, nargs="?",
+                        help="Optional Argument: Regex to use to match file names and file contents")
+    # Optional Argument: File of regex search terms to match with in a single scan, one per line
+    parser.add_argument("-w", "--watchlist", type=str,
+                        help="Optional Argument: Path to a watchlist file with one regex per line. Every regex is "
+                             "matched with file names and file contents in a single scan")
+    # Optional Argument: Directory of a content-addressed blob store to write the output files into
+    parser.add_argument("-s", "--store", type=str,
+                        help="Optional Argument: Path to a blob store directory. Each unique output file is stored "
+                             "once under its SHA-256 hash and the output files are hard links to it")
+    # Optional Argument: Path to the manifest that records which documents of a directory have been itemized
+    parser.add_argument("-m", "--manifest", type=str,
+                        help="Optional Argument: Path to the run manifest used when the path is a directory. "
+                             "Defaults to \"docx_itemizer_manifest.jsonl\" in the directory")
+    # Optional Argument: Itemize every document again even if it was itemized by an earlier run
+    parser.add_argument("-f", "--force", action="store_true",
+                        help="Optional Argument: Itemize every document in the directory again and start a new "
+                             "manifest")
+    # Optional Argument: Path to a persistent search index that every itemized document is added to
+    parser.add_argument("-i", "--index", type=str,
+                        help="Optional Argument: Path to a SQLite search index. Every itemized document is added to "
+                             "it so it can be searched later with --query")
+    # Optional Argument: Keep the contents of every member in the search index
+    parser.add_argument("--index-contents", action="store_true",
+                        help="Optional Argument: Also keep the compressed contents of every file in the --index "
+                             "search index so --query matches binary files exactly and lists their byte offsets")
+    # Optional Argument: Search term to look up in the search index instead of itemizing documents
+    parser.add_argument("-q", "--query", type=str,
+                        help="Optional Argument: Regex or keyword to search for in every document of the --index "
+                             "search index without itemizing them again")
+    # Optional Argument: Path to a JSON lines file that the record of every itemized document is appended to
+    parser.add_argument("-r", "--report-jsonl", type=str,
+                        help="Optional Argument: Path to a JSON lines file that the machine readable record of every "
+                             "itemized document is appended to")
+    # Optional Argument: Number of documents to itemize at the same time when the path is a directory
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="Optional Argument: Number of documents to itemize in parallel when the path is a "
+                             "directory or with --watch")
+    # Optional Argument: How many levels of documents embedded in documents are itemized
+    parser.add_argument("--max-depth", type=int, default=3,
+                        help="Optional Argument: How many levels of embedded documents (e.g. .docx, .xlsx, .pptx and "
+                             ".zip files in the document) are itemized into the \"Embedded\" directory. "
+                             "0 to not itemize embedded documents. Defaults to 3")
+    # Optional Argument: Number of MB of embedded documents itemized for each document
+    parser.add_argument("--max-embedded-size", type=int, default=256,
+                        help="Optional Argument: Number of MB of embedded documents, at every level, that are "
+                             "itemized for each document. Defaults to 256")
+    # Optional Arguments: Limits that the files of each document are extracted within to guard against zip bombs
+    parser.add_argument("--max-part-size", type=int, default=256,
+                        help="Optional Argument: Number of MB a file in a document can be when it is uncompressed. "
+                             "Larger files are not extracted and the document is flagged as suspicious. "
+                             "Defaults to 256")
+    parser.add_argument("--max-doc-size", type=int, default=1024,
+                        help="Optional Argument: Number of MB all of the files in a document can be when they are "
+                             "uncompressed. Defaults to 1024")
+    parser.add_argument("--max-entries", type=int, default=10000,
+                        help="Optional Argument: Number of files a document can have. Defaults to 10000")
+    parser.add_argument("--max-ratio", type=int, default=200,
+                        help="Optional Argument: How many times larger than its compressed size a file in a document "
+                             "can be when it is uncompressed. Defaults to 200")
+    parser.add_argument("--member-timeout", type=float, default=60,
+                        help="Optional Argument: Number of seconds reading a file in a document can take. "
+                             "Defaults to 60")
+    # Optional Argument: Write the output files of each document into a single archive
+    parser.add_argument("-a", "--archive", type=str, choices=["tar", "zip"],
+                        help="Optional Argument: Write the output files of each document into a single uncompressed "
+                             ".tar or .zip archive with an index file instead of a base directory. "
+                             "Can not be used with --store")
+    # Optional Argument: Write one archive for each document or one archive for the whole batch
+    parser.add_argument("--archive-scope", type=str, choices=["document", "batch"], default="document",
+                        help="Optional Argument: \"document\" to write an archive for each document or \"batch\" to "
+                             "write one archive for every document in the directory. Defaults to \"document\"")
+    # Optional Argument: Path to a metrics file that the time spent in each stage of every document is written to
+    parser.add_argument("--metrics", type=str,
+                        help="Optional Argument: Path to a JSON metrics file. The wall time, CPU time, bytes read and "
+                             "written, and files written by each stage of every document are recorded, written to it "
+                             "and summarized in a table")
+    # Optional Argument: File name or path of a document to profile with cProfile
+    parser.add_argument("--profile", type=str,
+                        help="Optional Argument: File name or path of a document to profile. The profile is written "
+                             "to \"profile.pstats\" and \"profile.txt\" in the document's base directory")
+    # Optional Argument: Number of threads that write the output files of each document
+    parser.add_argument("--write-threads", type=int, default=4,
+                        help="Optional Argument: Number of threads that write the output files of each document. "
+                             "Large files with the same contents are cloned (reflink, copy_file_range, or sendfile) "
+                             "instead of written again. 0 to write the output files one at a time. Defaults to 4")
+    # Optional Arguments: Group the documents of a directory that are duplicates or near-duplicates of each other
+    parser.add_argument("--cluster", type=str,
+                        help="Optional Argument: Path to a JSON cluster report file. The documents of the directory "
+                             "that are exact duplicates or near-duplicates (by the MinHash of their text and files) "
+                             "are grouped into clusters with one representative each")
+    parser.add_argument("--cluster-threshold", type=float, default=0.8,
+                        help="Optional Argument: Estimated similarity from 0 to 1 at which two documents are "
+                             "near-duplicates with --cluster. Defaults to 0.8")
+    # Optional Arguments: Keep watching a drop directory and itemize documents as they arrive
+    parser.add_argument("--watch", type=str,
+                        help="Optional Argument: Path to a drop directory to watch. Documents are itemized as soon "
+                             "as they have been completely written until Ctrl+C is pressed. The path is not needed")
+    parser.add_argument("--poll-interval", type=float, default=2,
+                        help="Optional Argument: Number of seconds between each check of the watched directory. "
+                             "Defaults to 2")
+    parser.add_argument("--settle-time", type=float, default=5,
+                        help="Optional Argument: Number of seconds a document's size must stay the same before it "
+                             "is itemized by --watch. Defaults to 5")
+    parser.add_argument("--queue-size", type=int,
+                        help="Optional Argument: Number of documents --watch can queue before it stops checking the "
+                             "directory until there is room. Defaults to 4 times the number of jobs")
+    return parser
+
+
+def main():
+    """
+    The main function is responsible for handling the user provided arguments and calling the run_docx_itemizer
+    accordingly. This included making sure the path is actually a file or directory, and that all files passed
+    to the run_docx_itemizer function are .docx files. The documents in a directory are itemized as a batch
+    by the run_batch function, which uses a RunManifest in the directory to skip documents that were itemized
+    by an earlier run.
+    :return: None
+    """
+    # Get the user provided arguments from the argument parser
+    parser = get_parser()
+    args = parser.parse_args()
+    path = args.path
+
+    # Query the search index instead of itemizing documents
+    if args.query is not None:
+        if args.index is None or not os.path.isfile(args.index):
+            print("A valid search index must be given with --index to query")
+            return
+        try:
+            re.compile(args.query)
+        except re.error as error:
+            print("Search term is not a valid regex: " + args.query + " (" + str(error) + ")")
+            return
+        run_query(args.index, args.query)
+        return
+    if path is None and args.watch is None:
+        parser.error("the following arguments are required: path")
+    search_term = args.search_term
+    jobs = args.jobs
+
+    # Get the search terms from the search term argument and the watchlist
+    search_terms = []
+    if search_term is not None and search_term != "":
+        search_terms.append(search_term)
+    if args.watchlist is not None:
+        if not os.path.isfile(args.watchlist):
+            print("Watchlist is not valid: " + args.watchlist)
+            return
+        search_terms.extend(read_watchlist(args.watchlist))
+
+    # Make sure the search terms are valid regexes before any document is itemized
+    for search_term in search_terms:
+        try:
+            re.compile(search_term)
+        except re.error as error:
+            print("Search term is not a valid regex: " + search_term + " (" + str(error) + ")")
+            return
+
+    # Options used to itemize every document
+    if args.archive is not None and args.store is not None:
+        parser.error("argument -a/--archive: not allowed with argument -s/--store")
+
+    # Limits that the files of each document are extracted within
+    limits = ExtractionLimits(args.max_part_size * 1024 * 1024, args.max_doc_size * 1024 * 1024, args.max_entries,
+                              args.max_ratio, args.member_timeout)
+    options = ItemizerOptions(search_terms, args.store, args.index, args.metrics is not None, args.profile,
+                              args.max_depth, args.max_embedded_size * 1024 * 1024, limits, args.archive,
+                              signature=args.cluster is not None, write_threads=args.write_threads,
+                              index_contents=args.index_contents)
+
+    # Watch a drop directory until the watch mode is stopped
+    if args.watch is not None:
+        if not os.path.isdir(args.watch):
+            print("Watch directory is not valid: " + args.watch)
+            return
+        if args.archive is not None and args.archive_scope == "batch":
+            parser.error("argument --archive-scope: batch is not allowed with argument --watch")
+        if args.cluster is not None:
+            parser.error("argument --cluster: not allowed with argument --watch")
+        manifest_file_path = args.manifest
+        if manifest_file_path is None:
+            manifest_file_path = os.path.join(args.watch, MANIFEST_FILE_NAME)
+        if args.force and os.path.isfile(manifest_file_path):
+            os.remove(manifest_file_path)
+        manifest = RunManifest(manifest_file_path)
+        report_stream = open_report_stream(args.report_jsonl)
+        try:
+            run_watch(args.watch, options, jobs, manifest, report_stream, args.metrics, args.poll_interval,
+                      args.settle_time, args.queue_size, [args.store] if args.store is not None else [])
+        finally:
+            manifest.close()
+            if report_stream is not None:
+                report_stream.close()
+    # Check if the path is a directory
+    elif os.path.isdir(path):
+        # Find every .docx file in the directory, skipping the output of this script
+        excluded_dir_paths = [args.store] if args.store is not None else []
+        doc_file_paths = find_doc_files(path, excluded_dir_paths)
+        if len(doc_file_paths) > 0:
+            # The manifest records which documents have been itemized so a rerun only itemizes new documents
+            manifest_file_path = args.manifest
+            if manifest_file_path is None:
+                manifest_file_path = os.path.join(path, MANIFEST_FILE_NAME)
+            if args.force and os.path.isfile(manifest_file_path):
+                os.remove(manifest_file_path)
+            manifest = RunManifest(manifest_file_path)
+            report_stream = open_report_stream(args.report_jsonl)
+            # Join the archive of every document into one archive for the whole batch
+            batch_archive_writer = None
+            if args.archive is not None and args.archive_scope == "batch":
+                options.archive_root_dir_path = os.path.abspath(path)
+                options.batch_archive_path = os.path.join(
+                    options.archive_root_dir_path, os.path.basename(options.archive_root_dir_path) + "_Itemized("
+                    + get_time_stamp() + ")." + args.archive)
+                batch_archive_writer = ArchiveWriter(options.batch_archive_path, options.archive_root_dir_path,
+                                                     args.archive)
+            # Run the docx itemizer on every document in the directory
+            try:
+                run_batch(doc_file_paths, options, jobs, manifest, report_stream, args.metrics, batch_archive_writer,
+                          args.cluster, args.cluster_threshold)
+            finally:
+                manifest.close()
+                if report_stream is not None:
+                    report_stream.close()
+                if batch_archive_writer is not None:
+                    batch_archive_writer.close()
+                    remove_archive_parts(options.batch_archive_path)
+                    print("Batch Archived To: " + options.batch_archive_path)
+        else:
             print("No .docx Files Found In: " + path)
     elif os.path.isfile(path): # The path is a single file
         file_extension = os.path.splitext(path)[1]
         if file_extension == ".docx": # The file is a .docx file
-            # Run the docx itemizer
-            run_docx_itemizer(path, search_term, False)
+            # Run the docx itemizer and output its log, then do the same for every embedded document
+            reports = []
+            for report in iter_reports(path, options):
+                reports.append(report)
+                print(report.get_text(), end="")
+            report_stream = open_report_stream(args.report_jsonl)
+            if report_stream is not None:
+                for report in reports:
+                    report_stream.write(json.dumps(report.record) + "\n")
+                report_stream.close()
+            if args.metrics is not None:
+                output_metrics([(report.record["document"], report.record["metrics"]) for report in reports],
+                               args.metrics)
         else:
             print("File is not .docx: " + path)
     else:  # Path is not a directory or file
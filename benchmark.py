@@ -0,0 +1,356 @@
+import os                   # Interacts with the file system
+import sys                  # Sets the exit code when a regression is found
+import time                 # Times each stage
+import json                 # Reads and writes the baseline file
+import random               # Generates the contents of the synthetic documents
+import shutil               # Removes the output of each run
+import zipfile              # Writes the synthetic documents
+import tempfile             # Holds the synthetic corpus and the output of each run
+import argparse             # Parses the arguments passed by the user. Also provides a help menu using the [-h] flag
+import concurrent.futures   # Runs each measurement in a fresh process so its peak memory can be measured
+import DocxItemizer         # The script that is benchmarked
+
+try:
+    import resource         # Gets the peak memory of a process. Only available on Unix
+except ImportError:
+    resource = None
+
+__author__ = 'James Stinson-Cerra'
+__date__ = '20190417'
+__version__ = '1'
+
+# Sets up the parser for the Docx Itemizer benchmark
+parser = argparse.ArgumentParser(description="Docx Itemizer Benchmark")
+# Optional Argument: Size of the document.xml in the large document case
+parser.add_argument("--large-size", type=int, default=50,
+                    help="Optional Argument: Size in MB of the document.xml in the large document case")
+# Optional Argument: Number of times each measurement is run. The fastest run is kept
+parser.add_argument("--repeat", type=int, default=3,
+                    help="Optional Argument: Number of times to run each measurement. The fastest run is kept")
+# Optional Argument: Cases to run
+parser.add_argument("--cases", type=str, nargs="+",
+                    help="Optional Argument: Names of the cases to run. Defaults to every case")
+# Optional Argument: Baseline to compare the results with
+parser.add_argument("--baseline", type=str,
+                    help="Optional Argument: Path to a baseline file from --save-baseline to compare the results with")
+# Optional Argument: Save the results as a baseline
+parser.add_argument("--save-baseline", type=str,
+                    help="Optional Argument: Path to save the results to as a baseline for later runs")
+# Optional Argument: Slowdown compared to the baseline that counts as a regression
+parser.add_argument("--threshold", type=float, default=0.2,
+                    help="Optional Argument: Slowdown compared to the baseline that counts as a regression "
+                         "(0.2 is 20 percent slower)")
+
+# Namespace declaration used by the synthetic document.xml files
+W_NAMESPACE_DECLARATION = "xmlns:w=\"http://schemas.openxmlformats.org/wordprocessingml/2006/main\""
+# Search term used by the Searcher and full runs
+SEARCH_TERM = "Confidential|acct-[0-9]{6}"
+# Stages that are measured for every case
+STAGES = ["Full", "Itemizer", "Content", "ImageFinder", "Searcher"]
+# Words used to build the text of the synthetic documents
+WORDS = ["the", "report", "Quarterly", "revenue", "Confidential", "account", "transfer", "Meeting", "notes",
+         "acct-104233", "Project", "schedule", "invoice", "Review", "approved", "draft"]
+
+
+def make_document_xml(rng, size):
+    """
+    The make_document_xml function is a helper function that is used to build a document.xml file with
+    paragraphs, runs with tabs and breaks, and tables until it is about the given size
+
+    :param rng: The random number generator used to pick the words
+    :param size: The size of the document.xml in bytes
+    :return: The document.xml as bytes
+    """
+    parts = ["<?xml version=\"1.0\" encoding=\"UTF-8\" standalone=\"yes\"?><w:document " + W_NAMESPACE_DECLARATION
+             + "><w:body>"]
+    length = len(parts[0])
+    paragraph_number = 0
+    while length < size:
+        paragraph_number += 1
+        if paragraph_number % 20 == 0:  # Add a table every 20 paragraphs
+            cells = "".join("<w:tc><w:p><w:r><w:t>" + rng.choice(WORDS) + "</w:t></w:r></w:p></w:tc>"
+                            for i in range(4))
+            part = "<w:tbl><w:tr>" + cells + "</w:tr></w:tbl>"
+        else:
+            text = " ".join(rng.choice(WORDS) for i in range(12))
+            part = "<w:p><w:pPr><w:tabs><w:tab w:val=\"left\" w:pos=\"720\"/></w:tabs></w:pPr><w:r><w:rPr><w:b/>" \
+                   "</w:rPr><w:t xml:space=\"preserve\">" + text + "</w:t></w:r><w:r><w:tab/><w:t>" \
+                   + rng.choice(WORDS) + "</w:t><w:br/></w:r></w:p>"
+        parts.append(part)
+        length += len(part)
+    parts.append("</w:body></w:document>")
+    return "".join(parts).encode("utf-8")
+
+
+def make_image(rng, size):
+    """
+    The make_image function is a helper function that is used to build the bytes of a fake PNG image
+
+    :param rng: The random number generator used to fill the image
+    :param size: The size of the image in bytes
+    :return: The image as bytes
+    """
+    return b"\x89PNG\r\n\x1a\n" + rng.randbytes(max(size - 8, 0))
+
+
+def write_docx(doc_file_path, members):
+    """
+    The write_docx function is a helper function that is used to write a synthetic .docx file
+
+    :param doc_file_path: Path of the .docx file to write
+    :param members: A list of the name and contents of each member of the document
+    :return: None
+    """
+    content_types = b"<?xml version=\"1.0\" encoding=\"UTF-8\"?><Types xmlns=\"http://schemas.openxmlformats.org/" \
+                    b"package/2006/content-types\"><Default Extension=\"xml\" ContentType=\"application/xml\"/>" \
+                    b"</Types>"
+    with zipfile.ZipFile(doc_file_path, "w", zipfile.ZIP_DEFLATED) as zip_ref:
+        zip_ref.writestr("[Content_Types].xml", content_types)
+        for name, data in members:
+            zip_ref.writestr(name, data)
+
+
+def make_corpus(corpus_dir_path, large_size):
+    """
+    The make_corpus function is responsible for generating the synthetic documents that are benchmarked
+        1. tiny_memo: A short memo with a few paragraphs
+        2. large_document: A document.xml of large_size MB
+        3. many_media: 300 media files
+        4. mislabeled_images: Images and PDFs that use the wrong extension
+        5. deep_folders: Files nested in deep folders
+    The same documents are generated every time so results can be compared with a baseline
+
+    :param corpus_dir_path: Path to the directory to write the documents to
+    :param large_size: Size in MB of the document.xml in the large document case
+    :return: A dictionary of each case's name to the path of its document
+    """
+    rng = random.Random(20190417)
+    cases = {
+        "tiny_memo": [("word/document.xml", make_document_xml(rng, 4 * 1024))],
+        "large_document": [("word/document.xml", make_document_xml(rng, large_size * 1024 * 1024))],
+        "many_media": [("word/document.xml", make_document_xml(rng, 64 * 1024))]
+        + [("word/media/image" + str(i) + ".png", make_image(rng, 64 * 1024)) for i in range(300)],
+        "mislabeled_images": [("word/document.xml", make_document_xml(rng, 64 * 1024))]
+        + [("word/media/notes" + str(i) + ".txt", make_image(rng, 32 * 1024)) for i in range(50)]
+        + [("word/embeddings/object" + str(i) + ".dat", b"%PDF-1.4\n" + rng.randbytes(32 * 1024))
+           for i in range(50)],
+        "deep_folders": [("word/document.xml", make_document_xml(rng, 64 * 1024))]
+        + [("/".join("level" + str(depth) for depth in range(30)) + "/part" + str(i) + ".xml",
+            make_document_xml(rng, 8 * 1024)) for i in range(200)],
+    }
+    doc_file_paths = {}
+    for name, members in cases.items():
+        doc_file_path = os.path.join(corpus_dir_path, name + ".docx")
+        write_docx(doc_file_path, members)
+        doc_file_paths[name] = doc_file_path
+    return doc_file_paths
+
+
+def read_members(doc_file_path):
+    """
+    The read_members function is a helper function that is used to read every member of a document into memory
+    so a stage can be timed without the time taken to read the document
+
+    :param doc_file_path: Path to the document
+    :return: A list of the name and contents of each member of the document
+    """
+    with zipfile.ZipFile(doc_file_path, "r") as zip_ref:
+        return [(member.filename, zip_ref.read(member)) for member in zip_ref.infolist() if not member.is_dir()]
+
+
+def count_files(dir_path):
+    """
+    The count_files function is a helper function that is used to count the files written by a run
+
+    :param dir_path: Path to the directory the run wrote to
+    :return: The number of files in the directory and its sub-directories
+    """
+    return sum(len(file_names) for dir_path, dir_names, file_names in os.walk(dir_path))
+
+
+def import_lazy_modules():
+    """
+    The import_lazy_modules function is responsible for importing the modules that DocxItemizer only imports the
+    first time they are used. Each measurement runs in a fresh process, so without this the import time (e.g. about
+    36 ms for lxml) would be measured as part of every stage
+
+    :return: None
+    """
+    import lxml.etree       # Parses the XML files
+    import urllib.parse     # Decodes the targets of the relationships
+    try:
+        import fcntl        # Makes the reflinks of the copies of the documents. Only available on Unix
+    except ImportError:
+        pass
+
+
+def measure(doc_file_path, stage):
+    """
+    The measure function is responsible for running one stage on one document and measuring it. It is run in a
+    fresh worker process so the peak memory is only the peak memory of this measurement
+
+    Stages:
+        1. Full: The whole run_docx_itemizer path with a search term
+        2. Itemizer: Itemizer.process_doc without any inspection stages
+        3. Content: Itemizer.extract_text on every XML file in the "word" directory
+        4. ImageFinder: ImageFinder.inspect on every member
+        5. Searcher: Searcher.inspect on every member
+    Members are read for the stages that are given them, and the modules DocxItemizer imports when they are first
+    used are imported, before the timer is started. The Full and Itemizer stages read the document themselves so
+    its members are not read into memory beforehand, which would add to their peak memory
+
+    :param doc_file_path: Path to the document
+    :param stage: Name of the stage to run
+    :return: A dictionary with the wall time, CPU time, bytes processed, files written, and peak memory
+    """
+    # Bytes processed are the uncompressed bytes of every member the stage looks at
+    if stage in ("Full", "Itemizer"):
+        members = []
+        with zipfile.ZipFile(doc_file_path, "r") as zip_ref:
+            processed_bytes = sum(member.file_size for member in zip_ref.infolist() if not member.is_dir())
+    else:
+        members = read_members(doc_file_path)
+        if stage == "Content":
+            processed_bytes = sum(len(data) for name, data in members
+                                  if name.startswith("word/") and name.count("/") == 1 and name.endswith(".xml"))
+        else:
+            processed_bytes = sum(len(data) for name, data in members)
+    output_dir_path = tempfile.mkdtemp(prefix="docx_itemizer_benchmark_")
+    writer = DocxItemizer.FileWriter()
+    import_lazy_modules()
+    start_time = time.perf_counter()
+    start_cpu_time = time.process_time()
+    if stage == "Full":
+        doc_copy_path = os.path.join(output_dir_path, os.path.basename(doc_file_path))
+        shutil.copy(doc_file_path, doc_copy_path)
+        start_time = time.perf_counter()
+        start_cpu_time = time.process_time()
+        DocxItemizer.run_docx_itemizer(doc_copy_path, DocxItemizer.ItemizerOptions([SEARCH_TERM]), True)
+    elif stage == "Itemizer":
+        itemizer = DocxItemizer.Itemizer(doc_file_path, output_dir_path,
+                                         os.path.join(output_dir_path, "Extracted Document"),
+                                         os.path.join(output_dir_path, os.path.basename(doc_file_path)), writer)
+        itemizer.process_doc()
+    elif stage == "Content":
+        itemizer = DocxItemizer.Itemizer(doc_file_path, output_dir_path, output_dir_path, output_dir_path, writer)
+        for name, data in members:
+            if name.startswith("word/") and name.count("/") == 1 and name.endswith(".xml"):
+                itemizer.extract_text(data, os.path.join(output_dir_path, os.path.basename(name) + ".txt"))
+    elif stage == "ImageFinder":
+        image_finder = DocxItemizer.ImageFinder(output_dir_path, writer)
+        for name, data in members:
+            image_finder.inspect(os.path.join(output_dir_path, "Extracted Document", name), data)
+    elif stage == "Searcher":
+        searcher = DocxItemizer.Searcher(output_dir_path, [SEARCH_TERM], writer)
+        for name, data in members:
+            searcher.inspect(os.path.join(output_dir_path, "Extracted Document", name), data)
+    seconds = time.perf_counter() - start_time
+    cpu_seconds = time.process_time() - start_cpu_time
+    files_written = count_files(output_dir_path)
+    if stage == "Full":
+        files_written -= 1  # Do not count the copy of the document that was made before the timer started
+    shutil.rmtree(output_dir_path)
+    peak_rss_mb = None
+    if resource is not None:
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+        peak_rss_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / divisor
+    return {"seconds": seconds, "cpu_seconds": cpu_seconds, "bytes": processed_bytes,
+            "files_written": files_written, "peak_rss_mb": peak_rss_mb}
+
+
+def run_measurement(doc_file_path, stage, repeat):
+    """
+    The run_measurement function is responsible for running a measurement repeat times, each in a fresh process,
+    and keeping the fastest run. The peak memory is the highest of all of the runs
+
+    :param doc_file_path: Path to the document
+    :param stage: Name of the stage to run
+    :param repeat: Number of times to run the measurement
+    :return: A dictionary with the measurement's results and its docs/sec and MB/sec
+    """
+    best = None
+    peak_rss_mb = None
+    for i in range(repeat):
+        with concurrent.futures.ProcessPoolExecutor(max_workers=1) as executor:
+            result = executor.submit(measure, doc_file_path, stage).result()
+        if best is None or result["seconds"] < best["seconds"]:
+            best = result
+        if result["peak_rss_mb"] is not None:
+            peak_rss_mb = max(peak_rss_mb or 0, result["peak_rss_mb"])
+    seconds = max(best["seconds"], 1e-9)
+    best["peak_rss_mb"] = peak_rss_mb
+    best["docs_per_second"] = 1 / seconds
+    best["mb_per_second"] = best["bytes"] / seconds / 1000000
+    return best
+
+
+def compare(results, baseline, threshold):
+    """
+    The compare function is responsible for comparing the results with a baseline
+
+    :param results: The results of this run by case and stage
+    :param baseline: The results of an earlier run by case and stage
+    :param threshold: Slowdown compared to the baseline that counts as a regression
+    :return: A list of the regressions as strings
+    """
+    regressions = []
+    print("Comparison With Baseline:")
+    for case, stages in results.items():
+        for stage, result in stages.items():
+            baseline_result = baseline.get(case, {}).get(stage)
+            if baseline_result is None:
+                continue
+            # Change in throughput. A negative change is a slowdown
+            change = result["mb_per_second"] / max(baseline_result["mb_per_second"], 1e-9) - 1
+            status = ""
+            if change < -threshold:
+                status = " REGRESSION"
+                regressions.append(case + " " + stage)
+            print("\t" + case.ljust(20) + stage.ljust(14) + "%+.1f%%" % (change * 100) + status)
+    return regressions
+
+
+def main():
+    """
+    The main function is responsible for generating the synthetic corpus, running every measurement, printing
+    the results, and comparing them with a baseline. The exit code is 1 if any regression is found
+    :return: None
+    """
+    args = parser.parse_args()
+    corpus_dir_path = tempfile.mkdtemp(prefix="docx_itemizer_corpus_")
+    try:
+        print("Generating Synthetic Corpus In: " + corpus_dir_path)
+        doc_file_paths = make_corpus(corpus_dir_path, args.large_size)
+        case_names = args.cases if args.cases is not None else list(doc_file_paths)
+        results = {}
+        print("Case".ljust(20) + "Stage".ljust(14) + "Docs/Sec".rjust(10) + "MB/Sec".rjust(10)
+              + "CPU Sec".rjust(10) + "Peak RSS MB".rjust(13) + "Files".rjust(8))
+        for case in case_names:
+            results[case] = {}
+            for stage in STAGES:
+                result = run_measurement(doc_file_paths[case], stage, args.repeat)
+                results[case][stage] = result
+                peak_rss = "%.1f" % result["peak_rss_mb"] if result["peak_rss_mb"] is not None else "n/a"
+                print(case.ljust(20) + stage.ljust(14) + ("%.2f" % result["docs_per_second"]).rjust(10)
+                      + ("%.2f" % result["mb_per_second"]).rjust(10) + ("%.3f" % result["cpu_seconds"]).rjust(10)
+                      + peak_rss.rjust(13) + str(result["files_written"]).rjust(8))
+    finally:
+        shutil.rmtree(corpus_dir_path)
+
+    if args.save_baseline is not None:
+        with open(args.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=4)
+        print("Saved Baseline To: " + os.path.abspath(args.save_baseline))
+    if args.baseline is not None:
+        with open(args.baseline, "r", encoding="utf-8") as file:
+            baseline = json.load(file)
+        regressions = compare(results, baseline, args.threshold)
+        if len(regressions) > 0:
+            print("Regressions Found: " + ", ".join(regressions))
+            sys.exit(1)
+        print("No Regressions Found")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+import io
+import os
+import sys
+import zipfile
+
+import pytest
+
+# The tests import DocxItemizer.py from the root of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+W_NAMESPACE_DECLARATION = 'xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main"'
+
+CONTENT_TYPES = ('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                 '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+                 '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+                 '<Default Extension="xml" ContentType="application/xml"/>'
+                 '<Default Extension="png" ContentType="image/png"/>'
+                 '<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.'
+                 'wordprocessingml.document.main+xml"/></Types>')
+
+PACKAGE_RELATIONSHIPS = ('<?xml version="1.0"?>'
+                         '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                         '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                         'relationships/officeDocument" Target="word/document.xml"/></Relationships>')
+
+
+def build_document_xml(body):
+    """
+    Build word/document.xml with the given body
+
+    :param body: The XML of the body, e.g. "<w:p><w:r><w:t>text</w:t></w:r></w:p>"
+    :return: The XML as a string
+    """
+    return '<?xml version="1.0"?><w:document ' + W_NAMESPACE_DECLARATION + '><w:body>' + body + \
+        '</w:body></w:document>'
+
+
+def build_docx(body="<w:p><w:r><w:t>Hello World</w:t></w:r></w:p>", members=None):
+    """
+    Build a small .docx file in memory
+
+    :param body: The XML of the body of word/document.xml
+    :param members: Other members of the archive as a dictionary of the name and the contents
+    :return: The .docx file as bytes
+    """
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr("[Content_Types].xml", CONTENT_TYPES)
+        archive.writestr("_rels/.rels", PACKAGE_RELATIONSHIPS)
+        archive.writestr("word/document.xml", build_document_xml(body))
+        for name, contents in (members or {}).items():
+            archive.writestr(name, contents)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def make_docx(tmp_path):
+    """
+    Write small .docx files to the temporary directory of the test
+
+    :return: A function that takes the file name and the arguments of build_docx and returns the file path
+    """
+    def make(name="document.docx", body="<w:p><w:r><w:t>Hello World</w:t></w:r></w:p>", members=None):
+        file_path = os.path.join(str(tmp_path), name)
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, "wb") as file:
+            file.write(build_docx(body, members))
+        return file_path
+    return make
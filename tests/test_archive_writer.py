@@ -0,0 +1,51 @@
+import os
+import tarfile
+import warnings
+import zipfile
+
+import pytest
+
+import DocxItemizer
+
+
+@pytest.mark.parametrize("archive_format", ["tar", "zip"])
+def test_file_written_again_replaces_the_earlier_file(tmp_path, archive_format):
+    root_dir_path = str(tmp_path)
+    archive_path = os.path.join(root_dir_path, "memo." + archive_format)
+    file_path = os.path.join(root_dir_path, "memo_Itemized(20260101-000000)", "XML", "document.xml")
+    writer = DocxItemizer.ArchiveWriter(archive_path, root_dir_path, archive_format)
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")  # zipfile warns about duplicate names
+        writer.write(file_path, b"body")
+        writer.write(file_path, b"glossary")
+        writer.close()
+    name = "memo_Itemized(20260101-000000)/XML/document.xml"
+    assert DocxItemizer.read_archive_part(archive_path, name) == b"glossary"
+    if archive_format == "zip":
+        with zipfile.ZipFile(archive_path) as archive:
+            assert archive.namelist() == [name]
+            assert archive.read(name) == b"glossary"
+    else:
+        with tarfile.open(archive_path) as archive:
+            assert archive.extractfile(name).read() == b"glossary"
+
+
+@pytest.mark.parametrize("archive_format", ["tar", "zip"])
+def test_append_archive_joins_parts(tmp_path, archive_format):
+    root_dir_path = str(tmp_path)
+    batch_archive_path = os.path.join(root_dir_path, "batch." + archive_format)
+    batch_writer = DocxItemizer.ArchiveWriter(batch_archive_path, root_dir_path, archive_format)
+    contents = {}
+    for doc_name in ("a", "b"):
+        part_path = batch_archive_path + "." + doc_name + ".part"
+        part_writer = DocxItemizer.ArchiveWriter(part_path, root_dir_path, archive_format, write_index=False)
+        base_dir_path = os.path.join(root_dir_path, doc_name + "_Itemized(20260101-000000)")
+        part_writer.make_dir(os.path.join(base_dir_path, "Media"))
+        for file_name, data in (("log.txt", doc_name.encode() * 10), ("big.bin", os.urandom(3 * 1024 * 1024))):
+            part_writer.write(os.path.join(base_dir_path, file_name), data)
+            contents[doc_name + "_Itemized(20260101-000000)/" + file_name] = data
+        part_writer.close()
+        batch_writer.append_archive(part_path)
+    batch_writer.close()
+    for name, data in contents.items():
+        assert DocxItemizer.read_archive_part(batch_archive_path, name) == data
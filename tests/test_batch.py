@@ -0,0 +1,74 @@
+import concurrent.futures
+import json
+import os
+
+import DocxItemizer
+from conftest import build_docx
+
+run_batch_doc = DocxItemizer.run_batch_doc
+
+
+def crash_on_doc(doc_file_path, *args):
+    # Kill the worker process like the out of memory killer would when it itemizes "crash.docx"
+    if os.path.basename(doc_file_path) == "crash.docx":
+        os._exit(1)
+    return run_batch_doc(doc_file_path, *args)
+
+
+def test_worker_crash_fails_only_its_document(tmp_path, make_docx, monkeypatch, capsys):
+    monkeypatch.setattr(DocxItemizer, "run_batch_doc", crash_on_doc)
+    doc_file_paths = [make_docx(name) for name in ("a.docx", "b.docx", "crash.docx", "c.docx", "d.docx")]
+    manifest_file_path = os.path.join(str(tmp_path), DocxItemizer.MANIFEST_FILE_NAME)
+    manifest = DocxItemizer.RunManifest(manifest_file_path)
+    DocxItemizer.run_batch(doc_file_paths, DocxItemizer.ItemizerOptions(), 2, manifest)
+    manifest.close()
+    output = capsys.readouterr().out
+    assert "Failed To Itemize Document: " + doc_file_paths[2] in output
+    assert "The worker process crashed while itemizing the document" in output
+    assert "Itemized Documents: 4/5" in output
+    statuses = {}
+    with open(manifest_file_path, "r", encoding="utf-8") as file:
+        for line in file:
+            record = json.loads(line)
+            statuses[os.path.basename(record["path"])] = record["status"]
+    assert statuses == {"a.docx": "completed", "b.docx": "completed", "crash.docx": "failed",
+                        "c.docx": "completed", "d.docx": "completed"}
+    assert not any(name.startswith("crash_Itemized") for name in os.listdir(str(tmp_path)))
+
+
+def test_batch_output_is_in_order(tmp_path, make_docx, capsys):
+    doc_file_paths = [make_docx(name) for name in ("a.docx", "b.docx", "c.docx")]
+    DocxItemizer.run_batch(doc_file_paths, DocxItemizer.ItemizerOptions(), 2)
+    output = capsys.readouterr().out
+    positions = [output.index("Progress: " + str(i) + "/3 Documents") for i in (1, 2, 3)]
+    assert positions == sorted(positions)
+    assert "Itemized Documents: 3/3" in output
+
+
+def test_embedded_documents_are_queued_within_the_limit(make_docx, monkeypatch, capsys):
+    embedded_doc = build_docx("<w:p><w:r><w:t>Embedded</w:t></w:r></w:p>")
+    members = {"word/embeddings/Document" + str(i) + ".docx": embedded_doc for i in range(12)}
+    doc_file_paths = [make_docx("parent.docx", members=members), make_docx("a.docx")]
+    outputs = []
+    submitted_args = []
+    max_queued = [0]
+
+    class CountingExecutor(concurrent.futures.ProcessPoolExecutor):
+        def submit(self, function, *args):
+            # Count the documents that have been submitted but not output yet
+            outputs.append(capsys.readouterr().out)
+            submitted_args.append(args)
+            max_queued[0] = max(max_queued[0], len(submitted_args) - "".join(outputs).count("Document Name: "))
+            return super().submit(function, *args)
+
+    monkeypatch.setattr(concurrent.futures, "ProcessPoolExecutor", CountingExecutor)
+    DocxItemizer.run_batch(doc_file_paths, DocxItemizer.ItemizerOptions(), 2)
+    output = "".join(outputs) + capsys.readouterr().out
+    assert output.count("Embedded Document Name: ") == 12
+    assert "Itemized Embedded Documents: 12" in output
+    assert max_queued[0] <= 2 * 4
+    # The embedded documents are passed to the worker processes in files instead of as bytes
+    embedded_docs = [args[2] for args in submitted_args if args[2] is not None]
+    assert len(embedded_docs) == 12
+    assert all(embedded_doc.data is None and not os.path.exists(embedded_doc.data_file_path)
+               for embedded_doc in embedded_docs)
@@ -0,0 +1,30 @@
+import pytest
+
+import benchmark
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    return benchmark.make_corpus(str(tmp_path_factory.mktemp("corpus")), 1)
+
+
+@pytest.mark.parametrize("stage", benchmark.STAGES)
+def test_every_stage_can_be_measured(corpus, stage):
+    result = benchmark.measure(corpus["tiny_memo"], stage)
+    assert result["seconds"] > 0
+    assert result["bytes"] > 0
+    if stage in ("Full", "Itemizer"):
+        assert result["files_written"] > 0
+
+
+def test_the_corpus_is_the_same_every_time(tmp_path, corpus):
+    other_corpus = benchmark.make_corpus(str(tmp_path), 1)
+    assert sorted(other_corpus) == sorted(corpus)
+    assert benchmark.read_members(other_corpus["many_media"]) == benchmark.read_members(corpus["many_media"])
+
+
+def test_slowdowns_over_the_threshold_are_regressions(capsys):
+    results = {"tiny_memo": {"Full": {"mb_per_second": 7.0}, "Searcher": {"mb_per_second": 9.5}}}
+    baseline = {"tiny_memo": {"Full": {"mb_per_second": 10.0}, "Searcher": {"mb_per_second": 10.0}}}
+    assert benchmark.compare(results, baseline, 0.2) == ["tiny_memo Full"]
+    assert "REGRESSION" in capsys.readouterr().out
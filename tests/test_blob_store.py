@@ -0,0 +1,36 @@
+import json
+import os
+
+import DocxItemizer
+
+
+def test_identical_files_are_stored_once(tmp_path):
+    store_dir_path = str(tmp_path / "store")
+    base_dir_path = str(tmp_path / "Doc")
+    writer = DocxItemizer.BlobStoreWriter(store_dir_path, base_dir_path)
+    writer.write(os.path.join(base_dir_path, "Media", "image1.png"), b"image")
+    writer.write(os.path.join(base_dir_path, "Hidden Images", "notes.png"), b"image")
+    with writer.open(os.path.join(base_dir_path, "Content", "document.txt")) as file:
+        file.write(b"Hello ")
+        file.write(b"World")
+    writer.close()
+    first_stat = os.stat(os.path.join(base_dir_path, "Media", "image1.png"))
+    second_stat = os.stat(os.path.join(base_dir_path, "Hidden Images", "notes.png"))
+    assert first_stat.st_ino == second_stat.st_ino
+    with open(os.path.join(base_dir_path, "Content", "document.txt"), "rb") as file:
+        assert file.read() == b"Hello World"
+    blob_paths = [os.path.join(dir_path, file_name) for dir_path, dir_names, file_names in os.walk(store_dir_path)
+                  for file_name in file_names]
+    assert len(blob_paths) == 2
+    assert not any(blob_path.endswith(".tmp") for blob_path in blob_paths)
+    with open(os.path.join(base_dir_path, "manifest.json"), "r", encoding="utf-8") as file:
+        manifest = json.load(file)
+    assert manifest[os.path.join("Media", "image1.png")] == manifest[os.path.join("Hidden Images", "notes.png")]
+
+
+def test_documents_share_the_store(tmp_path, make_docx):
+    store_dir_path = str(tmp_path / "store")
+    options = DocxItemizer.ItemizerOptions(store_dir_path=store_dir_path)
+    reports = [DocxItemizer.run_docx_itemizer(make_docx(name), options, False) for name in ("a.docx", "b.docx")]
+    xml_file_paths = [os.path.join(report.record["output"], "XML", "document.xml") for report in reports]
+    assert os.stat(xml_file_paths[0]).st_ino == os.stat(xml_file_paths[1]).st_ino
@@ -0,0 +1,53 @@
+import json
+
+import DocxItemizer
+
+
+def get_signature(words):
+    content_signature = DocxItemizer.ContentSignature()
+    content_signature.inspect_text("word/document.xml", " ".join(words))
+    return content_signature.get_signature()
+
+
+def test_near_duplicates_are_clustered(tmp_path, capsys):
+    words = ["word" + str(i) for i in range(300)]
+    revised_words = list(words)
+    revised_words[150] = "changed"
+    other_words = ["other" + str(i) for i in range(300)]
+    signature = get_signature(words)
+    assert len(signature) == DocxItemizer.MINHASH_SIZE
+    assert DocxItemizer.get_similarity(signature, get_signature(revised_words)) >= 0.8
+    assert DocxItemizer.get_similarity(signature, get_signature(other_words)) < 0.2
+    docs = [("a.docx", "1", signature), ("other.docx", "2", get_signature(other_words)),
+            ("revised.docx", "3", get_signature(revised_words)), ("copy.docx", "1", None)]
+    assert DocxItemizer.cluster_documents(docs, 0.8) == [[0, 2, 3]]
+    cluster_records = DocxItemizer.get_cluster_records(docs, 0.8)
+    assert [document["document"] for document in cluster_records[0]["documents"]] == ["a.docx", "revised.docx",
+                                                                                      "copy.docx"]
+    assert cluster_records[0]["documents"][2]["exact"]
+    cluster_file_path = str(tmp_path / "clusters.json")
+    DocxItemizer.output_clusters(docs, 0.8, cluster_file_path)
+    capsys.readouterr()
+    with open(cluster_file_path, "r", encoding="utf-8") as file:
+        clusters = json.load(file)["clusters"]
+    assert len(clusters) == 1
+    assert clusters[0]["representative"] == "a.docx"
+
+
+def test_near_duplicates_of_later_bucket_members_are_clustered():
+    rows = DocxItemizer.MINHASH_SIZE // DocxItemizer.LSH_BANDS
+    # All three documents share the first band, but only the last two are near-duplicates and they share no other
+    # band
+    signature = [0] * DocxItemizer.MINHASH_SIZE
+    revised_signature = [0] * rows + list(range(1, DocxItemizer.MINHASH_SIZE - rows + 1))
+    other_signature = list(revised_signature)
+    for band in range(1, DocxItemizer.LSH_BANDS):
+        other_signature[band * rows] = -band
+    docs = [("a.docx", "1", signature), ("b.docx", "2", revised_signature), ("c.docx", "3", other_signature)]
+    assert DocxItemizer.get_similarity(revised_signature, other_signature) >= 0.8
+    assert DocxItemizer.cluster_documents(docs, 0.8) == [[1, 2]]
+
+
+def test_documents_without_features_have_no_signature():
+    assert DocxItemizer.ContentSignature().get_signature() is None
+    assert get_signature(["one"]) is not None
@@ -0,0 +1,38 @@
+import DocxItemizer
+from conftest import build_docx
+
+
+def extract(body):
+    reports = DocxItemizer.itemize_bytes(build_docx(body), "memo.docx")
+    return reports[0].files["Content/document.txt"].decode("utf-8")
+
+
+def cell(text):
+    if text == "":
+        return "<w:tc><w:p/></w:tc>"
+    return "<w:tc><w:p><w:r><w:t>" + text + "</w:t></w:r></w:p></w:tc>"
+
+
+def test_paragraphs_tabs_and_breaks():
+    body = "<w:p><w:r><w:t>One</w:t><w:tab/><w:t>Two</w:t><w:br/><w:t>Three</w:t></w:r></w:p>" \
+           "<w:p><w:r><w:t>Four</w:t></w:r></w:p>"
+    assert extract(body) == "One\tTwo\nThree\nFour\n"
+
+
+def test_empty_cells_keep_their_tab():
+    body = "<w:tbl><w:tr>" + cell("A1") + cell("B1") + cell("C1") + "</w:tr>" \
+           "<w:tr>" + cell("A2") + cell("") + cell("C2") + "</w:tr>" \
+           "<w:tr>" + cell("") + cell("") + cell("C3") + "</w:tr></w:tbl>"
+    assert extract(body) == "A1\tB1\tC1\nA2\t\tC2\n\t\tC3\n"
+
+
+def test_paragraphs_in_a_cell_stay_on_the_row():
+    body = "<w:tbl><w:tr><w:tc><w:p><w:r><w:t>First</w:t></w:r></w:p><w:p><w:r><w:t>Second</w:t></w:r></w:p>" \
+           "</w:tc>" + cell("B1") + "</w:tr></w:tbl>"
+    assert extract(body) == "First Second\tB1\n"
+
+
+def test_deleted_text_is_separated_from_inserted_text():
+    body = "<w:p><w:r><w:t>It is</w:t></w:r><w:del><w:r><w:delText>gone</w:delText></w:r></w:del>" \
+           "<w:ins><w:r><w:t>new</w:t></w:r></w:ins></w:p>"
+    assert extract(body) == "It is gone new\n"
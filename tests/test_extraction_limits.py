@@ -0,0 +1,53 @@
+import io
+import zipfile
+
+import DocxItemizer
+from conftest import build_docx
+
+
+def build_zip(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w", zipfile.ZIP_DEFLATED) as archive:
+        for name, contents in members.items():
+            archive.writestr(name, contents)
+    return buffer.getvalue()
+
+
+def read(data, name, limits):
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_ref:
+        return DocxItemizer.read_member(zip_ref, zip_ref.getinfo(name), limits)
+
+
+def test_members_within_the_limits_are_read():
+    data = build_zip({"word/document.xml": b"<w:document/>"})
+    assert read(data, "word/document.xml", DocxItemizer.ExtractionLimits()) == (b"<w:document/>", None)
+
+
+def test_oversized_and_highly_compressed_members_are_not_read():
+    data = build_zip({"big.bin": b"\x00" * (4 * 1024 * 1024)})
+    contents, reason = read(data, "big.bin", DocxItemizer.ExtractionLimits(max_part_size=1024 * 1024))
+    assert contents is None and reason.startswith("Declared size of 4194304 bytes")
+    contents, reason = read(data, "big.bin", DocxItemizer.ExtractionLimits(max_ratio=10))
+    assert contents is None and reason.startswith("Declared compression ratio of ")
+
+
+def test_damaged_members_are_not_read():
+    data = build_zip({"word/document.xml": b"<w:document/>"})
+    with zipfile.ZipFile(io.BytesIO(data)) as zip_ref:
+        member = zip_ref.getinfo("word/document.xml")
+        member.CRC ^= 1
+        contents, reason = DocxItemizer.read_member(zip_ref, member, DocxItemizer.ExtractionLimits())
+    assert contents is None and reason.startswith("Could not be read: Bad CRC-32")
+
+
+def test_documents_that_break_the_limits_are_suspicious():
+    members = {"word/media/bomb.bin": b"\x00" * (4 * 1024 * 1024)}
+    members.update({"word/extra" + str(i) + ".xml": "<x/>" for i in range(5)})
+    limits = DocxItemizer.ExtractionLimits(max_ratio=10, max_entries=6)
+    report = DocxItemizer.itemize_bytes(build_docx(members=members), "a.docx",
+                                        DocxItemizer.ItemizerOptions(limits=limits))[0]
+    assert report.record["suspicious"]
+    reasons = {record["name"]: record["reason"] for record in report.record["suspicious_files"]}
+    assert reasons["*"].startswith("The document has 9 files")
+    assert reasons["word/media/bomb.bin"].startswith("Declared compression ratio of ")
+    assert "Extracted Document/word/media/bomb.bin" not in report.files
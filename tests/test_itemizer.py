@@ -0,0 +1,28 @@
+import collections
+
+import DocxItemizer
+from conftest import build_docx
+
+PNG_DATA = b"\x89PNG\r\n\x1a\n" + b"\x00" * 20
+
+
+def test_members_are_read_once_and_itemized_by_type(monkeypatch):
+    doc = build_docx(members={"word/_rels/document.xml.rels": "<Relationships/>", "word/media/image1.png": PNG_DATA,
+                              "word/styles.css": "body{}", "word/custom.bin": b"xyz"})
+    read_counts = collections.Counter()
+
+    def counting_read_member(zip_ref, member, limits):
+        read_counts[member.filename] += 1
+        return read_member(zip_ref, member, limits)
+
+    read_member = DocxItemizer.read_member
+    monkeypatch.setattr(DocxItemizer, "read_member", counting_read_member)
+    files = DocxItemizer.itemize_bytes(doc, "a.docx")[0].files
+    assert set(read_counts.values()) == {1}
+    assert len(read_counts) == 7
+    assert files["XML/document.xml"] == files["Extracted Document/word/document.xml"]
+    assert files["RELS/document.xml.rels"] == b"<Relationships/>"
+    assert files["Media/image1.png"] == PNG_DATA
+    assert files["CSS/styles.css"] == b"body{}"
+    assert files["Uncategorized/custom.bin"] == b"xyz"
+    assert files["Content/document.txt"].decode("utf-8").strip() == "Hello World"
@@ -0,0 +1,37 @@
+import json
+import os
+import pstats
+
+import DocxItemizer
+
+
+def test_nested_stages_are_counted_once():
+    metrics = DocxItemizer.Metrics()
+    with metrics.stage("Itemize"):
+        metrics.count_write(10)
+        with metrics.stage("Content"):
+            metrics.count_read(5)
+            metrics.count_write(3, 2)
+    metrics.count_write(1)
+    record = metrics.get_record()
+    assert record["Itemize"]["bytes_written"] == 10 and record["Itemize"]["files"] == 1
+    assert record["Content"]["bytes_read"] == 5 and record["Content"]["files"] == 2
+    assert record["Other"]["bytes_written"] == 1
+    assert DocxItemizer.NULL_METRICS.get_record() is None
+
+
+def test_document_metrics_and_profile(tmp_path, make_docx, capsys):
+    doc_file_path = make_docx("a.docx")
+    options = DocxItemizer.ItemizerOptions(metrics=True, profile_doc="a.docx")
+    report = DocxItemizer.run_docx_itemizer(doc_file_path, options, False)
+    stages = report.record["metrics"]
+    assert {"Hash", "Copy", "Read", "Itemize", "Content", "ImageFinder"} <= set(stages)
+    assert stages["Read"]["bytes_read"] > 0
+    pstats.Stats(os.path.join(report.record["output"], "profile.pstats"))
+    assert os.path.isfile(os.path.join(report.record["output"], "profile.txt"))
+    metrics_file_path = str(tmp_path / "metrics.json")
+    DocxItemizer.output_metrics([(doc_file_path, stages)], metrics_file_path)
+    assert "Stage Metrics:" in capsys.readouterr().out
+    with open(metrics_file_path, "r", encoding="utf-8") as file:
+        metrics = json.load(file)
+    assert set(metrics["totals"]) == set(stages)
@@ -0,0 +1,37 @@
+import re
+
+import DocxItemizer
+
+
+def find_alone(patterns, data):
+    # The offsets of scanning for each pattern on its own
+    found = {}
+    for i in range(len(patterns)):
+        offsets = [match.start() for match in re.finditer(patterns[i], data)]
+        if len(offsets) > 0:
+            found[i] = offsets
+    return found
+
+
+def test_overshadowed_pattern_keeps_every_offset():
+    pattern_set = DocxItemizer.PatternSet(["abc", "ab"])
+    assert pattern_set.find("xx abc secret 12 ab") == {0: [3], 1: [3, 17]}
+
+
+def test_overlapping_patterns_match_scanning_alone():
+    cases = [(["abc", "bc", "c"], "abcabc xbc c"),
+             ([r"\d+", r"\d{2}-\d", "1"], "12-3 41 1"),
+             (["secret", "cre", r"s\w+"], "secrets are secret"),
+             ([b"PK", b"K\x03", b"\x03\x04"], b"xPK\x03\x04PK")]
+    for patterns, data in cases:
+        assert DocxItemizer.PatternSet(patterns).find(data) == find_alone(patterns, data)
+
+
+def test_separate_patterns_are_found():
+    patterns = [r"(\w)\1", "(?i)secret", "word"]
+    data = "aa SECRET word"
+    assert DocxItemizer.PatternSet(patterns).find(data) == find_alone(patterns, data)
+
+
+def test_text_without_matches():
+    assert DocxItemizer.PatternSet(["abc", "ab"]).find("nothing here") == {}
@@ -0,0 +1,36 @@
+import DocxItemizer
+from conftest import build_docx
+
+DOCUMENT_RELATIONSHIPS = ('<?xml version="1.0"?>'
+                          '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+                          '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                          'relationships/image" Target="media/image1.png"/>'
+                          '<Relationship Id="rId2" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                          'relationships/attachedTemplate" Target="http://example.com/t.dotm" TargetMode="External"/>'
+                          '<Relationship Id="rId3" Type="http://schemas.openxmlformats.org/officeDocument/2006/'
+                          'relationships/image" Target="/word/media/Missing.png"/></Relationships>')
+
+
+def get_findings(members):
+    return DocxItemizer.itemize_bytes(build_docx(members=members), "a.docx")[0].record["relationships"]
+
+
+def test_hidden_parts_and_relationships_are_found():
+    findings = get_findings({"word/_rels/document.xml.rels": DOCUMENT_RELATIONSHIPS,
+                             "word/media/image1.png": b"\xff\xd8\xff\xe0\x00\x10JFIF",
+                             "word/secret.xml": "<secret/>", "word/_rels/gone.xml.rels": "<Relationships/>"})
+    assert findings["package"]
+    assert findings["relationships"] == 4
+    assert sorted(orphan["name"] for orphan in findings["orphans"]) == ["word/_rels/gone.xml.rels",
+                                                                        "word/secret.xml"]
+    assert [(record["id"], record["target"]) for record in findings["dangling"]] == [("rId3",
+                                                                                      "/word/media/Missing.png")]
+    assert [(record["type"], record["target"]) for record in findings["external"]] == [("attachedTemplate",
+                                                                                        "http://example.com/t.dotm")]
+    assert {"name": "word/media/image1.png", "declared": "image/png", "actual": "jpeg"} \
+        in findings["content_type_mismatches"]
+
+
+def test_parts_that_can_not_be_parsed_are_reported():
+    findings = get_findings({"word/_rels/document.xml.rels": "<Relationships"})
+    assert [error["name"] for error in findings["errors"]] == ["word/_rels/document.xml.rels"]
@@ -0,0 +1,25 @@
+import hashlib
+
+import DocxItemizer
+
+SEPARATOR = "~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~"
+
+
+def test_document_is_read_once_and_hashed(make_docx, monkeypatch):
+    doc_file_path = make_docx("a.docx")
+
+    def fail_hash_file(file_path):
+        raise AssertionError("The document was read again to hash it: " + file_path)
+
+    monkeypatch.setattr(DocxItemizer, "hash_file", fail_hash_file)
+    report = DocxItemizer.run_docx_itemizer(doc_file_path, DocxItemizer.ItemizerOptions(), False)
+    with open(doc_file_path, "rb") as file:
+        assert report.record["sha256"] == hashlib.sha256(file.read()).hexdigest()
+
+
+def test_writes_are_logged_before_the_closing_separator(make_docx):
+    report = DocxItemizer.run_docx_itemizer(make_docx("a.docx"), DocxItemizer.ItemizerOptions(), False)
+    lines = report.get_text().splitlines()
+    assert lines[-1] == SEPARATOR
+    assert lines[-2].startswith("Output Files Written: ")
+    assert lines[-3] == SEPARATOR
@@ -0,0 +1,43 @@
+import json
+import os
+
+import DocxItemizer
+
+
+def read_records(manifest_file_path):
+    with open(manifest_file_path, "r", encoding="utf-8") as file:
+        return [json.loads(line) for line in file]
+
+
+def test_start_removes_only_the_interrupted_output(tmp_path, make_docx):
+    doc_file_path = make_docx("memo.docx")
+    manifest_file_path = os.path.join(str(tmp_path), DocxItemizer.MANIFEST_FILE_NAME)
+    interrupted_dir_path = os.path.join(str(tmp_path), "memo_Itemized(20260101-000000)")
+    completed_dir_path = os.path.join(str(tmp_path), "memo_Itemized(20260101-000001)")
+    os.mkdir(interrupted_dir_path)
+    os.mkdir(completed_dir_path)
+    manifest = DocxItemizer.RunManifest(manifest_file_path)
+    manifest.start(doc_file_path, interrupted_dir_path)
+    manifest.close()
+    # The interrupted run is started again after another run of the document wrote its output
+    manifest = DocxItemizer.RunManifest(manifest_file_path)
+    restarted_dir_path = os.path.join(str(tmp_path), "memo_Itemized(20260101-000002)")
+    assert manifest.start(doc_file_path, restarted_dir_path) == [interrupted_dir_path]
+    manifest.close()
+    assert not os.path.exists(interrupted_dir_path)
+    assert os.path.isdir(completed_dir_path)
+    assert read_records(manifest_file_path)[-1]["output"] == restarted_dir_path
+
+
+def test_failed_document_leaves_no_output(tmp_path, make_docx, capsys):
+    doc_file_path = os.path.join(str(tmp_path), "broken.docx")
+    with open(doc_file_path, "wb") as file:
+        file.write(b"not a zip file")
+    manifest_file_path = os.path.join(str(tmp_path), DocxItemizer.MANIFEST_FILE_NAME)
+    for _ in range(2):
+        manifest = DocxItemizer.RunManifest(manifest_file_path)
+        DocxItemizer.run_batch([doc_file_path], DocxItemizer.ItemizerOptions(), 1, manifest)
+        manifest.close()
+    assert "Failed To Itemize Document" in capsys.readouterr().out
+    assert sorted(os.listdir(str(tmp_path))) == ["broken.docx", DocxItemizer.MANIFEST_FILE_NAME]
+    assert read_records(manifest_file_path)[-1]["status"] == "failed"
@@ -0,0 +1,43 @@
+import os
+
+import pytest
+
+import DocxItemizer
+
+
+def build_index(tmp_path, index_contents):
+    index_file_path = str(tmp_path / "index.sqlite")
+    extracted_dir_path = os.path.join("Doc", "Extracted Document")
+    indexer = DocxItemizer.SearchIndexer(index_file_path, "doc.docx", extracted_dir_path, index_contents)
+    indexer.inspect(os.path.join(extracted_dir_path, "word", "document.xml"),
+                    "<w:t>Résumé of naïve café</w:t>".encode("utf-8"))
+    indexer.inspect(os.path.join(extracted_dir_path, "word", "vbaProject.bin"), b"\xd0\xcf\x11\xe0\x00AutoOpen\x01ab")
+    indexer.inspect_text(os.path.join(extracted_dir_path, "Content", "document.txt"), "Résumé of naïve café")
+    indexer.close("Doc", "0" * 64)
+    return DocxItemizer.SearchIndex(index_file_path)
+
+
+@pytest.mark.parametrize("search_term, keyword", [("AutoOpen", "AutoOpen"), (r"invoice\d+\.pdf", "invoice"),
+                                                  (r"ab|cd", None), (r"(?i)AutoOpen", None), (r"na\w", None),
+                                                  (r"colou?r", "colo"), (r"(abc)def", "def"), (r"[(]abcd", "abcd"),
+                                                  (r"\x41BCD", "BCD"), (r"a(b|c)d|e", None), (r"(?x)a b c", None)])
+def test_search_keyword(search_term, keyword):
+    assert DocxItemizer.get_search_keyword(search_term) == keyword
+
+
+@pytest.mark.parametrize("index_contents", [False, True])
+def test_query_matches_like_the_searcher(tmp_path, index_contents):
+    index = build_index(tmp_path, index_contents)
+    try:
+        # A non-ASCII keyword is found by the full text index and its offsets are byte offsets in the member
+        assert [result[1:] for result in index.query("café")] == [["word/document.xml", "part", False, [24]],
+                                                                  ["Content/document.txt", "content", False, [16]]]
+        # A regex without a keyword keeps the text meaning of \w
+        assert [result[1] for result in index.query(r"na\w+ve")] == ["word/document.xml", "Content/document.txt"]
+        # Binary members only have byte offsets when their contents are indexed
+        expected_offsets = [5] if index_contents else None
+        assert [result[1:] for result in index.query("AutoOpen")] == [["word/vbaProject.bin", "part", False,
+                                                                       expected_offsets]]
+        assert len(index.query("Open.ab")) == (1 if index_contents else 0)
+    finally:
+        index.close()
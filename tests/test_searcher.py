@@ -0,0 +1,39 @@
+import DocxItemizer
+
+
+def search(search_terms, name, data):
+    writer = DocxItemizer.MemoryWriter("Doc", DocxItemizer.Metrics())
+    searcher = DocxItemizer.Searcher("Doc", search_terms, writer)
+    searcher.inspect(name, data)
+    return searcher.found_file_contents
+
+
+def test_non_ascii_terms_keep_text_semantics():
+    data = "le café, naïve".encode("utf-8")
+    found = search([r"[é]", r"\w+ve", r"(?i)CAFÉ"], "word/document.xml", data)
+    assert found[0] == [["word/document.xml", [6], 1]]
+    assert found[1] == [["word/document.xml", [10], 1]]
+    assert found[2] == [["word/document.xml", [3], 1]]
+
+
+def test_binary_contents_are_searched_at_byte_offsets():
+    data = b"\xff\xfe\x00macro\x80AutoOpen"
+    found = search([r"AutoOpen"], "word/vbaProject.bin", data)
+    assert found[0] == [["word/vbaProject.bin", [9], 1]]
+
+
+def test_recorded_offsets_are_capped():
+    data = b"ab " * (DocxItemizer.MAX_RECORDED_OFFSETS + 5)
+    found = search([r"ab"], "word/document.xml", data)
+    file_path, offsets, offset_count = found[0][0]
+    assert len(offsets) == DocxItemizer.MAX_RECORDED_OFFSETS
+    assert offset_count == DocxItemizer.MAX_RECORDED_OFFSETS + 5
+    assert DocxItemizer.format_offsets(offsets, offset_count).endswith("(+" + str(offset_count - 10) + " More)")
+
+
+def test_binary_contents_are_scanned_as_bytes():
+    content_patterns = DocxItemizer.ContentPatternSet([r"\w+Open", "é"])
+    assert content_patterns.bytes_indexes == [0]
+    assert content_patterns.latin1_indexes == [1]
+    data = b"\xe9AutoOpen\x00\xe9"
+    assert content_patterns.find(data) == {0: [[1], 1], 1: [[0, 10], 2]}
@@ -0,0 +1,36 @@
+import pytest
+
+import DocxItemizer
+
+
+@pytest.mark.parametrize("header, file_type, is_image", [
+    (b"\x89PNG\r\n\x1a\n" + b"\x00" * 8, "png", True),
+    (b"\xff\xd8\xff\xe0\x00\x10JFIF", "jpeg", True),
+    (b"GIF89a\x01\x00", "gif", True),
+    (b"BM" + b"\x00" * 12 + b"\x28\x00\x00\x00", "bmp", True),
+    (b"RIFF\x00\x00\x00\x00WEBPVP8 ", "webp", True),
+    (b"\x00\x00\x00\x18ftypheic\x00\x00\x00\x00", "heic", True),
+    (b"\x01\x00\x00\x00" + b"\x00" * 36 + b" EMF", "emf", True),
+    (b"\xd7\xcd\xc6\x9a\x00\x00", "wmf", True),
+    (b"\xef\xbb\xbf<?xml version=\"1.0\"?>\n<svg xmlns=\"http://www.w3.org/2000/svg\"/>", "svg", True),
+    (b"%PDF-1.7\n", "pdf", False),
+    (b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1", "ole", False),
+    (b"MZ" + b"\x00" * 58 + b"\x40\x00\x00\x00" + b"PE\x00\x00", "exe", False),
+    (b"<?xml version=\"1.0\"?><w:document/>", None, False),
+    (b"Hello World", None, False),
+])
+def test_sniff_file_type(header, file_type, is_image):
+    assert DocxItemizer.sniff_file_type(header) == (file_type, is_image)
+
+
+def test_hidden_images_and_files_are_found():
+    png_data = b"\x89PNG\r\n\x1a\n" + b"\x00" * 20
+    writer = DocxItemizer.MemoryWriter("Doc")
+    image_finder = DocxItemizer.ImageFinder("Doc", writer)
+    image_finder.inspect("Doc/Extracted Document/word/media/image1.png", png_data)
+    image_finder.inspect("Doc/Extracted Document/word/media/notes.txt", png_data)
+    image_finder.inspect("Doc/Extracted Document/word/report.dat", b"%PDF-1.4 ...")
+    assert [hidden_image[3] for hidden_image in image_finder.get_hidden_images()] == ["png"]
+    assert [hidden_file[3] for hidden_file in image_finder.get_hidden_files()] == ["pdf"]
+    assert writer.files["Hidden Images/notes.png"] == png_data
+    assert writer.files["Hidden Files/report.pdf"] == b"%PDF-1.4 ..."
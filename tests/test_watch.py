@@ -0,0 +1,43 @@
+import os
+import signal
+
+import DocxItemizer
+
+run_watch_doc = DocxItemizer.run_watch_doc
+
+
+def crash_on_doc(doc_file_path, *args):
+    # Kill the worker process like the out of memory killer would when it itemizes "crash.docx"
+    if os.path.basename(doc_file_path) == "crash.docx":
+        os._exit(1)
+    return run_watch_doc(doc_file_path, *args)
+
+
+class StoppingManifest(DocxItemizer.RunManifest):
+
+    def __init__(self, manifest_file_path, doc_count):
+        # Stops the watch mode like SIGTERM once doc_count documents are done
+        super().__init__(manifest_file_path)
+        self.doc_count = doc_count
+
+    def add_record(self, doc_file_path, status, digest=None, base_dir_path=None):
+        super().add_record(doc_file_path, status, digest, base_dir_path)
+        done_count = sum(1 for record in self.records.values() if record["status"] in ("completed", "failed"))
+        if done_count == self.doc_count:
+            signal.raise_signal(signal.SIGTERM)
+
+
+def test_worker_crash_does_not_stop_watch_mode(tmp_path, make_docx, monkeypatch, capsys):
+    monkeypatch.setattr(DocxItemizer, "run_watch_doc", crash_on_doc)
+    for name in ("a.docx", "crash.docx", "b.docx", "c.docx"):
+        make_docx(name)
+    manifest = StoppingManifest(os.path.join(str(tmp_path), DocxItemizer.MANIFEST_FILE_NAME), 4)
+    DocxItemizer.run_watch(str(tmp_path), DocxItemizer.ItemizerOptions(), 2, manifest, poll_interval=0.05,
+                           settle_time=0)
+    manifest.close()
+    output = capsys.readouterr().out
+    assert "The worker process crashed while itemizing the document" in output
+    assert "Itemized Documents: 3/4" in output
+    statuses = {os.path.basename(path): record["status"] for path, record in manifest.records.items()}
+    assert statuses == {"a.docx": "completed", "crash.docx": "failed", "b.docx": "completed",
+                        "c.docx": "completed"}
@@ -0,0 +1,48 @@
+import os
+
+import DocxItemizer
+
+
+def read(file_path):
+    with open(file_path, "rb") as file:
+        return file.read()
+
+
+def test_later_write_of_same_path_wins(tmp_path):
+    file_path = os.path.join(str(tmp_path), "XML", "document.xml")
+    for _ in range(20):
+        scheduler = DocxItemizer.WriteScheduler(write_threads=4)
+        # A large first write and a small second write so the second one would finish first if they raced
+        scheduler.write(file_path, b"a" * (8 * 1024 * 1024))
+        scheduler.write(file_path, b"b")
+        scheduler.close()
+        assert read(file_path) == b"b"
+
+
+def test_overwritten_file_is_not_cloned_from(tmp_path):
+    data = os.urandom(DocxItemizer.CLONE_MIN_SIZE)
+    first_file_path = os.path.join(str(tmp_path), "first.bin")
+    second_file_path = os.path.join(str(tmp_path), "second.bin")
+    scheduler = DocxItemizer.WriteScheduler(write_threads=4)
+    scheduler.write(first_file_path, data)
+    scheduler.write(first_file_path, b"other")
+    scheduler.write(second_file_path, data)
+    scheduler.close()
+    assert read(first_file_path) == b"other"
+    assert read(second_file_path) == data
+
+
+def test_duplicate_contents_are_cloned(tmp_path):
+    data = os.urandom(DocxItemizer.CLONE_MIN_SIZE)
+    file_paths = [os.path.join(str(tmp_path), name) for name in ("a.bin", "b.bin", "c.bin")]
+    scheduler = DocxItemizer.WriteScheduler(write_threads=2)
+    for file_path in file_paths:
+        scheduler.write(file_path, data)
+    # The first file is written again while it is being cloned from
+    scheduler.write(file_paths[0], b"last")
+    scheduler.close()
+    record = scheduler.get_record()
+    assert record["duplicate_files"] == 2
+    assert read(file_paths[0]) == b"last"
+    assert read(file_paths[1]) == data
+    assert read(file_paths[2]) == data